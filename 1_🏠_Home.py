@@ -1,53 +1,15 @@
 import streamlit as st
-import sqlite3
 import os
+from profiling import start_profile, finish_profile
 
 # Logo zur Sidebar hinzufügen
 from config import add_logo
 add_logo()
 
-# Verbindung zur Datenbank herstellen
-conn = sqlite3.connect('werbetraeger.db', check_same_thread=False)
-c = conn.cursor()
-
-# Tabellen erstellen, falls sie noch nicht existieren
-def create_tables():
-    c.execute('''
-    CREATE TABLE IF NOT EXISTS locations (
-        id TEXT PRIMARY KEY,
-        erfasser TEXT,
-        datum TEXT,
-        standort TEXT,
-        stadt TEXT,
-        lat REAL,
-        lng REAL,
-        leistungswert TEXT,
-        eigentuemer TEXT,
-        umruestung BOOLEAN,
-        alte_nummer TEXT,
-        seiten TEXT,
-        vermarktungsform TEXT,
-        status TEXT,
-        current_step TEXT,
-        created_at TEXT
-    )
-    ''')
-    
-    c.execute('''
-    CREATE TABLE IF NOT EXISTS workflow_history (
-        id TEXT PRIMARY KEY,
-        location_id TEXT,
-        step TEXT,
-        status TEXT,
-        comment TEXT,
-        user TEXT,
-        timestamp TEXT,
-        FOREIGN KEY (location_id) REFERENCES locations (id)
-    )
-    ''')
-    conn.commit()
-
-create_tables()
+# Verbindung zur Datenbank herstellen (führt beim ersten Aufruf die Schema-Migrationen aus)
+from db import get_connection
+get_connection()
+start_profile()
 
 # CSS für optimiertes Layout
 st.markdown("""
@@ -106,4 +68,6 @@ with col2:
     if os.path.exists(image_path):
         st.image(image_path, width=300)
     else:
-        st.error("Bild nicht gefunden: säule3.png")
\ No newline at end of file
+        st.error("Bild nicht gefunden: säule3.png")
+
+finish_profile()
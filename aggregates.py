@@ -0,0 +1,128 @@
+import pandas as pd
+
+from db import cached_query_all
+from indexes import register_hot_query
+
+COUNT_COLUMNS = ['vermarktungsform', 'status', 'current_step', 'anzahl']
+
+STATUS_COUNTS_SQL = '''
+    SELECT vermarktungsform, status, current_step, COUNT(*)
+    FROM locations{where}
+    GROUP BY vermarktungsform, status, current_step
+'''
+
+# Vorberechnetes Aggregat (siehe Migration 5), gepflegt durch Trigger auf locations
+STEP_COUNTS_SQL = '''
+    SELECT NULLIF(vermarktungsform, ''), NULLIF(status, ''), NULLIF(current_step, ''), anzahl
+    FROM step_counts{where}
+'''
+
+WAITING_COUNT_SQL = '''
+    SELECT IFNULL(SUM(anzahl), 0)
+    FROM step_counts
+    WHERE status = 'active' AND current_step = ?
+'''
+
+STEP_COUNT_SQL = '''
+    SELECT IFNULL(SUM(anzahl), 0)
+    FROM step_counts
+    WHERE current_step = ?
+'''
+
+register_hot_query(
+    "dashboard_status_counts",
+    STATUS_COUNTS_SQL.format(where=" WHERE vermarktungsform IN (?, ?) AND created_at >= ?"),
+    ("Digitale Säule", "City-Screen", "2000-01-01")
+)
+
+
+def build_filter(created_after=None, forms=None):
+    """
+    Baut die WHERE-Klausel für Zeitraum- und Vermarktungsform-Filter.
+    Returns: (" WHERE ..." oder "", Parameterliste)
+    """
+    where_clauses = []
+    params = []
+    if created_after:
+        where_clauses.append("created_at >= ?")
+        params.append(created_after)
+    if forms:
+        where_clauses.append(f"vermarktungsform IN ({', '.join(['?'] * len(forms))})")
+        params.extend(forms)
+    where = f" WHERE {' AND '.join(where_clauses)}" if where_clauses else ""
+    return where, params
+
+
+def load_status_counts(created_after=None, forms=None) -> pd.DataFrame:
+    """
+    Anzahl Standorte je (Vermarktungsform, Status, Prozessschritt).
+    Ohne Zeitraumfilter wird das Aggregat step_counts gelesen (O(Anzahl Gruppen)),
+    mit Zeitraumfilter eine einzige GROUP BY-Abfrage über locations.
+    """
+    if created_after is None:
+        where, params = build_filter(None, forms)
+        rows = cached_query_all(STEP_COUNTS_SQL.format(where=where), params)
+    else:
+        where, params = build_filter(created_after, forms)
+        rows = cached_query_all(STATUS_COUNTS_SQL.format(where=where), params)
+    return pd.DataFrame(rows, columns=COUNT_COLUMNS)
+
+
+# Anzahl Standorte, die in einem Prozessschritt warten (ohne active_only unabhängig vom Status)
+def count_waiting(step: str, active_only: bool = True) -> int:
+    return cached_query_all(WAITING_COUNT_SQL if active_only else STEP_COUNT_SQL, (step,))[0][0]
+
+
+def summarize_counts(counts: pd.DataFrame, steps: list, forms: list) -> dict:
+    """
+    Leitet alle KPI-Kacheln und Chart-Daten des Dashboards aus den gruppierten Zählungen ab.
+    steps: Prozessschritte in Funnel-Reihenfolge, letzter Eintrag ist 'fertig'.
+    Die Laufzeit hängt nur von der Anzahl der Gruppen ab, nicht von der Anzahl der Standorte.
+    """
+    is_active = counts['status'] == 'active'
+    is_fertig = counts['current_step'] == 'fertig'
+
+    total = int(counts['anzahl'].sum())
+    in_progress = int(counts.loc[is_active & ~is_fertig, 'anzahl'].sum())
+    rejected = int(counts.loc[counts['status'] == 'rejected', 'anzahl'].sum())
+    completed = int(counts.loc[is_fertig, 'anzahl'].sum())
+    if total != (in_progress + rejected + completed):
+        in_progress = total - rejected - completed
+
+    active_by_step = counts[is_active].groupby('current_step')['anzahl'].sum()
+
+    # Aktive Standorte in Schritten, die nicht im Funnel vorkommen
+    missing = active_by_step[~active_by_step.index.isin(steps)]
+    missing_steps = [(int(count), step) for step, count in missing.items()]
+
+    # Nicht standardmäßige Schritte vor 'fertig' in den Funnel einsortieren
+    funnel_steps = steps[:-1] + [step for _, step in missing_steps if step] + steps[-1:]
+    funnel_counts = [int(active_by_step.get(step, 0)) for step in funnel_steps[:-1]] + [completed]
+
+    by_form = counts.groupby('vermarktungsform')['anzahl'].sum()
+    form_counts = [int(by_form.get(form, 0)) for form in forms]
+
+    status_flags = pd.DataFrame({
+        'Vermarktungsform': counts['vermarktungsform'],
+        'In Bearbeitung': counts['anzahl'].where(is_active, 0),
+        'Abgelehnt': counts['anzahl'].where(counts['status'] == 'rejected', 0),
+        'Fertig': counts['anzahl'].where(is_fertig, 0),
+    })
+    status_by_form = (
+        status_flags.groupby('Vermarktungsform').sum()
+        .reindex(forms, fill_value=0)
+        .rename_axis('Vermarktungsform')
+        .reset_index()
+    )
+
+    return {
+        'total': total,
+        'in_progress': in_progress,
+        'rejected': rejected,
+        'completed': completed,
+        'missing_steps': missing_steps,
+        'funnel_steps': funnel_steps,
+        'funnel_counts': funnel_counts,
+        'form_counts': form_counts,
+        'status_by_form': status_by_form,
+    }
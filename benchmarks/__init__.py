@@ -0,0 +1,2 @@
+# Benchmarks: Testdaten erzeugen (generate), Queries messen (runner), Seiten messen (pages)
+# und Reports vergleichen (compare)
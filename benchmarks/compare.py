@@ -0,0 +1,69 @@
+import argparse
+import json
+import sys
+
+# Vergleicht zwei Benchmark-Reports (z.B. zweier Commits) anhand der Median-Laufzeit.
+# Aufruf: python -m benchmarks.compare alt.json neu.json [--threshold 1.25] [--metric median_ms]
+# Exit-Code 1, wenn mindestens ein Fall langsamer als threshold x alt ist.
+
+# Fälle unterhalb dieser Laufzeit werden nicht als Regression gewertet (Messrauschen)
+MIN_SIGNIFICANT_MS = 0.5
+
+
+def load_report(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(base, current, threshold=1.25, metric="median_ms"):
+    """
+    Returns: Liste von (Name, alt, neu, Faktor, Regression?) in der Reihenfolge des neuen Reports;
+    Fälle, die nur in einem der Reports vorkommen, haben None als alten bzw. neuen Wert
+    """
+    base_results = base["results"]
+    current_results = current["results"]
+    rows = []
+    for name in list(current_results) + [name for name in base_results if name not in current_results]:
+        old = base_results.get(name, {}).get(metric)
+        new = current_results.get(name, {}).get(metric)
+        ratio = new / old if old and new is not None else None
+        regression = (
+            ratio is not None
+            and ratio > threshold
+            and new >= MIN_SIGNIFICANT_MS
+        )
+        rows.append((name, old, new, ratio, regression))
+    return rows
+
+
+def _format_ms(value):
+    return f"{value:>10.3f}" if value is not None else f"{'-':>10}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Zwei Benchmark-Reports vergleichen")
+    parser.add_argument("base")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Faktor, ab dem ein Fall als Regression gilt")
+    parser.add_argument("--metric", default="median_ms")
+    args = parser.parse_args(argv)
+
+    base = load_report(args.base)
+    current = load_report(args.current)
+    print(f"alt: {base['meta'].get('commit')} ({base['meta'].get('locations')} Standorte)   "
+          f"neu: {current['meta'].get('commit')} ({current['meta'].get('locations')} Standorte)")
+
+    rows = compare(base, current, args.threshold, args.metric)
+    regressions = 0
+    for name, old, new, ratio, regression in rows:
+        ratio_text = f"{ratio:>7.2f}x" if ratio is not None else f"{'-':>8}"
+        marker = "  REGRESSION" if regression else ""
+        print(f"{name:<40}{_format_ms(old)}{_format_ms(new)} {ratio_text}{marker}")
+        regressions += regression
+
+    print(f"{regressions} Regression(en) bei Schwelle {args.threshold}x ({args.metric})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
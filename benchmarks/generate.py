@@ -0,0 +1,287 @@
+import argparse
+import os
+import sqlite3
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from indexes import ensure_indexes
+from migrations import migrate
+
+# Synthetische Testdaten für Benchmarks: Standorte in NRW mit Workflow-Historie.
+# Aufruf: python -m benchmarks.generate --size 100k --out bench_100k.db [--seed 42]
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+# Letzte Migration, die nur Tabellen/Spalten anlegt. Aggregate, Trigger und spätere
+# Hilfstabellen werden erst nach dem Massenimport angelegt und dabei einmalig befüllt.
+BASE_SCHEMA_VERSION = 4
+
+CHUNK_SIZE = 20_000
+
+# Städte in NRW: (Name, Breitengrad, Längengrad, Gewicht ~ Einwohner in 1000)
+CITIES = [
+    ("Köln", 50.9375, 6.9603, 1084), ("Düsseldorf", 51.2277, 6.7735, 619),
+    ("Dortmund", 51.5136, 7.4653, 588), ("Essen", 51.4556, 7.0116, 583),
+    ("Duisburg", 51.4344, 6.7623, 498), ("Bochum", 51.4818, 7.2162, 364),
+    ("Wuppertal", 51.2562, 7.1508, 355), ("Bielefeld", 52.0302, 8.5325, 334),
+    ("Bonn", 50.7374, 7.0982, 330), ("Münster", 51.9607, 7.6261, 316),
+    ("Mönchengladbach", 51.1805, 6.4428, 261), ("Gelsenkirchen", 51.5177, 7.0857, 260),
+    ("Aachen", 50.7753, 6.0839, 249), ("Krefeld", 51.3388, 6.5853, 227),
+    ("Oberhausen", 51.4963, 6.8638, 209), ("Hagen", 51.3671, 7.4633, 189),
+    ("Hamm", 51.6739, 7.8150, 179), ("Mülheim an der Ruhr", 51.4275, 6.8825, 170),
+    ("Leverkusen", 51.0459, 7.0192, 163), ("Solingen", 51.1652, 7.0671, 159),
+    ("Neuss", 51.2042, 6.6879, 153), ("Paderborn", 51.7189, 8.7575, 151),
+    ("Siegen", 50.8748, 8.0243, 101), ("Gütersloh", 51.9032, 8.3858, 100),
+]
+
+STREETS = [
+    "Hauptstraße", "Bahnhofstraße", "Kölner Straße", "Königsallee", "Ringstraße", "Schulstraße",
+    "Marktplatz", "Kirchstraße", "Gartenstraße", "Bergstraße", "Am Jröne Meerke", "Poststraße",
+    "Friedrichstraße", "Wilhelmstraße", "Lindenallee", "Industriestraße", "Rheinuferstraße",
+]
+
+ERFASSER = ["Nathalie", "Max", "Kiko", "Jonas", "Lea", "Murat", "Sophie", "Tim"]
+
+# (Vermarktungsform, Gewicht, mögliche Seiten)
+FORMS = [
+    ("Digitale Säule", 0.30, ["einseitig", "doppelseitig", "dreiseitig"]),
+    ("Roadside-Screen", 0.25, ["einseitig", "doppelseitig"]),
+    ("City-Screen", 0.25, ["einseitig", "doppelseitig"]),
+    ("MegaVision", 0.10, ["einseitig", "doppelseitig"]),
+    ("SuperMotion", 0.10, ["einseitig", "doppelseitig"]),
+]
+
+# Mittlere Verweildauer je Schritt in Tagen (exponentialverteilt)
+MEAN_DAYS = {
+    "leiter_akquisition": 4, "niederlassungsleiter": 6, "baurecht": 45, "widerspruch": 90,
+    "ceo": 7, "bauteam": 60, "fertigstellung": 10,
+}
+
+# Ablehnungs- bzw. Verzweigungswahrscheinlichkeiten
+P_REJECT_AKQUISITION = 0.15
+P_REJECT_NIEDERLASSUNG = 0.10
+P_REJECT_BAURECHT = 0.25
+P_WIDERSPRUCH = 0.5
+P_WIDERSPRUCH_SUCCESS = 0.4
+P_REJECT_CEO = 0.10
+
+# Zeitraum, über den die Erfassungen verteilt werden, und fester Bezugszeitpunkt,
+# damit derselbe Seed immer dieselbe Datenbank erzeugt
+HISTORY_DAYS = 3 * 365
+NOW = datetime(2025, 7, 1, 12, 0, 0)
+
+LOCATION_COLUMNS = [
+    "id", "erfasser", "datum", "standort", "stadt", "lat", "lng", "leistungswert", "eigentuemer",
+    "umruestung", "alte_nummer", "seiten", "vermarktungsform", "status", "current_step", "created_at",
+    "bauantrag_datum", "plan_date", "ist_date", "build_status", "contractor", "power_connection",
+    "completion_date", "final_inspection", "network_id", "dms_id",
+]
+
+
+def _uuid(rng) -> str:
+    return str(uuid.UUID(bytes=rng.bytes(16), version=4))
+
+
+def _simulate(rng, form, created):
+    """
+    Durchläuft den Workflow eines Standorts ab der Erfassung, bis er abgeschlossen,
+    abgelehnt oder zum aktuellen Zeitpunkt noch in einem Schritt ist.
+    Returns: (status, current_step, Ereignisse [(step, status, Zeitpunkt)], Zeitpunkte je Meilenstein)
+    """
+    events = [("erfassung", "completed", created)]
+    milestones = {}
+    t = created
+    step = "leiter_akquisition"
+
+    while True:
+        t = t + timedelta(days=float(rng.exponential(MEAN_DAYS[step])), seconds=int(rng.integers(0, 86400)))
+        if t > NOW:
+            return "active", step, events, milestones
+
+        if step == "leiter_akquisition":
+            if rng.random() < P_REJECT_AKQUISITION:
+                events.append((step, "rejected", t))
+                return "rejected", "abgelehnt", events, milestones
+            events.append((step, "approved", t))
+            # Die Digitale Säule überspringt den Niederlassungsleiter
+            step = "baurecht" if form == "Digitale Säule" else "niederlassungsleiter"
+
+        elif step == "niederlassungsleiter":
+            if rng.random() < P_REJECT_NIEDERLASSUNG:
+                events.append((step, "rejected", t))
+                return "rejected", "abgelehnt", events, milestones
+            events.append((step, "approved", t))
+            step = "baurecht"
+
+        elif step == "baurecht":
+            submitted = t - timedelta(days=float(rng.uniform(0, MEAN_DAYS["baurecht"] / 2)))
+            events.append((step, "submitted", max(submitted, events[-1][2])))
+            milestones["bauantrag_datum"] = events[-1][2]
+            if rng.random() < P_REJECT_BAURECHT:
+                if rng.random() < P_WIDERSPRUCH:
+                    events.append((step, "objection", t))
+                    step = "widerspruch"
+                else:
+                    events.append((step, "rejected", t))
+                    return "rejected", "abgebrochen", events, milestones
+            else:
+                events.append((step, "approved", t))
+                step = "ceo"
+
+        elif step == "widerspruch":
+            if rng.random() < P_WIDERSPRUCH_SUCCESS:
+                events.append((step, "approved", t))
+                step = "ceo"
+            else:
+                events.append((step, "rejected", t))
+                return "rejected", "abgebrochen", events, milestones
+
+        elif step == "ceo":
+            if rng.random() < P_REJECT_CEO:
+                events.append((step, "rejected", t))
+                return "rejected", "abgelehnt", events, milestones
+            events.append((step, "approved", t))
+            step = "bauteam"
+
+        elif step == "bauteam":
+            # Zwischenstände des Bauteams vor dem Abschluss
+            start = events[-1][2]
+            for _ in range(int(rng.integers(0, 3))):
+                events.append((step, "updated", start + (t - start) * float(rng.random())))
+            events.sort(key=lambda event: event[2])
+            events.append((step, "completed", t))
+            milestones["plan_date"] = start + (t - start) * 0.8
+            milestones["ist_date"] = t
+            step = "fertigstellung"
+
+        elif step == "fertigstellung":
+            events.append((step, "completed", t))
+            milestones["completion_date"] = t
+            return "completed", "fertig", events, milestones
+
+
+def generate_chunk(rng, count):
+    """
+    Erzeugt count Standorte samt Historie.
+    Returns: (Zeilen für locations, Zeilen für workflow_history)
+    """
+    city_weights = np.array([city[3] for city in CITIES], dtype=float)
+    city_index = rng.choice(len(CITIES), size=count, p=city_weights / city_weights.sum())
+    form_weights = np.array([form[1] for form in FORMS])
+    form_index = rng.choice(len(FORMS), size=count, p=form_weights / form_weights.sum())
+    lat_jitter = rng.normal(0, 0.03, size=count)
+    lng_jitter = rng.normal(0, 0.045, size=count)
+    created_offsets = rng.uniform(0, HISTORY_DAYS * 86400, size=count)
+    power = rng.choice([0, 100, 500, 1000, 1500, 2000, 4000, 5000], size=count)
+
+    locations = []
+    history = []
+    for i in range(count):
+        city, lat, lng, _ = CITIES[city_index[i]]
+        form, _, sides = FORMS[form_index[i]]
+        created = NOW - timedelta(seconds=float(created_offsets[i]))
+        location_id = _uuid(rng)
+        umruestung = bool(rng.random() < 0.3)
+
+        status, current_step, events, milestones = _simulate(rng, form, created)
+        completed = current_step == "fertig"
+        built = "ist_date" in milestones
+
+        locations.append((
+            location_id,
+            ERFASSER[int(rng.integers(len(ERFASSER)))],
+            (created - timedelta(days=int(rng.integers(0, 14)))).date().isoformat(),
+            f"{STREETS[int(rng.integers(len(STREETS)))]} {int(rng.integers(1, 200))}",
+            city,
+            round(lat + float(lat_jitter[i]), 6),
+            round(lng + float(lng_jitter[i]), 6),
+            str(int(power[i])) if power[i] else "",
+            "Stadt" if rng.random() < 0.4 else "Privater Eigentümer",
+            umruestung,
+            str(int(rng.integers(1000, 99999))) if umruestung else "",
+            sides[int(rng.integers(len(sides)))],
+            form,
+            status,
+            current_step,
+            created.isoformat(),
+            milestones["bauantrag_datum"].date().isoformat() if "bauantrag_datum" in milestones else None,
+            milestones["plan_date"].date().isoformat() if "plan_date" in milestones else None,
+            milestones["ist_date"].date().isoformat() if built else None,
+            "Abgeschlossen" if built else None,
+            "Bau GmbH" if built else None,
+            "Aktiv" if built else None,
+            milestones["completion_date"].isoformat() if completed else None,
+            milestones["completion_date"].date().isoformat() if completed else None,
+            f"DS-{location_id[:8]}" if completed else None,
+            f"CMS-{location_id[:8]}" if completed else None,
+        ))
+        for step, event_status, timestamp in events:
+            history.append((
+                _uuid(rng), location_id, step, event_status,
+                f"{step}: {event_status}", ERFASSER[int(rng.integers(len(ERFASSER)))], timestamp.isoformat()
+            ))
+    return locations, history
+
+
+def generate(path, size, seed=42, log=print):
+    """
+    Legt eine neue Benchmark-Datenbank mit size Standorten an (eine vorhandene Datei wird ersetzt).
+    Returns: (Anzahl Standorte, Anzahl Historien-Einträge)
+    """
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+    migrate(conn, target_version=BASE_SCHEMA_VERSION)
+
+    rng = np.random.default_rng(seed)
+    insert_locations = f"INSERT INTO locations ({', '.join(LOCATION_COLUMNS)}) VALUES ({', '.join(['?'] * len(LOCATION_COLUMNS))})"
+    insert_history = "INSERT INTO workflow_history VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+    location_count = history_count = 0
+    started = time.perf_counter()
+    while location_count < size:
+        count = min(CHUNK_SIZE, size - location_count)
+        locations, history = generate_chunk(rng, count)
+        conn.execute("BEGIN")
+        conn.executemany(insert_locations, locations)
+        conn.executemany(insert_history, history)
+        conn.execute("COMMIT")
+        location_count += count
+        history_count += len(history)
+        log(f"{location_count:>9} Standorte, {history_count:>9} Historien-Einträge ({time.perf_counter() - started:.1f}s)")
+
+    # Restliche Migrationen (Aggregate, Trigger) und Indizes nach dem Import
+    migrate(conn)
+    ensure_indexes(conn)
+    conn.execute("ANALYZE")
+    conn.close()
+    return location_count, history_count
+
+
+def parse_size(value: str) -> int:
+    return SIZES[value.lower()] if value.lower() in SIZES else int(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Synthetische Benchmark-Datenbank erzeugen")
+    parser.add_argument("--size", default="1k", help="Anzahl Standorte: 1k, 100k, 1m oder eine Zahl")
+    parser.add_argument("--out", default=None, help="Zieldatei (Standard: bench_<size>.db)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    out = args.out or f"bench_{args.size.lower()}.db"
+    locations, history = generate(out, parse_size(args.size), args.seed)
+    print(f"{out}: {locations} Standorte, {history} Historien-Einträge")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+import db
+from benchmarks.runner import git_commit
+
+# End-to-end-Rerun-Zeiten der Seiten, headless über streamlit.testing.v1.AppTest.
+# Gemessen wird gegen eine Kopie der Datenbank, da Interaktionen (Genehmigungen) schreiben.
+# Aufruf: python -m benchmarks.pages --db bench_100k.db --out pages_report.json [--repeat 5] [--cold]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Zeitlimit je Rerun in Sekunden (AppTest bricht danach ab)
+RUN_TIMEOUT = 300
+
+
+def _find(elements, label):
+    for element in elements:
+        if element.label == label:
+            return element
+    return None
+
+
+def set_value(kind, label, value, sidebar=False):
+    # Interaktion: Widget mit dieser Beschriftung auf value setzen
+    def interaction(at):
+        widget = _find(getattr(at.sidebar if sidebar else at, kind), label)
+        return widget.set_value(value) if widget is not None and value in widget.options else None
+    return interaction
+
+
+def select_next(label):
+    # Interaktion: in einer Auswahlliste den nächsten (bzw. einzigen) Eintrag wählen
+    def interaction(at):
+        widget = _find(at.selectbox, label)
+        if widget is None or not widget.options:
+            return None
+        return widget.set_value(widget.options[min(1, len(widget.options) - 1)])
+    return interaction
+
+
+def click(label):
+    def interaction(at):
+        widget = _find(at.button, label)
+        return widget.click() if widget is not None and not widget.disabled else None
+    return interaction
+
+
+# Typische Interaktionen je Seite (Dateiname-Präfix -> [(Name, Interaktion)]), nacheinander ausgeführt
+INTERACTIONS = {
+    "02_": [
+        ("timeframe_all", set_value("selectbox", "Zeitraum", "Alle", sidebar=True)),
+        ("extended_view", set_value("radio", "Ansicht:", "Erweitert (mit allen Daten)")),
+    ],
+    "04_2_": [
+        ("select_location", select_next("Standort zur Prüfung auswählen:")),
+        ("approve", click("Entscheidung bestätigen")),
+    ],
+    "04_3_": [
+        ("select_location", select_next("Standort auswählen:")),
+        ("approve", click("Speichern")),
+    ],
+    "04_4_": [
+        ("select_location", select_next("Standort auswählen:")),
+        ("submit_application", click("Bauantrag einreichen")),
+        ("approve", click("Genehmigung bestätigen")),
+    ],
+    "04_5_": [
+        ("select_location", select_next("Standort zur Prüfung auswählen:")),
+        ("approve", click("Entscheidung bestätigen")),
+    ],
+    "04_6_": [
+        ("select_location", select_next("Standort auswählen:")),
+        ("save_build_data", click("Baudaten speichern")),
+    ],
+    "04_7_": [
+        ("select_location", select_next("Standort auswählen:")),
+    ],
+}
+
+
+def page_scripts():
+    """
+    Returns: Liste von (Seitenname, Pfad) für Home, Dashboard, GeoMap und alle Schrittseiten
+    """
+    scripts = sorted(glob.glob(os.path.join(ROOT, "1_*.py")))
+    scripts += sorted(glob.glob(os.path.join(ROOT, "pages", "02_*.py")))
+    scripts += sorted(glob.glob(os.path.join(ROOT, "pages", "03_*GeoMap.py")))
+    scripts += sorted(glob.glob(os.path.join(ROOT, "pages", "04_*.py")))
+    return [(os.path.splitext(os.path.basename(path))[0], path) for path in scripts]
+
+
+def _same(at):
+    # Erster Lauf bzw. Rerun ohne Interaktion
+    return at
+
+
+def _interactions(name):
+    for prefix, interactions in INTERACTIONS.items():
+        if name.startswith(prefix):
+            return interactions
+    return []
+
+
+def run_scenario(path, interactions, timings=None, cold=False):
+    """
+    Startet eine neue Session der Seite, führt einen Rerun und alle Interaktionen aus.
+    timings: dict Name -> Liste, in das die Laufzeiten in ms eingetragen werden
+    Returns: Liste der Fehlermeldungen (Exceptions der Seite)
+    """
+    at = AppTest.from_file(path, default_timeout=RUN_TIMEOUT)
+    errors = []
+    for name, interaction in [("initial", _same), ("rerun", _same)] + interactions:
+        target = interaction(at)
+        if target is None:
+            # Widget nicht vorhanden (z.B. leere Arbeitsliste): restliche Interaktionen überspringen
+            break
+        if cold:
+            db.clear_query_cache()
+        started = time.perf_counter()
+        target.run()
+        if timings is not None:
+            timings.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+        errors = [exception.value for exception in at.exception]
+        if errors:
+            break
+    return errors
+
+
+def _stats(values):
+    values = np.array(values)
+    return {
+        'runs': len(values),
+        'median_ms': round(float(np.median(values)), 3),
+        'p95_ms': round(float(np.percentile(values, 95)), 3),
+        'max_ms': round(float(values.max()), 3),
+    }
+
+
+def run(db_path, repeat=5, cold=False, only=None, log=print):
+    """
+    Misst alle Seiten gegen eine temporäre Kopie von db_path.
+    Returns: Report als dict (gleiches Format wie benchmarks.runner, vergleichbar mit benchmarks.compare)
+    """
+    workdir = tempfile.mkdtemp(prefix="werbetraeger_bench_")
+    bench_db = os.path.join(workdir, "bench.db")
+    shutil.copy(db_path, bench_db)
+    os.environ["WERBETRAEGER_DB"] = bench_db
+    db.DB_PATH = bench_db
+    os.chdir(ROOT)
+
+    results = {}
+    locations = db.query_scalar("SELECT COUNT(*) FROM locations")
+    try:
+        for page, path in page_scripts():
+            if only and only not in page:
+                continue
+            interactions = _interactions(page)
+
+            timings = {}
+            errors = []
+            for _ in range(repeat):
+                errors = run_scenario(path, interactions, timings, cold)
+                if errors:
+                    break
+
+            # Speicherspitze in einem eigenen Durchlauf, da tracemalloc die Laufzeit verfälscht
+            tracemalloc.start()
+            run_scenario(path, interactions, cold=cold)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            tracemalloc.stop()
+
+            for name, values in timings.items():
+                key = f"page.{page}.{name}"
+                results[key] = _stats(values)
+                results[key]['peak_memory_mb'] = round(peak_mb, 2)
+                log(f"{key:<55} p50 {results[key]['median_ms']:>9.1f} ms   "
+                    f"p95 {results[key]['p95_ms']:>9.1f} ms   peak {peak_mb:>7.1f} MB")
+            if errors:
+                results[f"page.{page}"] = {'error': errors[0]}
+                log(f"page.{page}: Fehler {errors[0]}")
+    finally:
+        db.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(),
+            'commit': git_commit(),
+            'database': os.path.abspath(db_path),
+            'locations': locations,
+            'repeat': repeat,
+            'cold_cache': cold,
+        },
+        'results': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seiten-Rerun-Benchmarks mit Streamlit AppTest")
+    parser.add_argument("--db", required=True, help="Datenbank, z.B. aus benchmarks.generate (wird nicht verändert)")
+    parser.add_argument("--out", default="benchmark_report_pages.json")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--cold", action="store_true", help="Query-Cache vor jedem Rerun leeren")
+    parser.add_argument("--only", default=None, help="Nur Seiten, deren Name diesen Text enthält")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        parser.error(f"Datenbank {args.db} nicht gefunden")
+
+    out = os.path.abspath(args.out)
+    report = run(os.path.abspath(args.db), args.repeat, args.cold, args.only)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Report geschrieben: {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import db
+
+# Misst alle SQL-Abfragen und Datenaufbereitungen von Dashboard, GeoMap und Schrittseiten
+# gegen eine (generierte) Datenbank und schreibt einen JSON-Report.
+# Aufruf: python -m benchmarks.runner --db bench_100k.db --out report.json [--repeat 7] [--warm]
+
+# Prozessschritte in Funnel-Reihenfolge wie im Dashboard
+DASHBOARD_STEPS = [
+    'erfassung', 'leiter_akquisition', 'niederlassungsleiter', 'baurecht', 'widerspruch', 'ceo', 'bauteam', 'fertig'
+]
+
+WORKLIST_STEPS = ['leiter_akquisition', 'niederlassungsleiter', 'baurecht', 'ceo', 'bauteam', 'fertigstellung']
+
+GEOMAP_SQL = (
+    "SELECT id, standort, stadt, lat, lng, vermarktungsform, current_step "
+    "FROM locations WHERE lat IS NOT NULL AND lng IS NOT NULL"
+)
+
+GEOMAP_COLORS = {
+    'Digitale Säule': [31, 119, 180],
+    'Roadside-Screen': [255, 127, 14],
+    'City-Screen': [44, 160, 44],
+    'MegaVision': [214, 39, 40],
+    'SuperMotion': [148, 103, 189],
+    'default': [128, 128, 128]
+}
+
+
+def _prepare_context():
+    # Eingaben, die mehrere Fälle gemeinsam nutzen (einmal vorab geladen, nicht gemessen)
+    from aggregates import load_status_counts
+    from dwell_time import load_step_events
+    from worklist import load_worklist_page
+
+    latest = db.query_scalar("SELECT MAX(created_at) FROM locations") or datetime.now().isoformat()
+    latest = datetime.fromisoformat(latest)
+    ctx = {
+        'last_30_days': (latest - timedelta(days=30)).isoformat(),
+        'last_year': (latest - timedelta(days=365)).isoformat(),
+        'forms': db.load_marketing_forms(),
+        'counts': load_status_counts(),
+        'events': load_step_events(),
+        'sample_ids': {},
+        'deep_cursors': {},
+    }
+    for step in WORKLIST_STEPS:
+        df, _ = load_worklist_page(step, active_only=step != 'niederlassungsleiter')
+        ctx['sample_ids'][step] = df['id'].iloc[0] if not df.empty else ""
+        # Cursor mitten in der Arbeitsliste für das Blättern auf eine späte Seite
+        middle = db.query_one(
+            "SELECT created_at, id FROM locations WHERE current_step = ? "
+            "ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET "
+            "(SELECT COUNT(*) / 2 FROM locations WHERE current_step = ?)",
+            (step, step)
+        )
+        ctx['deep_cursors'][step] = tuple(middle) if middle else None
+    detail_columns, detail_rows = db.cached_query("SELECT * FROM locations WHERE created_at >= ?", (ctx['last_year'],))
+    ctx['detail_frame'] = pd.DataFrame(detail_rows, columns=detail_columns)
+    ctx['geomap_rows'] = db.query_all(GEOMAP_SQL)
+    return ctx
+
+
+def build_cases(ctx):
+    """
+    Returns: Liste von (Name, Funktion ohne Argumente)
+    """
+    from aggregates import load_status_counts, summarize_counts, count_waiting
+    from dwell_time import load_step_events, step_duration_stats, total_durations
+    from financials import add_financial_kpis, score_locations
+    from spatial import load_points_in_bbox, load_clusters, cluster_level_for_zoom, viewport_bbox
+    from search import build_match_query, count_matches, search_locations
+    from worklist import load_worklist_page
+
+    forms = ctx['forms']
+    cases = [
+        # Dashboard
+        ("dashboard.status_counts", lambda: load_status_counts()),
+        ("dashboard.status_counts_30d", lambda: load_status_counts(ctx['last_30_days'], forms)),
+        ("dashboard.summarize_counts", lambda: summarize_counts(ctx['counts'], DASHBOARD_STEPS, forms)),
+        ("dashboard.step_events", lambda: load_step_events()),
+        ("dashboard.step_events_30d", lambda: load_step_events(ctx['last_30_days'], forms)),
+        ("dashboard.dwell_stats", lambda: (step_duration_stats(ctx['events']), total_durations(ctx['events']))),
+        ("dashboard.detail_query_year", lambda: db.cached_query(
+            "SELECT * FROM locations WHERE created_at >= ?", (ctx['last_year'],))),
+        ("dashboard.financial_kpis_year", lambda: add_financial_kpis(ctx['detail_frame'].copy())),
+        ("dashboard.marketing_forms", db.load_marketing_forms),
+        ("dashboard.delete_options", lambda: [
+            f"{row[0]} | {row[1]}, {row[2]}"
+            for row in db.cached_query_all("SELECT id, standort, stadt FROM locations")
+        ]),
+        # GeoMap
+        ("geomap.points", lambda: db.cached_query_all(GEOMAP_SQL)),
+        ("geomap.frame", lambda: _geomap_frame(ctx['geomap_rows'])),
+        ("geomap.viewport_nrw", lambda: load_points_in_bbox(viewport_bbox(51.4332, 7.6616, 8))),
+        ("geomap.viewport_city", lambda: load_points_in_bbox(viewport_bbox(50.9375, 6.9603, 12))),
+        ("geomap.clusters_germany", lambda: load_clusters(
+            cluster_level_for_zoom(6), viewport_bbox(51.1657, 10.4515, 6))),
+        ("geomap.clusters_nrw", lambda: load_clusters(cluster_level_for_zoom(8), viewport_bbox(51.4332, 7.6616, 8))),
+        # Standort-Suche (Volltextindex), Tippfehler mit Ersatzbegriffen aus dem Vokabular
+        ("search.city", lambda: search_locations(build_match_query("Köln")[0])),
+        ("search.street_number", lambda: search_locations(build_match_query("Gartenstr 15")[0])),
+        ("search.typo", lambda: search_locations(build_match_query("Königsale Dusseldorf")[0])),
+        ("search.count_city", lambda: count_matches(build_match_query("Köln")[0])),
+        # CEO-Finanzmodell für die aktuelle Arbeitsliste
+        ("ceo.score_worklist", lambda: score_locations(load_worklist_page('ceo')[0])),
+    ]
+
+    for step in WORKLIST_STEPS:
+        active_only = step != 'niederlassungsleiter'
+        location_id = ctx['sample_ids'][step]
+        cases += [
+            (f"{step}.count", lambda step=step, active_only=active_only: count_waiting(step, active_only)),
+            (f"{step}.first_page", lambda step=step, active_only=active_only: load_worklist_page(step, active_only)),
+            (f"{step}.deep_page", lambda step=step, active_only=active_only: load_worklist_page(
+                step, active_only, cursor=ctx['deep_cursors'][step])),
+            (f"{step}.search", lambda step=step, active_only=active_only: load_worklist_page(step, active_only, "Köln")),
+            (f"{step}.details", lambda location_id=location_id: db.load_location_details(location_id)),
+            (f"{step}.history", lambda location_id=location_id: db.load_workflow_history(location_id)),
+        ]
+    return cases
+
+
+def _geomap_frame(rows):
+    # Aufbereitung wie auf der GeoMap-Seite
+    df = pd.DataFrame(rows, columns=['id', 'standort', 'stadt', 'lat', 'lng', 'vermarktungsform', 'current_step'])
+    df['color'] = df['vermarktungsform'].apply(lambda x: GEOMAP_COLORS.get(x, GEOMAP_COLORS['default']))
+    return df
+
+
+def time_case(fn, repeat, warm=False):
+    """
+    Führt fn repeat-mal aus (nach einem Aufwärmlauf).
+    Ohne warm wird der Query-Cache vor jedem Lauf geleert, damit die SQL-Zeit gemessen wird.
+    Returns: Statistik in Millisekunden
+    """
+    fn()
+    timings = []
+    for _ in range(repeat):
+        if not warm:
+            db.clear_query_cache()
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings = np.array(timings)
+    return {
+        'runs': repeat,
+        'min_ms': round(float(timings.min()), 3),
+        'median_ms': round(float(np.median(timings)), 3),
+        'p95_ms': round(float(np.percentile(timings, 95)), 3),
+        'mean_ms': round(float(timings.mean()), 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(db_path, repeat=7, warm=False, only=None, log=print):
+    """
+    Misst alle Fälle gegen db_path.
+    only: optionale Teilzeichenkette, um nur passende Fälle zu messen
+    Returns: Report als dict
+    """
+    db.DB_PATH = db_path
+    ctx = _prepare_context()
+
+    results = {}
+    for name, fn in build_cases(ctx):
+        if only and only not in name:
+            continue
+        results[name] = time_case(fn, repeat, warm)
+        log(f"{name:<40} median {results[name]['median_ms']:>10.3f} ms   p95 {results[name]['p95_ms']:>10.3f} ms")
+
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(),
+            'commit': git_commit(),
+            'database': os.path.abspath(db_path),
+            'locations': db.query_scalar("SELECT COUNT(*) FROM locations"),
+            'history': db.query_scalar("SELECT COUNT(*) FROM workflow_history"),
+            'repeat': repeat,
+            'warm_cache': warm,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+        },
+        'results': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SQL- und Aufbereitungs-Benchmarks ausführen")
+    parser.add_argument("--db", required=True, help="Datenbank, z.B. aus benchmarks.generate")
+    parser.add_argument("--out", default="benchmark_report.json")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--warm", action="store_true", help="Query-Cache zwischen den Läufen nicht leeren")
+    parser.add_argument("--only", default=None, help="Nur Fälle, deren Name diesen Text enthält")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        parser.error(f"Datenbank {args.db} nicht gefunden")
+
+    report = run(args.db, args.repeat, args.warm, args.only)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Report geschrieben: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
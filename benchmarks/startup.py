@@ -0,0 +1,155 @@
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+# Kaltstart der Seiten: erster Lauf eines Seitenskripts in einem frischen Python-Prozess
+# (Imports der Seite und ihrer Module, Migrationscheck, erster Rerun). Streamlit selbst ist
+# vorab geladen und zählt nicht mit. Exit-Code 1, wenn eine Seite ihr Zeitbudget überschreitet.
+# Aufruf: python -m benchmarks.startup --db bench_1k.db [--repeat 5] [--budget 1500] [--out startup.json]
+
+# Bewusst nur Standardbibliothek auf Modulebene: der Kindprozess soll außer Streamlit nichts vorladen
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Zeitbudget je Seite (Dateiname-Präfix -> ms); alle übrigen Seiten nutzen DEFAULT_BUDGET_MS
+DEFAULT_BUDGET_MS = 1500
+BUDGETS = {
+    "02_": 2500,
+}
+
+RUN_TIMEOUT = 120
+
+
+def page_scripts():
+    """
+    Returns: Liste von (Seitenname, Pfad) für Home und alle Seiten unter pages/
+    """
+    scripts = sorted(glob.glob(os.path.join(ROOT, "1_*.py"))) + sorted(glob.glob(os.path.join(ROOT, "pages", "*.py")))
+    return [(os.path.splitext(os.path.basename(path))[0], path) for path in scripts]
+
+
+def measure_once(path):
+    """
+    Im Kindprozess: Seite einmal ausführen.
+    Returns: dict mit ms, neu importierten Top-Level-Paketen und Fehlern
+    """
+    from streamlit.testing.v1 import AppTest
+
+    before = {name.split(".")[0] for name in sys.modules}
+    started = time.perf_counter()
+    at = AppTest.from_file(path, default_timeout=RUN_TIMEOUT)
+    at.run()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    imported = sorted({name.split(".")[0] for name in sys.modules} - before)
+    return {
+        'ms': elapsed_ms,
+        'imported': [name for name in imported if not name.startswith("_")],
+        'errors': [str(exception.value) for exception in at.exception],
+    }
+
+
+def measure(path, db_path):
+    # Frischer Interpreter je Messung, damit kein Modul aus einem früheren Lauf im Cache liegt
+    env = dict(os.environ, WERBETRAEGER_DB=db_path, WERBETRAEGER_QUERY_STATS="0")
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child", path],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=RUN_TIMEOUT * 2
+    )
+    if result.returncode != 0:
+        return {'ms': None, 'imported': [], 'errors': [(result.stderr.strip().splitlines() or ["Abbruch"])[-1]]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def budget_for(page, default=DEFAULT_BUDGET_MS):
+    for prefix, budget in BUDGETS.items():
+        if page.startswith(prefix):
+            return budget
+    return default
+
+
+def run(db_path, repeat=5, default_budget=DEFAULT_BUDGET_MS, only=None, log=print):
+    """
+    Returns: Report als dict (gleiches Format wie benchmarks.runner), Liste der Seiten über Budget
+    und Liste der Seiten, die nicht starten (Fehler oder Abbruch)
+    """
+    import numpy as np
+    from benchmarks.runner import git_commit
+
+    results = {}
+    over_budget = []
+    failed = []
+    for page, path in page_scripts():
+        if only and only not in page:
+            continue
+        runs = [measure(path, db_path) for _ in range(repeat)]
+        errors = [error for run in runs for error in run['errors']]
+        timings = np.array([run['ms'] for run in runs if run['ms'] is not None])
+        key = f"startup.{page}"
+        if errors or not len(timings):
+            results[key] = {'error': str(errors[0]) if errors else "keine Messung"}
+            log(f"{key}: Fehler {results[key]['error']}")
+            failed.append(page)
+            continue
+
+        budget = budget_for(page, default_budget)
+        results[key] = {
+            'runs': len(timings),
+            'median_ms': round(float(np.median(timings)), 3),
+            'max_ms': round(float(timings.max()), 3),
+            'budget_ms': budget,
+            'imported': runs[0]['imported'],
+        }
+        over = results[key]['median_ms'] > budget
+        if over:
+            over_budget.append(page)
+        log(f"{key:<50} p50 {results[key]['median_ms']:>8.1f} ms   Budget {budget:>6} ms"
+            f"{'   ÜBER BUDGET' if over else ''}")
+
+    report = {
+        'meta': {
+            'created_at': datetime.now().isoformat(),
+            'commit': git_commit(),
+            'database': os.path.abspath(db_path),
+            'repeat': repeat,
+            'python': sys.version.split()[0],
+        },
+        'results': results,
+    }
+    return report, over_budget, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kaltstartzeit der Seiten gegen ein Budget prüfen")
+    parser.add_argument("--db", help="Datenbank, z.B. aus benchmarks.generate")
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_MS, help="Standardbudget je Seite in ms")
+    parser.add_argument("--only", default=None, help="Nur Seiten, deren Name diesen Text enthält")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        # Streamlit vorab laden: gemessen wird nur, was die Seite zusätzlich braucht
+        import streamlit  # noqa: F401
+        from streamlit.testing.v1 import AppTest  # noqa: F401
+        print(json.dumps(measure_once(args.child)))
+        return 0
+
+    if not args.db or not os.path.exists(args.db):
+        parser.error("--db: Datenbank nicht gefunden")
+
+    report, over_budget, failed = run(os.path.abspath(args.db), args.repeat, args.budget, args.only)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Report geschrieben: {args.out}")
+    print(f"{len(over_budget)} Seite(n) über Budget, {len(failed)} Seite(n) mit Fehler")
+    return 1 if over_budget or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
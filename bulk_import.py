@@ -0,0 +1,362 @@
+import argparse
+import codecs
+import csv
+import io
+import os
+import sys
+import uuid
+from datetime import date, datetime
+
+from db import INSERT_LOCATION_SQL, insert_history_many, transaction
+from geocoding import geocode_many, normalize
+from migrations import index_new_locations
+
+# Massenimport von Standorten aus CSV- oder XLSX-Dateien.
+# Die Datei wird zeilenweise gelesen und in Blöcken von CHUNK_SIZE Zeilen verarbeitet:
+# prüfen, fehlende Koordinaten gesammelt geocodieren, locations und workflow_history
+# per executemany in einer Transaktion je Block schreiben. Fehlerhafte Zeilen werden
+# mit Zeilennummer gemeldet und übersprungen, alle anderen importiert.
+# Aufruf: python -m bulk_import standorte.csv [--dry-run] [--errors fehler.csv]
+
+CHUNK_SIZE = 500
+
+VERMARKTUNGSFORMEN = ["Digitale Säule", "Roadside-Screen", "City-Screen", "MegaVision", "SuperMotion"]
+SEITEN = ["einseitig", "doppelseitig", "dreiseitig"]
+EIGENTUEMER = ["Privater Eigentümer", "Stadt"]
+
+REQUIRED = ["erfasser", "standort", "stadt", "vermarktungsform", "seiten"]
+
+# Erlaubte Spaltenüberschriften (normalisiert) -> Feld; u.a. die Überschriften des Dashboard-CSV-Exports
+COLUMN_ALIASES = {
+    "erfasser": "erfasser", "name": "erfasser", "name des erfassers": "erfasser",
+    "datum": "datum", "datum der akquisition": "datum",
+    "standort": "standort", "standortbezeichnung": "standort", "strasse": "standort", "str": "standort",
+    "stadt": "stadt", "ort": "stadt",
+    "plz": "plz", "postleitzahl": "plz",
+    "lat": "lat", "latitude": "lat", "breitengrad": "lat",
+    "lng": "lng", "lon": "lng", "longitude": "lng", "laengengrad": "lng",
+    "leistungswert": "leistungswert",
+    "eigentuemer": "eigentuemer",
+    "umruestung": "umruestung", "art": "umruestung",
+    "alte nummer": "alte_nummer", "alte_nummer": "alte_nummer", "alte werbetraegernummer": "alte_nummer",
+    "seiten": "seiten", "seitenanzahl": "seiten",
+    "vermarktungsform": "vermarktungsform",
+}
+
+TRUE_VALUES = {"umruestung", "ja", "j", "true", "wahr", "1", "x"}
+FALSE_VALUES = {"neustandort", "nein", "n", "false", "falsch", "0", ""}
+
+TEMPLATE_COLUMNS = [
+    "erfasser", "datum", "standort", "plz", "stadt", "lat", "lng", "leistungswert",
+    "eigentuemer", "umruestung", "alte_nummer", "seiten", "vermarktungsform",
+]
+
+
+def _column(header):
+    return COLUMN_ALIASES.get(normalize(str(header or "")).replace("_", " "), COLUMN_ALIASES.get(str(header or "")))
+
+
+def _text_stream(binary):
+    # UTF-8 (auch mit BOM) oder, für aus Excel gespeicherte CSVs, Windows-1252
+    head = binary.read(65536)
+    binary.seek(0)
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError:
+        encoding = "cp1252"
+    return io.TextIOWrapper(binary, encoding=encoding, newline="")
+
+
+def _iter_csv(binary):
+    stream = _text_stream(binary)
+    sample = stream.read(8192)
+    stream.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=";,\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(stream, dialect)
+    yield from reader
+
+
+def _iter_xlsx(binary):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportError("Für den Import von XLSX-Dateien wird openpyxl benötigt (pip install openpyxl).")
+    # read_only: Zeilen werden beim Iterieren gelesen, nicht die ganze Mappe in den Speicher
+    workbook = load_workbook(binary, read_only=True, data_only=True)
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield ["" if value is None else value for value in row]
+    finally:
+        workbook.close()
+
+
+def iter_rows(binary, filename):
+    """
+    Liest die Datei zeilenweise.
+    Yields: (Zeilennummer in der Datei, dict Feld -> Wert) ab der ersten Datenzeile
+    """
+    rows = _iter_xlsx(binary) if filename.lower().endswith((".xlsx", ".xlsm")) else _iter_csv(binary)
+    header = next(rows, None)
+    if header is None:
+        return
+    fields = [_column(name) for name in header]
+    missing = [name for name in REQUIRED if name not in fields]
+    if missing:
+        raise ValueError(f"Pflichtspalten fehlen: {', '.join(missing)}")
+    for line_number, row in enumerate(rows, start=2):
+        if not any(str(value).strip() for value in row):
+            continue
+        yield line_number, {
+            field: value for field, value in zip(fields, row) if field is not None
+        }
+
+
+def chunked(iterable, size=CHUNK_SIZE):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _text(raw, field):
+    value = raw.get(field)
+    return "" if value is None else str(value).strip()
+
+
+def _choice(value, options):
+    # Groß-/Kleinschreibung und Umlaut-Schreibweisen tolerieren, gespeichert wird die kanonische Form
+    for option in options:
+        if normalize(value) == normalize(option):
+            return option
+    return None
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    value = str(value).strip()
+    if not value:
+        return date.today().isoformat()
+    for pattern in ("%Y-%m-%d", "%d.%m.%Y", "%d.%m.%y"):
+        try:
+            return datetime.strptime(value, pattern).date().isoformat()
+        except ValueError:
+            pass
+    return None
+
+
+def _parse_coordinate(value, limit):
+    if value is None or str(value).strip() == "":
+        return None, None
+    try:
+        number = float(str(value).strip().replace(",", "."))
+    except ValueError:
+        return None, f"ungültige Koordinate '{value}'"
+    if not -limit <= number <= limit:
+        return None, f"Koordinate {number} außerhalb von ±{limit}"
+    return number, None
+
+
+def validate_row(raw):
+    """
+    Prüft eine Zeile mit denselben Regeln wie das Erfassungsformular.
+    Returns: (Datensatz als dict, Liste der Fehlermeldungen)
+    """
+    errors = [f"Pflichtfeld '{field}' fehlt" for field in REQUIRED if not _text(raw, field)]
+
+    vermarktungsform = _choice(_text(raw, "vermarktungsform"), VERMARKTUNGSFORMEN)
+    if _text(raw, "vermarktungsform") and vermarktungsform is None:
+        errors.append(f"unbekannte Vermarktungsform '{_text(raw, 'vermarktungsform')}'")
+    seiten = _choice(_text(raw, "seiten"), SEITEN)
+    if _text(raw, "seiten") and seiten is None:
+        errors.append(f"ungültige Seitenanzahl '{_text(raw, 'seiten')}'")
+    if seiten == "dreiseitig" and vermarktungsform and vermarktungsform != "Digitale Säule":
+        errors.append("dreiseitig ist nur bei der Digitalen Säule möglich")
+
+    umruestung_text = normalize(_text(raw, "umruestung"))
+    if umruestung_text in TRUE_VALUES:
+        umruestung = True
+    elif umruestung_text in FALSE_VALUES:
+        umruestung = False
+    else:
+        umruestung = False
+        errors.append(f"Umrüstung '{_text(raw, 'umruestung')}' nicht erkannt (Neustandort/Umrüstung)")
+    alte_nummer = _text(raw, "alte_nummer")
+    if umruestung and not alte_nummer:
+        errors.append("bei Umrüstung ist die alte Werbeträgernummer Pflicht")
+
+    datum = _parse_date(raw.get("datum") or "")
+    if datum is None:
+        errors.append(f"ungültiges Datum '{_text(raw, 'datum')}'")
+
+    lat, lat_error = _parse_coordinate(raw.get("lat"), 90)
+    lng, lng_error = _parse_coordinate(raw.get("lng"), 180)
+    errors += [error for error in (lat_error, lng_error) if error]
+    if (lat is None) != (lng is None) and not (lat_error or lng_error):
+        errors.append("Breiten- und Längengrad nur gemeinsam angeben")
+
+    record = {
+        'erfasser': _text(raw, "erfasser"),
+        'datum': datum,
+        'standort': _text(raw, "standort"),
+        'plz': _text(raw, "plz"),
+        'stadt': _text(raw, "stadt"),
+        'lat': lat,
+        'lng': lng,
+        'leistungswert': _text(raw, "leistungswert"),
+        'eigentuemer': _choice(_text(raw, "eigentuemer"), EIGENTUEMER) or "Privater Eigentümer",
+        'umruestung': umruestung,
+        'alte_nummer': alte_nummer,
+        'seiten': seiten,
+        'vermarktungsform': vermarktungsform,
+    }
+    return record, errors
+
+
+def address_of(record):
+    postcode = f"{record['plz']} " if record['plz'] else ""
+    return f"{record['standort']}, {postcode}{record['stadt']}, Deutschland"
+
+
+def _insert_chunk(records, created_at):
+    # Ein Block = eine Transaktion; executemany statt einzelner INSERTs je Standort
+    location_rows = []
+    history_rows = []
+    for record in records:
+        location_id = str(uuid.uuid4())
+        record['id'] = location_id
+        location_rows.append((
+            location_id, record['erfasser'], record['datum'], record['standort'], record['stadt'],
+            record['lat'], record['lng'], record['leistungswert'], record['eigentuemer'],
+            record['umruestung'], record['alte_nummer'], record['seiten'], record['vermarktungsform'],
+            "active", "leiter_akquisition", created_at
+        ))
+        history_rows.append((
+            location_id, "erfassung", "completed", "Standort per Massenimport erfasst", record['erfasser']
+        ))
+    with transaction(immediate=True) as conn:
+        # Volltext-Trigger für den Block aussetzen und locations_fts danach in einer Anweisung füllen,
+        # statt jeden Standort beim Einfügen und für seinen Kommentar erneut zu indexieren (Migration 13)
+        after_rowid = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM locations").fetchone()[0]
+        conn.execute("INSERT INTO fts_suspended (id) VALUES (1)")
+        conn.executemany(INSERT_LOCATION_SQL, location_rows)
+        insert_history_many(conn, history_rows, created_at)
+        conn.execute("DELETE FROM fts_suspended")
+        index_new_locations(conn, after_rowid)
+
+
+def import_file(binary, filename, dry_run=False, geocoders=None, chunk_size=CHUNK_SIZE, progress=None,
+                allow_city=False):
+    """
+    Importiert alle gültigen Zeilen einer CSV-/XLSX-Datei (binär geöffnet).
+    dry_run: nur prüfen und geocodieren, nichts schreiben (auch nicht in geocode_cache)
+    progress: optionaler Callback progress(bisher gelesene Zeilen)
+    allow_city: Zeilen, deren Adresse nur auf den Stadtmittelpunkt aufgelöst wird, mit Hinweis
+    importieren statt als Fehler melden (sonst lägen alle Standorte einer Stadt auf einem Punkt)
+    Returns: dict mit imported, ids, errors [(Zeile, Meldung)], warnings [(Zeile, Meldung)]
+    """
+    result = {'rows': 0, 'imported': 0, 'ids': [], 'errors': [], 'warnings': []}
+    for chunk in chunked(iter_rows(binary, filename), chunk_size):
+        valid = []
+        for line_number, raw in chunk:
+            record, errors = validate_row(raw)
+            if errors:
+                result['errors'] += [(line_number, error) for error in errors]
+            else:
+                valid.append((line_number, record))
+
+        # Fehlende Koordinaten für den ganzen Block auf einmal über den Geocoding-Cache auflösen
+        missing = [address_of(record) for _, record in valid if record['lat'] is None]
+        coordinates = geocode_many(missing, geocoders, persist=not dry_run) if missing else {}
+        records = []
+        for line_number, record in valid:
+            if record['lat'] is None:
+                hit = coordinates.get(address_of(record))
+                if hit is None:
+                    result['errors'].append((line_number, f"keine Koordinaten für '{address_of(record)}' gefunden"))
+                    continue
+                if hit['precision'] == "stadt":
+                    if not allow_city:
+                        result['errors'].append((
+                            line_number, f"nur Stadtmittelpunkt für '{address_of(record)}' gefunden, lat/lng angeben"
+                        ))
+                        continue
+                    result['warnings'].append((line_number, "nur Stadtmittelpunkt gefunden, Koordinaten prüfen"))
+                record['lat'], record['lng'] = hit['lat'], hit['lng']
+            records.append(record)
+
+        if records and not dry_run:
+            _insert_chunk(records, datetime.now().isoformat())
+            result['ids'] += [record['id'] for record in records]
+        result['imported'] += len(records)
+        result['rows'] += len(chunk)
+        if progress is not None:
+            progress(result['rows'])
+    return result
+
+
+def template_csv():
+    # Leere Vorlage mit Beispielzeile für den Download auf der Importseite
+    out = io.StringIO()
+    writer = csv.writer(out, delimiter=";")
+    writer.writerow(TEMPLATE_COLUMNS)
+    writer.writerow([
+        "Max Mustermann", date.today().isoformat(), "Hauptstraße 1", "50667", "Köln", "", "",
+        "85", "Stadt", "Neustandort", "", "doppelseitig", "Digitale Säule",
+    ])
+    return out.getvalue()
+
+
+def errors_csv(errors):
+    out = io.StringIO()
+    writer = csv.writer(out, delimiter=";")
+    writer.writerow(["zeile", "fehler"])
+    writer.writerows(errors)
+    return out.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Standorte aus CSV/XLSX importieren")
+    parser.add_argument("file")
+    parser.add_argument("--dry-run", action="store_true", help="Nur prüfen, nichts speichern")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--geocoders", default=None, help="z.B. 'gazetteer' für einen Import ohne Netzwerk")
+    parser.add_argument("--errors", default=None, help="Fehlerliste als CSV schreiben")
+    parser.add_argument("--allow-city", action="store_true", help="Stadtmittelpunkt als Koordinaten zulassen")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.file):
+        parser.error(f"Datei {args.file} nicht gefunden")
+
+    geocoders = args.geocoders.split(",") if args.geocoders else None
+    with open(args.file, "rb") as f:
+        result = import_file(
+            f, args.file, args.dry_run, geocoders, args.chunk_size,
+            progress=lambda rows: print(f"{rows} Zeilen verarbeitet", file=sys.stderr),
+            allow_city=args.allow_city
+        )
+
+    for line_number, message in result['warnings']:
+        print(f"Zeile {line_number}: Hinweis: {message}")
+    for line_number, message in result['errors']:
+        print(f"Zeile {line_number}: {message}")
+    if args.errors:
+        with open(args.errors, "w", encoding="utf-8", newline="") as f:
+            f.write(errors_csv(result['errors']))
+    verb = "gültig (Trockenlauf)" if args.dry_run else "importiert"
+    print(f"{result['imported']} von {result['rows']} Zeilen {verb}, {len(result['errors'])} Fehler")
+    return 1 if result['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+import os
+import sqlite3
+import threading
+import uuid
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+from indexes import ensure_indexes, check_query_plans, register_hot_query
+from migrations import migrate
+from query_stats import connection_factory
+
+# Pfad zur Datenbank (kann für Tests/Benchmarks per Umgebungsvariable überschrieben werden)
+DB_PATH = os.environ.get("WERBETRAEGER_DB", "werbetraeger.db")
+
+# Pragmas, die einmalig pro Verbindung gesetzt werden
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+)
+
+# Maximale Anzahl ungenutzter Verbindungen, die im Pool gehalten werden
+MAX_IDLE_CONNECTIONS = 8
+
+# Maximale Anzahl Ergebnisse im prozessweiten Query-Cache
+QUERY_CACHE_SIZE = 256
+
+# Spalten, die von den Arbeitslisten der Prozessschritte geladen werden
+WORKLIST_COLUMNS = [
+    'id', 'erfasser', 'datum', 'standort', 'stadt', 'lat', 'lng', 'leistungswert',
+    'eigentuemer', 'umruestung', 'alte_nummer', 'seiten', 'vermarktungsform',
+    'created_at', 'ist_date'
+]
+
+HISTORY_COLUMNS = ['Schritt', 'Status', 'Kommentar', 'Benutzer', 'Zeitstempel']
+
+STEP_LOCATIONS_SQL = f'''
+    SELECT {", ".join(WORKLIST_COLUMNS)}
+    FROM locations
+    WHERE status = 'active' AND current_step = ?
+    ORDER BY COALESCE(created_at, '') DESC
+'''
+
+ALL_STEP_LOCATIONS_SQL = f'''
+    SELECT {", ".join(WORKLIST_COLUMNS)}
+    FROM locations
+    WHERE current_step = ?
+    ORDER BY COALESCE(created_at, '') DESC
+'''
+
+LOCATION_DETAILS_SQL = 'SELECT * FROM locations WHERE id = ?'
+
+# Neuer Standort (Erfassung und Massenimport)
+INSERT_LOCATION_SQL = '''
+INSERT INTO locations (id, erfasser, datum, standort, stadt, lat, lng,
+                      leistungswert, eigentuemer, umruestung, alte_nummer,
+                      seiten, vermarktungsform, status, current_step, created_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+INSERT_HISTORY_SQL = 'INSERT INTO workflow_history VALUES (?, ?, ?, ?, ?, ?, ?)'
+
+HISTORY_SQL = '''
+    SELECT step, status, comment, user, timestamp
+    FROM workflow_history
+    WHERE location_id = ?
+    ORDER BY timestamp ASC
+'''
+
+register_hot_query("worklist", STEP_LOCATIONS_SQL, ("baurecht",))
+register_hot_query("worklist_all_status", ALL_STEP_LOCATIONS_SQL, ("niederlassungsleiter",))
+register_hot_query("location_details", LOCATION_DETAILS_SQL, ("",))
+register_hot_query("workflow_history", HISTORY_SQL, ("",))
+
+_local = threading.local()
+_idle = []
+_pool_lock = threading.Lock()
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+# Query-Cache: (SQL, Parameter) -> (write_sequence bei Ausführung, Spaltennamen, Zeilen)
+_query_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _open_connection():
+    # isolation_level=None: Transaktionen werden explizit über transaction() gesteuert,
+    # die Connection-Klasse misst die Laufzeit jedes Statements (query_stats.py)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None, factory=connection_factory())
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    _ensure_schema(conn)
+    return conn
+
+
+def _ensure_schema(conn):
+    # Migrationen, Indizes und Query-Plan-Check laufen einmal pro Prozess, nicht bei jedem Seitenaufruf
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if not _schema_ready:
+            migrate(conn)
+            ensure_indexes(conn)
+            check_query_plans(conn, get_connection)
+            _schema_ready = True
+
+
+def _release(conn):
+    # Verbindung eines beendeten Threads zurück in den Pool legen
+    with _pool_lock:
+        if len(_idle) < MAX_IDLE_CONNECTIONS:
+            _idle.append(conn)
+            return
+    conn.close()
+
+
+def get_connection():
+    """
+    Liefert die Verbindung des aktuellen Threads aus dem prozessweiten Pool.
+    Streamlit führt jeden Rerun in einem eigenen Thread aus; endet der Thread,
+    wird die Verbindung wiederverwendet statt neu geöffnet.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        return conn
+
+    with _pool_lock:
+        conn = _idle.pop() if _idle else None
+    if conn is None:
+        conn = _open_connection()
+
+    _local.conn = conn
+    # Handle merken, damit close_all() die Rückgabe an den Pool abmelden kann
+    _local.finalizer = weakref.finalize(threading.current_thread(), _release, conn)
+    return conn
+
+
+def close_all():
+    # Alle ungenutzten Verbindungen schließen (z.B. am Ende eines Benchmarks)
+    with _pool_lock:
+        while _idle:
+            _idle.pop().close()
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        # Sonst legt das Thread-Ende die geschlossene Verbindung zurück in den Pool
+        _local.finalizer.detach()
+        conn.close()
+        _local.conn = None
+
+
+@contextmanager
+def transaction(immediate=False):
+    """
+    Führt den Block in einer Transaktion aus und committet am Ende.
+    Bei einer Exception wird zurückgerollt.
+    """
+    conn = get_connection()
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def query_all(sql: str, params=()) -> list:
+    return get_connection().execute(sql, params).fetchall()
+
+
+def query_one(sql: str, params=()):
+    return get_connection().execute(sql, params).fetchone()
+
+
+def query_scalar(sql: str, params=()):
+    row = query_one(sql, params)
+    return row[0] if row else None
+
+
+def write_sequence() -> int:
+    # Änderungszähler, wird von Triggern bei jedem Schreibzugriff erhöht (Migration 6)
+    return query_scalar("SELECT seq FROM write_sequence WHERE id = 1")
+
+
+def cached_query(sql: str, params=()):
+    """
+    Führt eine lesende Query über den prozessweiten Cache aus.
+    Ein Eintrag gilt, solange sich write_sequence nicht geändert hat; jede
+    Änderung an locations, workflow_history oder images macht damit alle Einträge ungültig.
+    Die gelieferten Zeilen werden zwischen Sessions geteilt und dürfen nicht verändert werden.
+    Returns: (Spaltennamen, Zeilen)
+    """
+    conn = get_connection()
+    if conn.in_transaction:
+        # Innerhalb einer Transaktion können Zeilen noch zurückgerollt werden
+        cursor = conn.execute(sql, params)
+        return [desc[0] for desc in cursor.description], cursor.fetchall()
+
+    key = (sql, tuple(params))
+    seq = write_sequence()
+    with _cache_lock:
+        entry = _query_cache.get(key)
+        if entry is not None and entry[0] == seq:
+            _query_cache.move_to_end(key)
+            return entry[1], entry[2]
+
+    # seq wird vor der Query gelesen: ein zwischenzeitlicher Schreibzugriff
+    # führt höchstens zu einem unnötigen Cache-Miss, nie zu veralteten Daten
+    cursor = conn.execute(sql, params)
+    columns = [desc[0] for desc in cursor.description]
+    rows = cursor.fetchall()
+    with _cache_lock:
+        _query_cache[key] = (seq, columns, rows)
+        _query_cache.move_to_end(key)
+        while len(_query_cache) > QUERY_CACHE_SIZE:
+            _query_cache.popitem(last=False)
+    return columns, rows
+
+
+def cached_query_all(sql: str, params=()) -> list:
+    return cached_query(sql, params)[1]
+
+
+def clear_query_cache():
+    with _cache_lock:
+        _query_cache.clear()
+
+
+def format_location_frame(df: pd.DataFrame) -> pd.DataFrame:
+    df['umruestung'] = df['umruestung'].map(lambda x: 'Umrüstung' if x else 'Neustandort')
+    df['eigentuemer'] = df['eigentuemer'].map(lambda x: 'Stadt' if x == 'Stadt' else 'Privat')
+    return df
+
+
+# Funktion zum Laden aller Standorte, die in einem Prozessschritt warten
+def load_step_locations(step: str, active_only: bool = True) -> pd.DataFrame:
+    rows = cached_query_all(STEP_LOCATIONS_SQL if active_only else ALL_STEP_LOCATIONS_SQL, (step,))
+
+    if not rows:
+        return pd.DataFrame()
+
+    return format_location_frame(pd.DataFrame(rows, columns=WORKLIST_COLUMNS))
+
+
+# Funktion zum Laden eines spezifischen Standorts mit allen Details
+def load_location_details(location_id: str) -> dict | None:
+    columns, rows = cached_query(LOCATION_DETAILS_SQL, (location_id,))
+
+    if not rows:
+        return None
+
+    location_dict = dict(zip(columns, rows[0]))
+    location_dict['eigentuemer'] = 'Stadt' if location_dict.get('eigentuemer') == 'Stadt' else 'Privat'
+    location_dict['umruestung'] = 'Umrüstung' if location_dict.get('umruestung') else 'Neustandort'
+    return location_dict
+
+
+# Funktion zum Laden der Historie eines Standorts
+def load_workflow_history(location_id: str) -> pd.DataFrame:
+    rows = cached_query_all(HISTORY_SQL, (location_id,))
+
+    if not rows:
+        return pd.DataFrame()
+
+    return pd.DataFrame(rows, columns=HISTORY_COLUMNS)
+
+
+def load_marketing_forms() -> list:
+    rows = cached_query_all('SELECT DISTINCT vermarktungsform FROM locations')
+    return [form[0] for form in rows if form[0] is not None]
+
+
+# Workflow-History-Einträge innerhalb einer laufenden Transaktion erstellen; alle Schreibzugriffe auf
+# workflow_history (Erfassung, workflow.py, Massenimport) laufen über diese Funktion.
+# entries: Liste von (location_id, step, status, comment, user), alle mit demselben Zeitstempel
+def insert_history_many(conn, entries, timestamp: str | None = None) -> list:
+    timestamp = timestamp or datetime.now().isoformat()
+    rows = [(str(uuid.uuid4()), *entry, timestamp) for entry in entries]
+    conn.executemany(INSERT_HISTORY_SQL, rows)
+    return [row[0] for row in rows]
+
+
+def insert_history(conn, location_id: str, step: str, status: str, comment: str, user: str,
+                   timestamp: str | None = None) -> str:
+    return insert_history_many(conn, [(location_id, step, status, comment, user)], timestamp)[0]
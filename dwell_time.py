@@ -0,0 +1,59 @@
+import pandas as pd
+
+from aggregates import build_filter
+from db import cached_query_all
+from indexes import register_hot_query
+
+# Historie einmal je Standort in zeitlicher Reihenfolge durchlaufen:
+# die Dauer eines Eintrags ist die Zeit seit dem vorherigen Eintrag desselben Standorts,
+# also die Zeit, die der Standort im Schritt dieses Eintrags verbracht hat.
+STEP_EVENTS_SQL = '''
+    SELECT location_id, step, status, julianday(timestamp) AS tag,
+           julianday(timestamp) - julianday(
+               LAG(timestamp) OVER (PARTITION BY location_id ORDER BY timestamp)
+           ) AS tage
+    FROM workflow_history{where}
+'''
+
+EVENT_COLUMNS = ['location_id', 'step', 'status', 'tag', 'tage']
+
+# Schritt, mit dem ein Standort startet bzw. abgeschlossen wird (Namen wie in workflow_history)
+START_STEP = 'erfassung'
+END_STEP = 'fertigstellung'
+
+register_hot_query("dwell_time_events", STEP_EVENTS_SQL.format(where=""))
+
+
+# Alle Historien-Einträge mit ihrer Verweildauer laden, optional gefiltert wie das Dashboard
+def load_step_events(created_after=None, forms=None) -> pd.DataFrame:
+    location_where, params = build_filter(created_after, forms)
+    where = f" WHERE location_id IN (SELECT id FROM locations{location_where})" if location_where else ""
+    rows = cached_query_all(STEP_EVENTS_SQL.format(where=where), params)
+    return pd.DataFrame(rows, columns=EVENT_COLUMNS)
+
+
+def step_duration_stats(events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Verteilung der Verweildauer je Schritt in Tagen.
+    Mehrere Einträge desselben Schritts (z.B. Bauantrag eingereicht und entschieden)
+    werden je Standort aufsummiert.
+    Returns: DataFrame mit step, anzahl, mittelwert, median, p90
+    """
+    durations = events.dropna(subset=['tage'])
+    per_location = durations.groupby(['step', 'location_id'], sort=False)['tage'].sum()
+    stats = per_location.groupby(level='step', sort=False).agg(
+        anzahl='count',
+        mittelwert='mean',
+        median='median',
+        p90=lambda values: values.quantile(0.9),
+    )
+    return stats.round(1).reset_index()
+
+
+# Gesamtdauer je abgeschlossenem Standort von der Erfassung bis zur Fertigstellung in Tagen
+def total_durations(events: pd.DataFrame) -> pd.Series:
+    is_start = events['step'] == START_STEP
+    is_end = (events['step'] == END_STEP) & (events['status'] == 'completed')
+    start = events.loc[is_start].groupby('location_id')['tag'].min()
+    end = events.loc[is_end].groupby('location_id')['tag'].max()
+    return (end - start).dropna().rename('tage')
@@ -0,0 +1,184 @@
+import hashlib
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Kennzahlen je kW Leistungswert und Standardwerte für Standorte ohne Leistungswert
+INVEST_PER_KW = 60
+INVEST_DEFAULT = 60000
+REVENUE_PER_KW = 25
+REVENUE_DEFAULT = 25000
+OPEX_PER_KW = 8
+OPEX_DEFAULT = 8000
+
+# Kapitalwert: Diskontierung über die Laufzeit in Jahren
+DISCOUNT_RATE = 0.05
+YEARS = 10
+
+# Strategischer Wert: Basis plus je bis zu 2 Punkte für ROI und Leistungswert
+STRATEGIC_BASE = 5
+STRATEGIC_MAX_BONUS = 2
+STRATEGIC_ROI_DIVISOR = 15
+STRATEGIC_POWER_DIVISOR = 2000
+
+KPI_COLUMNS = [
+    'investitionskosten', 'jaehrliche_einnahmen', 'jaehrliche_betriebskosten',
+    'jaehrlicher_gewinn', 'roi', 'amortisationszeit', 'npv', 'strategischer_wert'
+]
+
+
+def annuity_factor(rate: float = DISCOUNT_RATE, years: int = YEARS) -> float:
+    # Barwert einer jährlichen Zahlung von 1 über die Laufzeit: (1 - (1 + r)^-n) / r
+    if rate == 0:
+        return float(years)
+    return (1 - (1 + rate) ** -years) / rate
+
+
+def _per_kw(power: np.ndarray, per_kw: float, default: float) -> np.ndarray:
+    return np.where(power > 0, power * per_kw, default)
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    # Division nur dort, wo mask gilt; sonst 0 (keine Warnungen bei Division durch 0)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator, dtype=float), where=mask)
+
+
+def _missing(df: pd.DataFrame, column: str) -> bool:
+    return column not in df.columns or df[column].isna().all()
+
+
+def add_financial_kpis(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ergänzt die Wirtschaftlichkeitskennzahlen je Standort, vollständig vektorisiert.
+    Bereits vorhandene Kennzahl-Spalten werden übernommen, fehlende aus dem Leistungswert abgeleitet.
+    Returns: df mit den Spalten aus KPI_COLUMNS (numerisch, Formatierung erfolgt in der Anzeige)
+    """
+    if 'leistungswert' in df.columns:
+        df['leistungswert'] = pd.to_numeric(df['leistungswert'], errors='coerce').fillna(0)
+        power = df['leistungswert'].to_numpy(dtype=float)
+    else:
+        power = np.zeros(len(df))
+
+    if 'investitionskosten' not in df.columns:
+        df['investitionskosten'] = _per_kw(power, INVEST_PER_KW, INVEST_DEFAULT)
+    if 'jaehrliche_einnahmen' not in df.columns:
+        df['jaehrliche_einnahmen'] = _per_kw(power, REVENUE_PER_KW, REVENUE_DEFAULT)
+    if 'jaehrliche_betriebskosten' not in df.columns:
+        df['jaehrliche_betriebskosten'] = _per_kw(power, OPEX_PER_KW, OPEX_DEFAULT)
+
+    invest = df['investitionskosten'].to_numpy(dtype=float)
+    profit = df['jaehrliche_einnahmen'].to_numpy(dtype=float) - df['jaehrliche_betriebskosten'].to_numpy(dtype=float)
+    df['jaehrlicher_gewinn'] = profit
+
+    if _missing(df, 'roi'):
+        roi = _safe_divide(profit, invest, invest != 0) * 100
+        df['roi'] = np.round(roi, 2)
+    if _missing(df, 'amortisationszeit'):
+        df['amortisationszeit'] = np.round(_safe_divide(invest, profit, profit > 0), 1)
+    if _missing(df, 'npv'):
+        df['npv'] = np.round(profit * annuity_factor() - invest)
+    if _missing(df, 'strategischer_wert'):
+        roi = np.nan_to_num(df['roi'].to_numpy(dtype=float))
+        value = (
+            STRATEGIC_BASE
+            + np.clip(roi / STRATEGIC_ROI_DIVISOR, 0, STRATEGIC_MAX_BONUS)
+            + np.clip(power / STRATEGIC_POWER_DIVISOR, 0, STRATEGIC_MAX_BONUS)
+        )
+        df['strategischer_wert'] = np.clip(np.round(value, 1), 1, 10)
+    return df
+
+
+# CEO-Wirtschaftlichkeitsmodell für Digitale Säulen:
+# simulierte, aber je Standort reproduzierbare Kennzahlen (Seed aus der Standort-ID)
+CEO_DISCOUNT_RATE = 0.08
+CEO_GROWTH_RATE = 0.02
+CEO_YEARS = 10
+CEO_CACHE_SIZE = 4096
+
+CEO_METRIC_COLUMNS = [
+    'investment', 'annual_revenue', 'operating_costs', 'annual_profit', 'roi', 'payback_period', 'npv'
+]
+
+SIDES = {'doppelseitig': 2, 'dreiseitig': 3}
+
+
+def growing_annuity_factor(rate: float, growth: float, years: int) -> float:
+    # Barwert von Zahlungen 1, (1 + g), (1 + g)^2, ... am Ende der Jahre 1..n
+    if np.isclose(rate, growth):
+        return years / (1 + rate)
+    return (1 - ((1 + growth) / (1 + rate)) ** years) / (rate - growth)
+
+
+def _location_seed(location_id: str) -> int:
+    digest = hashlib.md5(str(location_id).encode()).hexdigest()
+    return int(digest[:8], 16) % (2**32 - 1)
+
+
+@lru_cache(maxsize=CEO_CACHE_SIZE)
+def _random_inputs(location_id: str) -> tuple:
+    # Eigener Generator je Standort, der globale Zustand von np.random bleibt unberührt
+    rng = np.random.default_rng(_location_seed(location_id))
+    investment = rng.integers(20000, 35000)
+    revenue_per_side = rng.integers(2000, 4000)
+    operating_share = rng.uniform(0.4, 0.5)
+    return int(investment), int(revenue_per_side), float(operating_share)
+
+
+def score_locations(locations: pd.DataFrame, discount_rate: float = CEO_DISCOUNT_RATE,
+                    growth_rate: float = CEO_GROWTH_RATE, years: int = CEO_YEARS) -> pd.DataFrame:
+    """
+    Berechnet das CEO-Wirtschaftlichkeitsmodell für beliebig viele Standorte in einem Aufruf.
+    locations: DataFrame mit id, seiten, eigentuemer und leistungswert
+    Returns: DataFrame mit id und den Spalten aus CEO_METRIC_COLUMNS
+    """
+    ids = locations['id'].astype(str)
+    inputs = np.array([_random_inputs(location_id) for location_id in ids], dtype=float).reshape(-1, 3)
+    investment, revenue_per_side, operating_share = inputs.T
+
+    sides = locations['seiten'].map(SIDES).fillna(1).to_numpy(dtype=float)
+    power = pd.to_numeric(locations['leistungswert'], errors='coerce').fillna(0).to_numpy(dtype=float)
+
+    # Städtische Standorte haben bessere Performance, Leistungswert mit reduziertem Einfluss
+    revenue_factor = np.where(locations['eigentuemer'].to_numpy() == 'Stadt', 1.15, 1.0)
+    revenue_factor = revenue_factor * np.where(power > 0, 1 + power / 200, 1.0)
+
+    annual_revenue = revenue_per_side * sides * revenue_factor
+    operating_costs = annual_revenue * operating_share
+    annual_profit = annual_revenue - operating_costs
+
+    # Gewinn steigt jährlich um growth_rate, diskontiert mit discount_rate
+    npv = annual_profit * growing_annuity_factor(discount_rate, growth_rate, years) - investment
+
+    return pd.DataFrame({
+        'id': ids.to_numpy(),
+        'investment': investment.astype(int),
+        'annual_revenue': annual_revenue,
+        'operating_costs': operating_costs,
+        'annual_profit': annual_profit,
+        'roi': _safe_divide(annual_profit, investment, investment != 0) * 100,
+        'payback_period': _safe_divide(investment, annual_profit, annual_profit > 0),
+        'npv': npv,
+    })
+
+
+@lru_cache(maxsize=CEO_CACHE_SIZE)
+def _ceo_metrics(location_id, seiten, eigentuemer, leistungswert, discount_rate, growth_rate, years) -> tuple:
+    frame = pd.DataFrame({
+        'id': [location_id], 'seiten': [seiten], 'eigentuemer': [eigentuemer], 'leistungswert': [leistungswert]
+    })
+    row = score_locations(frame, discount_rate, growth_rate, years).iloc[0]
+    return tuple(row[column].item() for column in CEO_METRIC_COLUMNS)
+
+
+def calculate_financial_metrics(location: dict, discount_rate: float = CEO_DISCOUNT_RATE,
+                                growth_rate: float = CEO_GROWTH_RATE, years: int = CEO_YEARS) -> dict:
+    """
+    Kennzahlen eines einzelnen Standorts, gecacht je Standort und Modellparametern.
+    Returns: dict mit den Schlüsseln aus CEO_METRIC_COLUMNS
+    """
+    values = _ceo_metrics(
+        location['id'], location.get('seiten'), location.get('eigentuemer'),
+        location.get('leistungswert'), discount_rate, growth_rate, years
+    )
+    return dict(zip(CEO_METRIC_COLUMNS, values))
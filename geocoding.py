@@ -0,0 +1,372 @@
+import argparse
+import csv
+import os
+import re
+import sys
+import unicodedata
+from collections import defaultdict
+from datetime import datetime
+from functools import lru_cache
+from statistics import median
+
+from db import query_all, query_one, transaction
+
+# Geocoding mit persistentem Cache und austauschbaren Backends.
+# Reihenfolge: geocode_cache (Migration 7) -> Backends in GEOCODERS-Reihenfolge.
+# Standard ist der lokale Gazetteer (Straßen-/PLZ-/Stadtmittelpunkte aus einer CSV-Datei)
+# und Nominatim (OpenStreetMap) nur als Fallback. Ohne Netz: WERBETRAEGER_GEOCODERS=gazetteer
+
+GAZETTEER_PATH = os.environ.get(
+    "WERBETRAEGER_GAZETTEER", os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer.csv")
+)
+GEOCODERS = os.environ.get("WERBETRAEGER_GEOCODERS", "gazetteer,nominatim").split(",")
+
+NOMINATIM_USER_AGENT = "stroer_digital_saeule"
+NOMINATIM_TIMEOUT = 10
+# Nutzungsrichtlinie von Nominatim: höchstens eine Anfrage pro Sekunde (auch über alle Sitzungen hinweg)
+NOMINATIM_MIN_DELAY = 1.0
+
+# Genauigkeit der Treffer, aufsteigend. Treffer unterhalb von ACCEPT_PRECISION (z.B. nur Stadtmitte)
+# werden erst zurückgegeben, wenn kein weiteres Backend etwas Genaueres liefert, und nicht gecacht.
+PRECISIONS = ["stadt", "plz", "strasse", "adresse"]
+ACCEPT_PRECISION = "plz"
+
+STORE_SQL = (
+    "INSERT OR REPLACE INTO geocode_cache "
+    "(address_key, address, lat, lng, display_name, source, precision, created_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+# Obergrenze der Platzhalter je IN (...)-Abfrage
+LOOKUP_CHUNK = 500
+
+COUNTRY_NAMES = {"deutschland", "germany", "de", "brd"}
+
+# Typische Adressen, die ohne Netzwerk mindestens mit ACCEPT_PRECISION aufgelöst werden müssen (--check)
+CHECK_ADDRESSES = [
+    "Königsallee 1, 40212 Düsseldorf, Deutschland",
+    "Hauptstraße 1, 50667 Köln, Deutschland",
+    "Unter den Linden 1, 10117 Berlin",
+    "Marienplatz 1, 80331 München",
+]
+
+_UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+
+# Backend-Name -> (Lookup-Funktion address -> dict | None, Ergebnisse persistent cachen?)
+_backends = {}
+
+
+def normalize(text):
+    """Kleinschreibung, Umlaute ausgeschrieben, "Straße"/"Str." vereinheitlicht, ohne Satzzeichen."""
+    text = unicodedata.normalize("NFKC", text or "").lower().translate(_UMLAUTS)
+    text = re.sub(r"strasse\b", "str", text)
+    text = re.sub(r"str\.", "str ", text)
+    text = re.sub(r"[^\w]+", " ", text)
+    return " ".join(text.split())
+
+
+def normalize_address(address):
+    # Cache-Schlüssel: normalisierte Adressteile ohne Länderangabe
+    parts = [normalize(part) for part in address.split(",")]
+    return ", ".join(part for part in parts if part and part not in COUNTRY_NAMES)
+
+
+def parse_address(address):
+    """
+    Zerlegt "Straße Hausnummer, PLZ Stadt[, Land]" in seine Teile.
+    Returns: (Straße ohne Hausnummer, Hausnummer, PLZ, Stadt) - fehlende Teile als None
+    """
+    parts = [part.strip() for part in address.split(",")]
+    parts = [part for part in parts if part and normalize(part) not in COUNTRY_NAMES]
+    street = house_number = postcode = city = None
+
+    for index, part in enumerate(parts):
+        match = re.match(r"^(\d{5})\s*(.*)$", part)
+        if match:
+            postcode, city = match.group(1), match.group(2) or None
+            parts.pop(index)
+            break
+    if city is None and len(parts) > 1:
+        city = parts.pop()
+    elif city is None and len(parts) == 1 and postcode is None:
+        # Nur ein Teil ohne PLZ: als Stadt interpretieren
+        city = parts.pop()
+    if parts:
+        match = re.match(r"^(.*?)\s+(\d+\s*[a-zA-Z]?(?:\s*[-/]\s*\d+\s*[a-zA-Z]?)?)$", parts[0])
+        street, house_number = (match.group(1), match.group(2)) if match else (parts[0], None)
+    return street, house_number, postcode, city
+
+
+def register_backend(name, lookup, persist=True):
+    """
+    Registriert ein Geocoding-Backend. lookup(address) liefert None oder ein dict mit
+    lat, lng, display_name und precision (siehe PRECISIONS).
+    persist: Ergebnisse in geocode_cache speichern (nicht nötig für lokale Backends)
+    """
+    _backends[name] = (lookup, persist)
+
+
+@lru_cache(maxsize=4)
+def load_gazetteer(path=GAZETTEER_PATH):
+    """
+    Lädt die Gazetteer-CSV (Spalten strasse, plz, stadt, lat, lng) einmal pro Prozess.
+    Zeilen mit Straße sind Straßenmittelpunkte, mit PLZ ohne Straße PLZ-Mittelpunkte,
+    nur mit Stadt Stadtmittelpunkte.
+    Returns: (Straßen, PLZ, Städte) als dicts -> (lat, lng, Bezeichnung)
+    """
+    streets, postcodes, cities = {}, {}, {}
+    if not os.path.exists(path):
+        return streets, postcodes, cities
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            street, postcode, city = row.get("strasse") or "", row.get("plz") or "", row.get("stadt") or ""
+            point = (float(row["lat"]), float(row["lng"]))
+            if street:
+                label = f"{street}, {postcode} {city}".replace(" ,", ",").strip()
+                for area in (normalize(city), postcode):
+                    if area:
+                        streets[(normalize(street), area)] = point + (label,)
+            elif postcode:
+                postcodes[postcode] = point + (f"{postcode} {city}".strip(),)
+            elif city:
+                cities[normalize(city)] = point + (city,)
+    return streets, postcodes, cities
+
+
+def gazetteer_lookup(address):
+    streets, postcodes, cities = load_gazetteer(GAZETTEER_PATH)
+    street, _, postcode, city = parse_address(address)
+    candidates = []
+    if street:
+        candidates += [("strasse", streets.get((normalize(street), area))) for area in (normalize(city), postcode) if area]
+    if postcode:
+        candidates.append(("plz", postcodes.get(postcode)))
+    if city:
+        candidates.append(("stadt", cities.get(normalize(city))))
+    for precision, hit in candidates:
+        if hit is not None:
+            lat, lng, label = hit
+            return {'lat': lat, 'lng': lng, 'display_name': f"{label} (Gazetteer, {precision})", 'precision': precision}
+    return None
+
+
+@lru_cache(maxsize=1)
+def _nominatim_geocode():
+    # Ein gemeinsamer RateLimiter pro Prozess, damit auch parallele Sitzungen das Limit einhalten
+    from geopy.geocoders import Nominatim
+    from geopy.extra.rate_limiter import RateLimiter
+
+    return RateLimiter(
+        Nominatim(user_agent=NOMINATIM_USER_AGENT).geocode,
+        min_delay_seconds=NOMINATIM_MIN_DELAY, max_retries=0, swallow_exceptions=False
+    )
+
+
+def nominatim_lookup(address):
+    # geopy erst bei Bedarf laden (Kaltstart), Netzwerkfehler gelten als "nicht gefunden"
+    from geopy.exc import GeocoderServiceError
+
+    try:
+        location = _nominatim_geocode()(address, timeout=NOMINATIM_TIMEOUT)
+    except GeocoderServiceError:
+        return None
+    if location is None:
+        return None
+    return {
+        'lat': location.latitude,
+        'lng': location.longitude,
+        'display_name': location.raw.get('display_name', address),
+        'precision': "adresse",
+    }
+
+
+def _accepted(result):
+    return PRECISIONS.index(result['precision']) >= PRECISIONS.index(ACCEPT_PRECISION)
+
+
+def cached_lookup(address_key):
+    row = query_one(
+        "SELECT lat, lng, display_name, source, precision FROM geocode_cache WHERE address_key = ?",
+        (address_key,)
+    )
+    if row is None:
+        return None
+    return {'lat': row[0], 'lng': row[1], 'display_name': row[2], 'source': row[3], 'precision': row[4]}
+
+
+def _store_params(address, address_key, result):
+    return (address_key, address, result['lat'], result['lng'], result['display_name'],
+            result['source'], result['precision'], datetime.now().isoformat())
+
+
+def store(address, address_key, result):
+    with transaction() as conn:
+        conn.execute(STORE_SQL, _store_params(address, address_key, result))
+
+
+def geocode(address, backends=None):
+    """
+    Adresse in Geokoordinaten umwandeln: zuerst geocode_cache, dann die Backends der Reihe nach.
+    backends: Liste von Backend-Namen (Standard: GEOCODERS)
+    Returns: dict (lat, lng, display_name, source, precision) oder None
+    """
+    address_key = normalize_address(address)
+    if not address_key:
+        return None
+    cached = cached_lookup(address_key)
+    if cached is not None:
+        return cached
+
+    result, persist = _lookup_backends(address, backends)
+    if persist:
+        store(address, address_key, result)
+    return result
+
+
+def _lookup_backends(address, backends=None):
+    # Returns: (Ergebnis oder None, soll gecacht werden?)
+    fallback = None
+    for name in backends or GEOCODERS:
+        if name not in _backends:
+            continue
+        lookup, persist = _backends[name]
+        result = lookup(address)
+        if result is None:
+            continue
+        result['source'] = name
+        if not _accepted(result):
+            # Ungenauer Treffer (z.B. Stadtmitte): nur verwenden, wenn kein Backend Genaueres findet
+            fallback = fallback or result
+            continue
+        return result, persist
+    return fallback, False
+
+
+def geocode_many(addresses, backends=None, persist=True):
+    """
+    Geocodiert viele Adressen auf einmal (z.B. beim Massenimport): eine Cache-Abfrage je
+    LOOKUP_CHUNK Adressen, jede Adresse höchstens einmal an die Backends, neue Treffer in
+    einer Transaktion per executemany gespeichert. Nominatim-Anfragen sind auf
+    NOMINATIM_MIN_DELAY gedrosselt; für große Dateien besser nur backends=["gazetteer"].
+    persist: neue Treffer in geocode_cache speichern (False z.B. im Trockenlauf)
+    Returns: dict Adresse -> Ergebnis (wie geocode) oder None
+    """
+    keys = {address: normalize_address(address) for address in set(addresses)}
+    wanted = sorted({key for key in keys.values() if key})
+    cached = {}
+    for start in range(0, len(wanted), LOOKUP_CHUNK):
+        chunk = wanted[start:start + LOOKUP_CHUNK]
+        rows = query_all(
+            "SELECT address_key, lat, lng, display_name, source, precision FROM geocode_cache "
+            f"WHERE address_key IN ({', '.join('?' * len(chunk))})",
+            chunk
+        )
+        for key, lat, lng, display_name, source, precision in rows:
+            cached[key] = {'lat': lat, 'lng': lng, 'display_name': display_name, 'source': source, 'precision': precision}
+
+    results = {}
+    by_key = {}
+    new_rows = []
+    for address, key in keys.items():
+        if not key:
+            results[address] = None
+        elif key in cached:
+            results[address] = cached[key]
+        elif key in by_key:
+            # Unterschiedliche Schreibweise derselben Adresse: nur einmal nachschlagen
+            results[address] = by_key[key]
+        else:
+            result, cacheable = _lookup_backends(address, backends)
+            results[address] = by_key[key] = result
+            if persist and cacheable:
+                new_rows.append(_store_params(address, key, result))
+
+    if new_rows:
+        with transaction() as conn:
+            conn.executemany(STORE_SQL, new_rows)
+    return results
+
+
+def import_geonames(path, out=GAZETTEER_PATH):
+    """
+    Erzeugt die Gazetteer-CSV aus einem GeoNames-Postleitzahlen-Export (z.B. DE.txt aus
+    https://download.geonames.org/export/zip/DE.zip): PLZ-Mittelpunkte und je Stadt der
+    Median ihrer PLZ-Mittelpunkte (bei gleichnamigen Orten liegt er im Ort mit den meisten PLZ).
+    Vorhandene Straßenzeilen in out bleiben erhalten.
+    Returns: Anzahl geschriebener Zeilen
+    """
+    street_rows = []
+    if os.path.exists(out):
+        with open(out, newline="", encoding="utf-8") as f:
+            street_rows = [row for row in csv.DictReader(f) if row.get("strasse")]
+
+    postcodes = {}
+    city_points = defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 11 or not fields[9] or not fields[10]:
+                continue
+            postcode, city, lat, lng = fields[1], fields[2], float(fields[9]), float(fields[10])
+            postcodes.setdefault(postcode, (city, lat, lng))
+            city_points[city].append((lat, lng))
+
+    rows = street_rows
+    rows += [
+        {'strasse': "", 'plz': postcode, 'stadt': city, 'lat': round(lat, 5), 'lng': round(lng, 5)}
+        for postcode, (city, lat, lng) in sorted(postcodes.items())
+    ]
+    rows += [
+        {'strasse': "", 'plz': "", 'stadt': city,
+         'lat': round(median(p[0] for p in points), 5),
+         'lng': round(median(p[1] for p in points), 5)}
+        for city, points in sorted(city_points.items())
+    ]
+    with open(out, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["strasse", "plz", "stadt", "lat", "lng"])
+        writer.writeheader()
+        writer.writerows(rows)
+    load_gazetteer.cache_clear()
+    return len(rows)
+
+
+register_backend("gazetteer", gazetteer_lookup, persist=False)
+register_backend("nominatim", nominatim_lookup)
+
+
+def check_gazetteer(addresses=CHECK_ADDRESSES):
+    """
+    Prüft, ob der Gazetteer die Adressen offline genau genug auflöst (ohne Cache und Netzwerk).
+    Returns: Liste von (Adresse, Ergebnis oder None) aller zu ungenau aufgelösten Adressen
+    """
+    failures = []
+    for address in addresses:
+        result = gazetteer_lookup(address)
+        if result is None or not _accepted(result):
+            failures.append((address, result))
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Geocoding-Werkzeuge")
+    parser.add_argument("--import-geonames", metavar="DE.txt", help="Gazetteer aus GeoNames-PLZ-Export erzeugen")
+    parser.add_argument("--out", default=GAZETTEER_PATH)
+    parser.add_argument("--lookup", metavar="ADRESSE", help="Adresse geocodieren")
+    parser.add_argument("--check", action="store_true", help=f"Gazetteer prüfen (mindestens '{ACCEPT_PRECISION}' offline)")
+    args = parser.parse_args(argv)
+
+    if args.import_geonames:
+        print(f"{import_geonames(args.import_geonames, args.out)} Zeilen nach {args.out} geschrieben")
+    if args.lookup:
+        print(geocode(args.lookup))
+    if args.check:
+        failures = check_gazetteer()
+        for address, result in failures:
+            print(f"zu ungenau: {address} -> {result['precision'] if result else 'nicht gefunden'}")
+        print(f"{len(CHECK_ADDRESSES) - len(failures)} von {len(CHECK_ADDRESSES)} Adressen offline aufgelöst")
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
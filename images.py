@@ -0,0 +1,283 @@
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from functools import lru_cache
+
+import streamlit as st
+
+from db import cached_query_all
+
+logger = logging.getLogger(__name__)
+
+# Bildverwaltung für die Fotos der Erfassung.
+# Originale liegen inhaltsadressiert unter IMAGE_DIR/blobs/<sha[:2]>/<sha256> (dasselbe Foto nur einmal),
+# die Tabelle images (Migration 10) ordnet sie Standort und Werbeträgerseite zu.
+# Nach dem Upload erzeugt ein Prozess-Pool WebP-Vorschaubilder unter IMAGE_DIR/<art>/<sha[:2]>/<sha256>.webp;
+# die Genehmigungsseiten laden nur diese Ableitungen, nie die Kamera-Originale.
+
+IMAGE_DIR = os.environ.get("WERBETRAEGER_IMAGE_DIR", "images")
+
+# Ableitungen: Art -> (maximale Kantenlänge in Pixeln, WebP-Qualität)
+DERIVATIVES = {
+    "thumb": (320, 75),
+    "preview": (1600, 82),
+}
+
+THUMBNAIL_WORKERS = int(os.environ.get("WERBETRAEGER_THUMBNAIL_WORKERS", "2"))
+
+# Anzahl im Speicher gehaltener Ableitungen; Inhalte ändern sich nie (Schlüssel ist der Hash)
+IMAGE_CACHE_SIZE = 256
+
+# EXIF-Tags (GPS-IFD, Exif-IFD, Aufnahmezeitpunkte)
+EXIF_GPS_IFD = 0x8825
+EXIF_IFD = 0x8769
+EXIF_DATETIME_ORIGINAL = 36867
+EXIF_DATETIME = 306
+
+SIDES = ["A", "B", "C"]
+SIDE_COUNT = {"einseitig": 1, "doppelseitig": 2, "dreiseitig": 3}
+
+IMAGES_SQL = '''
+    SELECT id, seite, sha256, filename
+    FROM images
+    WHERE location_id = ?
+    ORDER BY seite, created_at
+'''
+
+INSERT_IMAGE_SQL = '''
+INSERT INTO images (id, location_id, seite, sha256, filename, content_type, size_bytes, created_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def blob_path(sha256: str, image_dir: str = IMAGE_DIR) -> str:
+    return os.path.join(image_dir, "blobs", sha256[:2], sha256)
+
+
+def derivative_path(sha256: str, kind: str, image_dir: str = IMAGE_DIR) -> str:
+    return os.path.join(image_dir, kind, sha256[:2], sha256 + ".webp")
+
+
+def _write_atomic(path, data):
+    # Erst in eine temporäre Datei im Zielordner schreiben, dann umbenennen: Leser sehen nie halbe Dateien
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def store_blob(data: bytes) -> str:
+    """
+    Legt die Bilddaten inhaltsadressiert ab (ohne Wirkung, wenn dieselben Daten schon vorhanden sind).
+    Returns: SHA-256 als Hex-String
+    """
+    sha256 = hashlib.sha256(data).hexdigest()
+    path = blob_path(sha256)
+    if not os.path.exists(path):
+        _write_atomic(path, data)
+    return sha256
+
+
+def make_derivatives(sha256: str, image_dir: str = IMAGE_DIR):
+    """
+    Erzeugt alle fehlenden WebP-Ableitungen eines Originals (läuft im Worker-Prozess,
+    notfalls auch direkt im Request).
+    Returns: Liste der erzeugten Arten
+    """
+    from PIL import Image, ImageOps
+
+    missing = [kind for kind in DERIVATIVES if not os.path.exists(derivative_path(sha256, kind, image_dir))]
+    if not missing:
+        return []
+
+    largest = max(DERIVATIVES[kind][0] for kind in missing)
+    with Image.open(blob_path(sha256, image_dir)) as original:
+        # JPEG: schon beim Dekodieren verkleinern, spart bei Kamerafotos den Großteil der Zeit
+        original.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+        for kind in sorted(missing, key=lambda kind: -DERIVATIVES[kind][0]):
+            max_size, quality = DERIVATIVES[kind]
+            image.thumbnail((max_size, max_size))
+            out = io.BytesIO()
+            image.save(out, format="WEBP", quality=quality, method=4)
+            _write_atomic(derivative_path(sha256, kind, image_dir), out.getvalue())
+    return missing
+
+
+def _gps_degrees(value, ref):
+    # (Grad, Minuten, Sekunden) als Rationals -> Dezimalgrad; Süd/West negativ
+    degrees, minutes, seconds = (float(part) for part in value)
+    decimal = degrees + minutes / 60 + seconds / 3600
+    return -decimal if ref in ("S", "W") else decimal
+
+
+def read_exif(data: bytes) -> dict | None:
+    """
+    Liest GPS-Position und Aufnahmezeitpunkt aus den EXIF-Daten eines Fotos.
+    Image.open liest nur den Dateikopf, die Pixeldaten werden nicht dekodiert.
+    Returns: dict mit lat, lng (oder None) und taken_at (datetime oder None); None ohne lesbare EXIF-Daten
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            exif = image.getexif()
+            gps = exif.get_ifd(EXIF_GPS_IFD)
+            taken = exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME)
+    except (UnidentifiedImageError, OSError, ValueError):
+        return None
+    if not gps and not taken:
+        return None
+
+    lat = lng = None
+    try:
+        # GPS-Tags: 1/2 Breite (Ref, Wert), 3/4 Länge (Ref, Wert)
+        if gps.get(2) and gps.get(4):
+            lat = _gps_degrees(gps[2], gps.get(1, "N"))
+            lng = _gps_degrees(gps[4], gps.get(3, "E"))
+            if not (-90 <= lat <= 90 and -180 <= lng <= 180) or (lat == 0 and lng == 0):
+                lat = lng = None
+    except (TypeError, ValueError, ZeroDivisionError):
+        lat = lng = None
+
+    taken_at = None
+    if taken:
+        try:
+            taken_at = datetime.strptime(str(taken).strip("\x00 "), "%Y:%m:%d %H:%M:%S")
+        except ValueError:
+            pass
+    return {'lat': lat, 'lng': lng, 'taken_at': taken_at}
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn statt fork: der Streamlit-Server hat viele Threads, fork würde deren Locks mitkopieren
+            _pool = ProcessPoolExecutor(
+                max_workers=THUMBNAIL_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _on_done(sha256):
+    def callback(future):
+        global _pool
+        exception = future.exception()
+        if exception is None:
+            return
+        logger.warning("Vorschaubilder für %s nicht erzeugt: %s", sha256, exception)
+        if isinstance(exception, BrokenProcessPool):
+            # Abgestürzter Worker: beim nächsten Upload einen neuen Pool starten
+            with _pool_lock:
+                _pool = None
+    return callback
+
+
+def schedule_derivatives(sha256s):
+    """Gibt die Ableitungen neuer Originale an den Prozess-Pool (wartet nicht auf das Ergebnis)."""
+    for sha256 in dict.fromkeys(sha256s):
+        if all(os.path.exists(derivative_path(sha256, kind)) for kind in DERIVATIVES):
+            continue
+        future = _get_pool().submit(make_derivatives, sha256, IMAGE_DIR)
+        future.add_done_callback(_on_done(sha256))
+
+
+def add_images(conn, location_id: str, files, created_at: str | None = None) -> list:
+    """
+    Speichert hochgeladene Fotos und verknüpft sie innerhalb einer laufenden Transaktion mit dem Standort.
+    files: Liste von (Seite, hochgeladene Datei)
+    Wird die Transaktion zurückgerollt, bleiben nur unverknüpfte Originale liegen.
+    Returns: Liste der SHA-256 (für schedule_derivatives nach dem Commit)
+    """
+    created_at = created_at or datetime.now().isoformat()
+    rows = []
+    for side, uploaded_file in files:
+        data = uploaded_file.getvalue()
+        sha256 = store_blob(data)
+        rows.append((
+            str(uuid.uuid4()), location_id, side, sha256, uploaded_file.name,
+            uploaded_file.type, len(data), created_at
+        ))
+    conn.executemany(INSERT_IMAGE_SQL, rows)
+    return [row[3] for row in rows]
+
+
+@lru_cache(maxsize=IMAGE_CACHE_SIZE)
+def _read_derivative(sha256, kind, image_dir):
+    with open(derivative_path(sha256, kind, image_dir), "rb") as f:
+        return f.read()
+
+
+def load_derivative(sha256: str, kind: str = "thumb") -> bytes | None:
+    """
+    Lädt eine Ableitung (aus dem Speicher-Cache, sonst von der Platte).
+    Ist der Worker noch nicht fertig (oder die Datei fehlt), wird sie einmalig hier erzeugt.
+    Returns: WebP-Bytes oder None, wenn das Original fehlt
+    """
+    if not os.path.exists(derivative_path(sha256, kind)):
+        if not os.path.exists(blob_path(sha256)):
+            return None
+        make_derivatives(sha256, IMAGE_DIR)
+    return _read_derivative(sha256, kind, IMAGE_DIR)
+
+
+def load_location_images(location_id: str) -> list:
+    # Returns: Liste von (id, seite, sha256, filename)
+    return cached_query_all(IMAGES_SQL, (location_id,))
+
+
+def render_location_images(location_id: str, columns: int = 4):
+    """
+    Zeigt die Fotos eines Standorts als Vorschaubilder je Seite; die große Vorschau
+    wird erst geladen, wenn ein Bild ausgewählt wird.
+    """
+    images = load_location_images(location_id)
+    if not images:
+        st.info("Zu diesem Standort wurden keine Bilder hochgeladen.")
+        return
+
+    for side in dict.fromkeys(image[1] for image in images):
+        st.markdown(f"**Seite {side or '–'}**")
+        side_images = [image for image in images if image[1] == side]
+        grid = st.columns(columns)
+        for position, (_, _, sha256, filename) in enumerate(side_images):
+            with grid[position % columns]:
+                thumbnail = load_derivative(sha256, "thumb")
+                if thumbnail is None:
+                    st.warning(f"{filename}: Bilddatei fehlt")
+                else:
+                    st.image(thumbnail, caption=filename)
+
+    labels = {
+        f"{number}. Seite {side or '–'}: {filename}": sha256
+        for number, (_, side, sha256, filename) in enumerate(images, start=1)
+    }
+    selected = st.selectbox(
+        "Bild in voller Größe anzeigen", ["–"] + list(labels), key=f"image_preview_{location_id}"
+    )
+    if selected != "–":
+        preview = load_derivative(labels[selected], "preview")
+        if preview is not None:
+            st.image(preview, caption=selected)
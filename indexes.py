@@ -0,0 +1,112 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Von der App verwaltete Sekundärindizes (Name -> Tabelle und Spalten).
+# Indizes mit dem Präfix "idx_", die hier nicht (mehr) aufgeführt sind, werden beim Start entfernt.
+INDEXES = {
+    # Arbeitslisten: WHERE status = ? AND current_step = ? ORDER BY COALESCE(created_at, ''), id
+    # (Keyset-Pagination ohne zusätzliche Sortierung; COALESCE, weil created_at NULL sein kann)
+    "idx_locations_step_status_created_key_id": "locations (current_step, status, COALESCE(created_at, ''), id)",
+    # Dashboard-Aggregation: GROUP BY vermarktungsform, status, current_step
+    # mit Filter auf vermarktungsform IN (...) und created_at (deckt die Query vollständig ab)
+    "idx_locations_form_status_step_created": "locations (vermarktungsform, status, current_step, created_at)",
+    # Historie je Standort: WHERE location_id = ? ORDER BY timestamp;
+    # deckt außerdem die Verweildauer-Auswertung (LAG über location_id, timestamp) ab
+    "idx_history_location_ts_step_status": "workflow_history (location_id, timestamp, step, status)",
+    # Bilder je Standort: WHERE location_id = ? ORDER BY seite, created_at
+    "idx_images_location_side_created": "images (location_id, seite, created_at)",
+}
+
+MANAGED_PREFIX = "idx_"
+
+# Registrierte Hot-Queries (Name -> (SQL, Beispielparameter)) für den Query-Plan-Check
+HOT_QUERIES = {}
+
+# Ergebnis des Query-Plan-Checks (Name -> Plan-Zeilen)
+QUERY_PLANS = {}
+
+# Nach dem Start-Check gesetzt: liefert eine Verbindung, um später registrierte Hot-Queries sofort zu prüfen
+_plan_connection = None
+
+
+def register_hot_query(name, sql, params=()):
+    # Module wie worklist oder search werden oft erst nach dem Start-Check importiert
+    HOT_QUERIES[name] = (sql, params)
+    if _plan_connection is not None:
+        _check_plan(_plan_connection(), name)
+
+
+def ensure_indexes(conn):
+    """
+    Legt fehlende verwaltete Indizes an und entfernt veraltete.
+    Returns: (angelegte, entfernte) Indexnamen
+    """
+    existing = {
+        row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE ?",
+            (MANAGED_PREFIX + "%",)
+        ).fetchall()
+    }
+
+    created = []
+    for name, definition in INDEXES.items():
+        if name not in existing:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}")
+            created.append(name)
+
+    dropped = []
+    for name in sorted(existing - set(INDEXES)):
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+        dropped.append(name)
+
+    if created or dropped:
+        # Statistiken für den Query-Planer aktualisieren
+        conn.execute("PRAGMA optimize")
+    return created, dropped
+
+
+def explain(conn, sql, params=()):
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+
+
+def _is_full_scan(detail):
+    # "SCAN locations" ohne Index ist ein Full Table Scan,
+    # "SCAN locations USING (COVERING) INDEX ..." durchläuft nur einen Index,
+    # "SCAN (subquery-1)" liest ein bereits berechnetes Zwischenergebnis
+    return (
+        detail.startswith("SCAN ")
+        and not detail.startswith("SCAN (")
+        and " INDEX " not in detail
+        and "CONSTANT ROW" not in detail
+    )
+
+
+def has_full_scan(plan):
+    return any(_is_full_scan(detail) for detail in plan)
+
+
+def _check_plan(conn, name):
+    sql, params = HOT_QUERIES[name]
+    plan = QUERY_PLANS[name] = explain(conn, sql, params)
+    if has_full_scan(plan):
+        logger.warning("Hot-Query '%s' scannt ohne Index: %s", name, "; ".join(plan))
+    return plan
+
+
+def check_query_plans(conn, connection_factory=None):
+    """
+    Führt EXPLAIN QUERY PLAN für alle registrierten Hot-Queries aus.
+    connection_factory: liefert eine Verbindung; danach registrierte Hot-Queries werden bei der
+    Registrierung geprüft
+    Returns: Liste von (Name, Plan-Zeilen) aller Queries, die noch eine Tabelle vollständig scannen
+    """
+    global _plan_connection
+    offenders = []
+    for name in list(HOT_QUERIES):
+        plan = _check_plan(conn, name)
+        if has_full_scan(plan):
+            offenders.append((name, plan))
+    if connection_factory is not None:
+        _plan_connection = connection_factory
+    return offenders
@@ -0,0 +1,491 @@
+from datetime import datetime
+
+# Versionierte Schema-Migrationen.
+# Jede Migration läuft genau einmal pro Datenbank und wird in schema_version vermerkt.
+# Neue Migrationen werden nur unten angehängt, bestehende nie verändert.
+
+
+def _existing_columns(conn, table):
+    return {col[1] for col in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+
+
+def _add_columns(conn, table, columns):
+    # Ältere Datenbanken haben einzelne Spalten bereits durch die früheren Ad-hoc-ALTERs
+    existing = _existing_columns(conn, table)
+    for name, col_type in columns:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {col_type}")
+
+
+def _create_base_tables(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS locations (
+        id TEXT PRIMARY KEY,
+        erfasser TEXT,
+        datum TEXT,
+        standort TEXT,
+        stadt TEXT,
+        lat REAL,
+        lng REAL,
+        leistungswert TEXT,
+        eigentuemer TEXT,
+        umruestung BOOLEAN,
+        alte_nummer TEXT,
+        seiten TEXT,
+        vermarktungsform TEXT,
+        status TEXT,
+        current_step TEXT,
+        created_at TEXT
+    )
+    ''')
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS workflow_history (
+        id TEXT PRIMARY KEY,
+        location_id TEXT,
+        step TEXT,
+        status TEXT,
+        comment TEXT,
+        user TEXT,
+        timestamp TEXT,
+        FOREIGN KEY (location_id) REFERENCES locations (id)
+    )
+    ''')
+
+
+def _add_bauantrag_columns(conn):
+    _add_columns(conn, "locations", [("bauantrag_datum", "TEXT")])
+
+
+def _add_build_columns(conn):
+    _add_columns(conn, "locations", [
+        ("plan_date", "TEXT"),
+        ("ist_date", "TEXT"),
+        ("build_status", "TEXT"),
+        ("contractor", "TEXT"),
+        ("power_connection", "TEXT"),
+    ])
+
+
+def _add_completion_columns(conn):
+    _add_columns(conn, "locations", [
+        ("completion_date", "TEXT"),
+        ("final_inspection", "TEXT"),
+        ("network_id", "TEXT"),
+        ("dms_id", "TEXT"),
+    ])
+
+
+def _create_step_counts(conn):
+    # Aggregat vermarktungsform x status x current_step, gepflegt durch Trigger auf locations.
+    # NULL-Werte werden als '' gespeichert, damit der Primärschlüssel eindeutig bleibt.
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS step_counts (
+        vermarktungsform TEXT NOT NULL,
+        status TEXT NOT NULL,
+        current_step TEXT NOT NULL,
+        anzahl INTEGER NOT NULL,
+        PRIMARY KEY (vermarktungsform, status, current_step)
+    ) WITHOUT ROWID
+    ''')
+
+    conn.execute("DELETE FROM step_counts")
+    conn.execute('''
+    INSERT INTO step_counts (vermarktungsform, status, current_step, anzahl)
+    SELECT IFNULL(vermarktungsform, ''), IFNULL(status, ''), IFNULL(current_step, ''), COUNT(*)
+    FROM locations
+    GROUP BY 1, 2, 3
+    ''')
+
+    increment = '''
+        INSERT INTO step_counts (vermarktungsform, status, current_step, anzahl)
+        VALUES (IFNULL(NEW.vermarktungsform, ''), IFNULL(NEW.status, ''), IFNULL(NEW.current_step, ''), 1)
+        ON CONFLICT (vermarktungsform, status, current_step) DO UPDATE SET anzahl = anzahl + 1;
+    '''
+    decrement = '''
+        UPDATE step_counts SET anzahl = anzahl - 1
+        WHERE vermarktungsform = IFNULL(OLD.vermarktungsform, '')
+          AND status = IFNULL(OLD.status, '')
+          AND current_step = IFNULL(OLD.current_step, '');
+        DELETE FROM step_counts
+        WHERE vermarktungsform = IFNULL(OLD.vermarktungsform, '')
+          AND status = IFNULL(OLD.status, '')
+          AND current_step = IFNULL(OLD.current_step, '')
+          AND anzahl <= 0;
+    '''
+
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_step_counts_insert AFTER INSERT ON locations BEGIN {increment} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_step_counts_delete AFTER DELETE ON locations BEGIN {decrement} END")
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_step_counts_update
+    AFTER UPDATE OF vermarktungsform, status, current_step ON locations
+    WHEN OLD.vermarktungsform IS NOT NEW.vermarktungsform
+      OR OLD.status IS NOT NEW.status
+      OR OLD.current_step IS NOT NEW.current_step
+    BEGIN {decrement} {increment} END
+    ''')
+
+
+def _create_write_sequence(conn):
+    # Änderungszähler für den Query-Cache (siehe db.cached_query).
+    # Jede Änderung an locations oder workflow_history erhöht seq in derselben Transaktion;
+    # PRAGMA data_version reicht nicht, weil es Schreibzugriffe der eigenen Verbindung nicht meldet.
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS write_sequence (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        seq INTEGER NOT NULL
+    )
+    ''')
+    conn.execute("INSERT OR IGNORE INTO write_sequence (id, seq) VALUES (1, 0)")
+
+    for table in ("locations", "workflow_history"):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_write_sequence_{table}_{event.lower()}
+            AFTER {event} ON {table}
+            BEGIN UPDATE write_sequence SET seq = seq + 1 WHERE id = 1; END
+            ''')
+
+
+def _create_geocode_cache(conn):
+    # Persistenter Geocoding-Cache (siehe geocoding.py), Schlüssel ist die normalisierte Adresse
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS geocode_cache (
+        address_key TEXT PRIMARY KEY,
+        address TEXT,
+        lat REAL NOT NULL,
+        lng REAL NOT NULL,
+        display_name TEXT,
+        source TEXT,
+        precision TEXT,
+        created_at TEXT
+    ) WITHOUT ROWID
+    ''')
+
+
+def fill_locations_rtree(conn):
+    """
+    Baut den Inhalt von locations_rtree aus locations neu auf.
+    Nötig nach einem VACUUM: locations hat keinen INTEGER PRIMARY KEY, VACUUM darf die rowids neu vergeben.
+    """
+    conn.execute("DELETE FROM locations_rtree")
+    conn.execute('''
+    INSERT INTO locations_rtree (id, min_lat, max_lat, min_lng, max_lng)
+    SELECT rowid, lat, lat, lng, lng FROM locations
+    WHERE lat IS NOT NULL AND lng IS NOT NULL
+    ''')
+
+
+def _create_locations_rtree(conn):
+    # Räumlicher Index über die Koordinaten (siehe spatial.py), Schlüssel ist die rowid von locations.
+    # Punkte werden als Rechteck mit min = max abgelegt; Trigger halten den Index synchron.
+    conn.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS locations_rtree USING rtree(
+        id, min_lat, max_lat, min_lng, max_lng
+    )
+    ''')
+    fill_locations_rtree(conn)
+
+    insert = '''
+        INSERT INTO locations_rtree (id, min_lat, max_lat, min_lng, max_lng)
+        SELECT NEW.rowid, NEW.lat, NEW.lat, NEW.lng, NEW.lng
+        WHERE NEW.lat IS NOT NULL AND NEW.lng IS NOT NULL;
+    '''
+    delete = "DELETE FROM locations_rtree WHERE id = OLD.rowid;"
+
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_locations_rtree_insert AFTER INSERT ON locations BEGIN {insert} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_locations_rtree_delete AFTER DELETE ON locations BEGIN {delete} END")
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_locations_rtree_update
+    AFTER UPDATE OF lat, lng ON locations
+    WHEN OLD.lat IS NOT NEW.lat OR OLD.lng IS NOT NEW.lng
+    BEGIN {delete} {insert} END
+    ''')
+
+
+def _create_location_clusters(conn):
+    # Mehrstufiges Raster (siehe spatial.py) mit Anzahl und Koordinatensummen je Zelle,
+    # Vermarktungsform und Prozessschritt; gepflegt durch Trigger auf locations wie step_counts.
+    # Zellindex = ganzzahliger Anteil von (lat + 90) / cell_size bzw. (lng + 180) / cell_size;
+    # durch den Versatz sind die Werte nie negativ und CAST rundet wie floor().
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS cluster_levels (
+        level INTEGER PRIMARY KEY,
+        cell_size REAL NOT NULL
+    )
+    ''')
+    conn.executemany(
+        "INSERT OR IGNORE INTO cluster_levels (level, cell_size) VALUES (?, ?)",
+        [(0, 2.0), (1, 0.5), (2, 0.125), (3, 0.03125)]
+    )
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS location_clusters (
+        level INTEGER NOT NULL,
+        cell_lat INTEGER NOT NULL,
+        cell_lng INTEGER NOT NULL,
+        vermarktungsform TEXT NOT NULL,
+        current_step TEXT NOT NULL,
+        anzahl INTEGER NOT NULL,
+        sum_lat REAL NOT NULL,
+        sum_lng REAL NOT NULL,
+        PRIMARY KEY (level, cell_lat, cell_lng, vermarktungsform, current_step)
+    ) WITHOUT ROWID
+    ''')
+
+    conn.execute("DELETE FROM location_clusters")
+    conn.execute('''
+    INSERT INTO location_clusters (level, cell_lat, cell_lng, vermarktungsform, current_step, anzahl, sum_lat, sum_lng)
+    SELECT c.level, CAST((l.lat + 90) / c.cell_size AS INTEGER), CAST((l.lng + 180) / c.cell_size AS INTEGER),
+           IFNULL(l.vermarktungsform, ''), IFNULL(l.current_step, ''), COUNT(*), SUM(l.lat), SUM(l.lng)
+    FROM locations l, cluster_levels c
+    WHERE l.lat IS NOT NULL AND l.lng IS NOT NULL
+    GROUP BY 1, 2, 3, 4, 5
+    ''')
+
+    increment = '''
+        INSERT INTO location_clusters (level, cell_lat, cell_lng, vermarktungsform, current_step, anzahl, sum_lat, sum_lng)
+        SELECT level, CAST((NEW.lat + 90) / cell_size AS INTEGER), CAST((NEW.lng + 180) / cell_size AS INTEGER),
+               IFNULL(NEW.vermarktungsform, ''), IFNULL(NEW.current_step, ''), 1, NEW.lat, NEW.lng
+        FROM cluster_levels
+        WHERE NEW.lat IS NOT NULL AND NEW.lng IS NOT NULL
+        ON CONFLICT (level, cell_lat, cell_lng, vermarktungsform, current_step) DO UPDATE SET
+            anzahl = anzahl + 1, sum_lat = sum_lat + excluded.sum_lat, sum_lng = sum_lng + excluded.sum_lng;
+    '''
+    cell_of_old = '''
+        WHERE OLD.lat IS NOT NULL AND OLD.lng IS NOT NULL
+          AND (level, cell_lat, cell_lng) IN (
+              SELECT level, CAST((OLD.lat + 90) / cell_size AS INTEGER), CAST((OLD.lng + 180) / cell_size AS INTEGER)
+              FROM cluster_levels
+          )
+          AND vermarktungsform = IFNULL(OLD.vermarktungsform, '')
+          AND current_step = IFNULL(OLD.current_step, '')
+    '''
+    decrement = f'''
+        UPDATE location_clusters SET anzahl = anzahl - 1, sum_lat = sum_lat - OLD.lat, sum_lng = sum_lng - OLD.lng
+        {cell_of_old};
+        DELETE FROM location_clusters {cell_of_old} AND anzahl <= 0;
+    '''
+
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_location_clusters_insert AFTER INSERT ON locations BEGIN {increment} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_location_clusters_delete AFTER DELETE ON locations BEGIN {decrement} END")
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_location_clusters_update
+    AFTER UPDATE OF lat, lng, vermarktungsform, current_step ON locations
+    WHEN OLD.lat IS NOT NEW.lat
+      OR OLD.lng IS NOT NEW.lng
+      OR OLD.vermarktungsform IS NOT NEW.vermarktungsform
+      OR OLD.current_step IS NOT NEW.current_step
+    BEGIN {decrement} {increment} END
+    ''')
+
+
+def _create_images(conn):
+    # Fotos je Standort und Werbeträgerseite; die Bilddaten liegen inhaltsadressiert (SHA-256)
+    # im Dateisystem (siehe images.py), dieselbe Datei wird nur einmal gespeichert
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS images (
+        id TEXT PRIMARY KEY,
+        location_id TEXT NOT NULL,
+        seite TEXT,
+        sha256 TEXT NOT NULL,
+        filename TEXT,
+        content_type TEXT,
+        size_bytes INTEGER,
+        created_at TEXT,
+        FOREIGN KEY (location_id) REFERENCES locations (id)
+    )
+    ''')
+    # Auch Bilder invalidieren den Query-Cache (Trigger wie in Migration 6)
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_write_sequence_images_{event.lower()}
+        AFTER {event} ON images
+        BEGIN UPDATE write_sequence SET seq = seq + 1 WHERE id = 1; END
+        ''')
+
+
+# Volltextspalten je Standort; kommentare fasst alle Kommentare der workflow_history zusammen
+FTS_COLUMNS = ['standort', 'stadt', 'erfasser', 'alte_nummer', 'network_id', 'dms_id', 'kommentare']
+
+FTS_ROW_SELECT = '''
+    SELECT l.rowid, l.standort, l.stadt, l.erfasser, l.alte_nummer, l.network_id, l.dms_id,
+           (SELECT group_concat(comment, ' ') FROM workflow_history WHERE location_id = l.id)
+    FROM locations l
+'''
+
+
+def fill_locations_fts(conn):
+    """
+    Baut den Inhalt von locations_fts aus locations und workflow_history neu auf.
+    Wie fill_locations_rtree nach einem VACUUM nötig (Schlüssel ist die rowid von locations).
+    """
+    conn.execute("DELETE FROM locations_fts")
+    conn.execute(f'''
+    INSERT INTO locations_fts (rowid, {", ".join(FTS_COLUMNS)})
+    SELECT l.rowid, l.standort, l.stadt, l.erfasser, l.alte_nummer, l.network_id, l.dms_id, h.kommentare
+    FROM locations l
+    LEFT JOIN (
+        SELECT location_id, group_concat(comment, ' ') AS kommentare FROM workflow_history GROUP BY location_id
+    ) h ON h.location_id = l.id
+    ''')
+
+
+def index_new_locations(conn, after_rowid):
+    """
+    Nimmt alle Standorte mit rowid > after_rowid samt Kommentaren in locations_fts auf, in einer Anweisung.
+    Für Blockimporte, die die Einfüge-Trigger über fts_suspended aussetzen (Migration 13).
+    """
+    conn.execute(
+        f"INSERT INTO locations_fts (rowid, {', '.join(FTS_COLUMNS)}) {FTS_ROW_SELECT} WHERE l.rowid > ?",
+        (after_rowid,)
+    )
+
+
+def _create_locations_fts(conn):
+    # Volltextindex für die Standortsuche (siehe search.py), Schlüssel ist die rowid von locations.
+    # unicode61 mit remove_diacritics: "Köln" findet auch "koln"; Präfixindizes für Suchen wie "düss*".
+    # Trigger ersetzen bei jeder Änderung die ganze Zeile eines Standorts, auch bei neuen Kommentaren.
+    conn.execute(f'''
+    CREATE VIRTUAL TABLE IF NOT EXISTS locations_fts USING fts5(
+        {", ".join(FTS_COLUMNS)},
+        tokenize = "unicode61 remove_diacritics 2",
+        prefix = '2 3'
+    )
+    ''')
+    # Begriffsliste des Index für die Tippfehlertoleranz
+    conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS locations_fts_vocab USING fts5vocab(locations_fts, row)")
+    fill_locations_fts(conn)
+
+    columns = ", ".join(FTS_COLUMNS)
+    refresh_location = f'''
+        DELETE FROM locations_fts WHERE rowid = (SELECT rowid FROM locations WHERE id = {{location_id}});
+        INSERT INTO locations_fts (rowid, {columns}) {FTS_ROW_SELECT} WHERE l.id = {{location_id}};
+    '''
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_locations_fts_insert AFTER INSERT ON locations
+    BEGIN INSERT INTO locations_fts (rowid, {columns}) {FTS_ROW_SELECT} WHERE l.rowid = NEW.rowid; END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_locations_fts_delete AFTER DELETE ON locations
+    BEGIN DELETE FROM locations_fts WHERE rowid = OLD.rowid; END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_locations_fts_update
+    AFTER UPDATE OF {", ".join(FTS_COLUMNS[:-1])} ON locations
+    WHEN OLD.standort IS NOT NEW.standort
+      OR OLD.stadt IS NOT NEW.stadt
+      OR OLD.erfasser IS NOT NEW.erfasser
+      OR OLD.alte_nummer IS NOT NEW.alte_nummer
+      OR OLD.network_id IS NOT NEW.network_id
+      OR OLD.dms_id IS NOT NEW.dms_id
+    BEGIN {refresh_location.format(location_id="NEW.id")} END
+    ''')
+
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_history_fts_insert AFTER INSERT ON workflow_history
+    WHEN NEW.comment IS NOT NULL AND NEW.comment != ''
+    BEGIN {refresh_location.format(location_id="NEW.location_id")} END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_history_fts_delete AFTER DELETE ON workflow_history
+    BEGIN {refresh_location.format(location_id="OLD.location_id")} END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_history_fts_update
+    AFTER UPDATE OF comment, location_id ON workflow_history
+    BEGIN
+        {refresh_location.format(location_id="OLD.location_id")}
+        {refresh_location.format(location_id="NEW.location_id")}
+    END
+    ''')
+
+
+def _add_fts_suspended(conn):
+    # Enthält fts_suspended eine Zeile (nur innerhalb einer Import-Transaktion), indexieren die
+    # Einfüge-Trigger nicht je Zeile; der Import ruft danach index_new_locations() für den ganzen Block.
+    # So ist die Reihenfolge locations vor workflow_history (Fremdschlüssel) ohne doppelte Indexierung möglich.
+    conn.execute("CREATE TABLE IF NOT EXISTS fts_suspended (id INTEGER PRIMARY KEY CHECK (id = 1))")
+    columns = ", ".join(FTS_COLUMNS)
+    conn.execute("DROP TRIGGER IF EXISTS trg_locations_fts_insert")
+    conn.execute(f'''
+    CREATE TRIGGER trg_locations_fts_insert AFTER INSERT ON locations
+    WHEN NOT EXISTS (SELECT 1 FROM fts_suspended)
+    BEGIN INSERT INTO locations_fts (rowid, {columns}) {FTS_ROW_SELECT} WHERE l.rowid = NEW.rowid; END
+    ''')
+    conn.execute("DROP TRIGGER IF EXISTS trg_history_fts_insert")
+    conn.execute(f'''
+    CREATE TRIGGER trg_history_fts_insert AFTER INSERT ON workflow_history
+    WHEN NEW.comment IS NOT NULL AND NEW.comment != ''
+      AND NOT EXISTS (SELECT 1 FROM fts_suspended)
+    BEGIN
+        DELETE FROM locations_fts WHERE rowid = (SELECT rowid FROM locations WHERE id = NEW.location_id);
+        INSERT INTO locations_fts (rowid, {columns}) {FTS_ROW_SELECT} WHERE l.id = NEW.location_id;
+    END
+    ''')
+
+
+def _normalize_rejected_status(conn):
+    # Leiter Akquisition und Niederlassungsleiter schrieben bei Ablehnung status 'abgelehnt', CEO und
+    # Baurecht 'rejected'; seit workflow.py gilt einheitlich 'rejected' (Schritt bleibt 'abgelehnt')
+    conn.execute("UPDATE locations SET status = 'rejected' WHERE status = 'abgelehnt'")
+    conn.execute("UPDATE workflow_history SET status = 'rejected' WHERE status = 'abgelehnt'")
+
+
+# (Version, Beschreibung, Funktion) - streng aufsteigend
+MIGRATIONS = [
+    (1, "Basistabellen locations und workflow_history", _create_base_tables),
+    (2, "Bauantrag-Spalten (Baurecht)", _add_bauantrag_columns),
+    (3, "Bau-Spalten (Bauteam)", _add_build_columns),
+    (4, "Abschluss-Spalten (Fertigstellung)", _add_completion_columns),
+    (5, "Aggregat step_counts mit Triggern", _create_step_counts),
+    (6, "Änderungszähler write_sequence für den Query-Cache", _create_write_sequence),
+    (7, "Geocoding-Cache geocode_cache", _create_geocode_cache),
+    (8, "R*Tree locations_rtree über lat/lng mit Triggern", _create_locations_rtree),
+    (9, "Raster-Aggregat location_clusters für die GeoMap", _create_location_clusters),
+    (10, "Bildverwaltung images", _create_images),
+    (11, "Volltextindex locations_fts für die Standortsuche", _create_locations_fts),
+    (12, "Status 'abgelehnt' vereinheitlicht zu 'rejected'", _normalize_rejected_status),
+    (13, "Volltext-Trigger für Blockimporte aussetzbar (fts_suspended)", _add_fts_suspended),
+]
+
+
+def current_version(conn):
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(conn, target_version=None):
+    """
+    Bringt die Datenbank auf den neuesten Stand (oder bis einschließlich target_version).
+    Läuft in einer IMMEDIATE-Transaktion, damit parallel startende Prozesse
+    dieselbe Migration nicht doppelt ausführen.
+    Returns: Liste der angewendeten Versionen
+    """
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TEXT
+    )
+    ''')
+
+    applied = []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = current_version(conn)
+        for migration_version, description, apply in MIGRATIONS:
+            if migration_version <= version:
+                continue
+            if target_version is not None and migration_version > target_version:
+                break
+            apply(conn)
+            conn.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (migration_version, description, datetime.now().isoformat())
+            )
+            applied.append(migration_version)
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    return applied
@@ -1,10 +1,12 @@
 import streamlit as st
 import plotly.graph_objects as go
-import networkx as nx
 import math  # Math-Modul für die Pfeilrichtungsberechnung
+from aggregates import load_status_counts
+from profiling import start_profile, finish_profile, phase
 
 # Streamlit-Seiteneinstellungen für volle Breite
 st.set_page_config(layout="wide")
+start_profile()
 
 # Titel mit verbesserter Sichtbarkeit
 st.markdown("<h3 style='text-align: center; color: #1E3D59; margin-bottom: 20px;'></h3>", unsafe_allow_html=True)
@@ -13,10 +15,7 @@ st.write("""Die Digitale Säule unterscheidet sich von anderen Vermarktungsforme
 1. **Seitenanzahl**: Kann auch dreiseitig erfasst werden (nicht nur ein- oder doppelseitig)
 2. **Workflow**: Überspringt den Niederlassungsleiter im Genehmigungsprozess""")
 
-# Graph erstellen
-G = nx.DiGraph()
-
-# Knoten hinzufügen mit Beschreibungen
+# Knoten mit Beschreibungen (feste Positionen siehe pos, daher kein Graph-Layout nötig)
 nodes = {
     'A': {'label': 'Erfassung', 
           'desc': 'Standortdaten werden erfasst, inklusive spezifischer Merkmale der Digitalen Säule. Email wird an Leiter Akquisitionsmanagement gesendet.',
@@ -62,9 +61,26 @@ nodes = {
            'color': '#FADBD8', 'border': '#E74C3C'}
 }
 
-# Knoten zum Graph hinzufügen
-for node, attrs in nodes.items():
-    G.add_node(node, **attrs)
+# Aktuelle Anzahl Standorte je Knoten aus dem Aggregat step_counts
+node_steps = {
+    'B': 'leiter_akquisition',
+    'C': 'niederlassungsleiter',
+    'D': 'baurecht',
+    'E1': 'widerspruch',
+    'F': 'ceo',
+    'G': 'bauteam',
+    'H': 'fertig',
+}
+counts = load_status_counts()
+counts_by_step = counts[counts['status'] == 'active'].groupby('current_step')['anzahl'].sum()
+completed_count = int(counts.loc[counts['current_step'] == 'fertig', 'anzahl'].sum())
+
+def node_count_text(node):
+    step = node_steps.get(node)
+    if step is None:
+        return ""
+    count = completed_count if step == 'fertig' else int(counts_by_step.get(step, 0))
+    return f"<br><b>Aktuell: {count} Standorte</b>"
 
 # Kanten definieren mit Beschreibungen
 edges = [
@@ -85,9 +101,6 @@ edges = [
     ('G', 'H', {'label': '', 'color': '#27AE60', 'width': 1.5}),
 ]
 
-for source, target, attrs in edges:
-    G.add_edge(source, target, **attrs)
-
 # Layout erstellen - Mehr Abstand zwischen den Schritten
 pos = {
     'A': [0, 0],
@@ -110,12 +123,10 @@ pos = {
 fig = go.Figure()
 
 # VERBESSERTE PFEILE: Schlichtere, dezentere Pfeilspitzen
-for edge in G.edges():
-    source, target = edge
+for source, target, attrs in edges:
     x0, y0 = pos[source]
     x1, y1 = pos[target]
     
-    attrs = G.edges[edge]
     color = attrs['color']
     width = attrs['width']
     dash_style = 'dash' if attrs.get('dash') == 'dash' else None
@@ -175,9 +186,7 @@ edge_labels = []
 edge_label_x = []
 edge_label_y = []
 
-for edge in G.edges():
-    source, target = edge
-    attrs = G.edges[edge]
+for source, target, attrs in edges:
     if attrs.get('label'):
         x0, y0 = pos[source]
         x1, y1 = pos[target]
@@ -187,20 +196,20 @@ for edge in G.edges():
 
 # Knoten hinzufügen mit optimierter Schrift
 fig.add_trace(go.Scatter(
-    x=[pos[node][0] for node in G.nodes()],
-    y=[pos[node][1] for node in G.nodes()],
+    x=[pos[node][0] for node in nodes],
+    y=[pos[node][1] for node in nodes],
     mode='markers+text',
-    text=[nodes[node]['label'] for node in G.nodes()],
+    text=[nodes[node]['label'] for node in nodes],
     textfont=dict(size=14),
     marker=dict(
         showscale=False,
-        color=[nodes[node]['color'] for node in G.nodes()],
-        size=[40 if 'X' in node else 60 for node in G.nodes()],
-        line_width=[1 if nodes[node].get('dash') == 'dash' else 2 for node in G.nodes()],
-        line_color=[nodes[node]['border'] for node in G.nodes()]
+        color=[nodes[node]['color'] for node in nodes],
+        size=[40 if 'X' in node else 60 for node in nodes],
+        line_width=[1 if nodes[node].get('dash') == 'dash' else 2 for node in nodes],
+        line_color=[nodes[node]['border'] for node in nodes]
     ),
     textposition="bottom center",
-    hovertext=[f"{nodes[node]['label']}<br>{nodes[node]['desc']}" for node in G.nodes()],
+    hovertext=[f"{nodes[node]['label']}<br>{nodes[node]['desc']}{node_count_text(node)}" for node in nodes],
     hoverinfo="text"
 ))
 
@@ -244,4 +253,7 @@ st.markdown("""
 st.markdown("<br>", unsafe_allow_html=True)
 
 # Interaktives Diagram anzeigen mit voller Breite
-st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+with phase("plotly"):
+    st.plotly_chart(fig, use_container_width=True)
+
+finish_profile()
@@ -1,16 +1,15 @@
 import streamlit as st
-import pandas as pd
-import sqlite3
 import pydeck as pdk
+from geocoding import load_gazetteer
+from spatial import (load_points_in_bbox, load_clusters, cluster_level_for_zoom, viewport_bbox,
+                     MAX_POINTS, POINT_ZOOM)
+from profiling import start_profile, finish_profile, phase
 
 # Seiteneinstellungen
 st.set_page_config(page_title="GeoMap", page_icon="🗺️", layout="wide")
+start_profile()
 st.title("Geografische Übersicht aller Standorte")
 
-# Verbindung zur Datenbank herstellen
-conn = sqlite3.connect('werbetraeger.db', check_same_thread=False)
-c = conn.cursor()
-
 # Farben je Vermarktungsform definieren
 form_colors = {
     'Digitale Säule': [31, 119, 180],
@@ -22,59 +21,131 @@ form_colors = {
     'default': [128, 128, 128]
 }
 
-# Alle Standorte mit gültigen Koordinaten laden (inkl. current_step)
-c.execute("SELECT id, standort, stadt, lat, lng, vermarktungsform, current_step FROM locations WHERE lat IS NOT NULL AND lng IS NOT NULL")
-locations = c.fetchall()
+step_labels = {
+    'erfassung': 'Erfassung',
+    'leiter_akquisition': 'Leiter Akquisition',
+    'niederlassungsleiter': 'Niederlassungsleiter',
+    'baurecht': 'Baurecht',
+    'widerspruch': 'Widerspruch',
+    'ceo': 'CEO',
+    'bauteam': 'Bauteam',
+    'fertigstellung': 'Fertigstellung',
+    'fertig': 'Fertig'
+}
+
+# Kartenausschnitt: pydeck meldet Verschieben/Zoomen nicht an Python zurück,
+# daher legen Mittelpunkt und Zoom in der Sidebar fest, welche Standorte geladen werden
+city_centers = {label: (lat, lng) for lat, lng, label in load_gazetteer()[2].values()}
+with st.sidebar:
+    st.header("Kartenausschnitt")
+    center_name = st.selectbox("Zentrum", ["NRW"] + sorted(city_centers))
+    zoom = st.slider("Zoom", min_value=5, max_value=15, value=8 if center_name == "NRW" else 11)
+    selected_forms = st.multiselect("Vermarktungsform", [form for form in form_colors if form != 'default'])
+    selected_steps = st.multiselect(
+        "Bearbeitungsschritt", list(step_labels), format_func=lambda step: step_labels[step]
+    )
+
+# NRW-Mitte (ungefähr Düsseldorf/Ruhrgebiet) oder Stadtmittelpunkt aus dem Gazetteer
+center_lat, center_lng = city_centers.get(center_name, (51.4332, 7.6616))
+bbox = viewport_bbox(center_lat, center_lng, zoom)
 
-if not locations:
-    st.warning("Keine Standorte mit Koordinaten gefunden.")
+# Bei kleinem Zoom Cluster aus dem Raster-Aggregat, sonst einzelne Standorte (R*Tree), siehe spatial.py
+level = cluster_level_for_zoom(zoom)
+truncated = False
+if level is not None:
+    df = load_clusters(level, bbox, selected_steps, selected_forms)
 else:
-    df = pd.DataFrame(locations, columns=['id', 'standort', 'stadt', 'lat', 'lng', 'vermarktungsform', 'current_step'])
+    df, truncated = load_points_in_bbox(bbox, selected_steps, selected_forms)
 
-    # Farbe nach Vermarktungsform zuweisen
-    df['color'] = df['vermarktungsform'].apply(lambda x: form_colors.get(x, form_colors['default']))
+if df.empty:
+    st.warning("Keine Standorte mit Koordinaten in diesem Kartenausschnitt gefunden.")
+else:
+    if level is not None:
+        st.caption(
+            f"{int(df['anzahl'].sum())} Standorte in {len(df)} Clustern. Einzelne Standorte ab Zoom {POINT_ZOOM}; "
+            f"zum Verschieben Zentrum und Zoom in der Sidebar anpassen."
+        )
+    else:
+        st.caption(f"{len(df)} Standorte im Ausschnitt. Zum Verschieben Zentrum und Zoom in der Sidebar anpassen.")
+    if truncated:
+        st.info(f"Es werden nur die ersten {MAX_POINTS} Standorte angezeigt. Bitte weiter hineinzoomen oder filtern.")
 
-    # PyDeck-View auf NRW (ungefähre Mitte: Düsseldorf)
     view_state = pdk.ViewState(
-        latitude=51.4332,   # Düsseldorf
-        longitude=7.6616,   # ca. Mitte NRW
-        zoom=8,             # Zoom auf NRW
+        latitude=center_lat,
+        longitude=center_lng,
+        zoom=zoom,
         pitch=0
     )
 
-    # Scatterplot-Layer
-    layer = pdk.Layer(
-        'ScatterplotLayer',
-        df,
-        get_position=['lng', 'lat'],
-        get_color='color',
-        get_radius=100,
-        pickable=True,
-        opacity=0.8,
-        stroked=True,
-        filled=True
-    )
+    # Ein Scatterplot-Layer je Vermarktungsform mit fester Farbe: keine Farbspalte je Punkt im Payload
+    with phase("pandas"):
+        layers = []
+        if level is not None:
+            # Blasengröße in Pixeln wächst mit der Wurzel der Anzahl, Farbe nach häufigster Vermarktungsform
+            df['radius'] = (df['anzahl'] ** 0.5 * 3 + 6).clip(upper=40)
+            df['label'] = df['anzahl'].astype(str)
+            for form, clusters in df.groupby('vermarktungsform', sort=False):
+                layers.append(pdk.Layer(
+                    'ScatterplotLayer',
+                    clusters,
+                    get_position=['lng', 'lat'],
+                    get_color=form_colors.get(form, form_colors['default']),
+                    get_radius='radius',
+                    radius_units='pixels',
+                    pickable=True,
+                    opacity=0.7,
+                    stroked=True,
+                    filled=True
+                ))
+            layers.append(pdk.Layer(
+                'TextLayer',
+                df,
+                get_position=['lng', 'lat'],
+                get_text='label',
+                get_size=12,
+                get_color=[255, 255, 255]
+            ))
+        else:
+            for form, points in df.groupby('vermarktungsform', dropna=False, sort=False):
+                layers.append(pdk.Layer(
+                    'ScatterplotLayer',
+                    points,
+                    get_position=['lng', 'lat'],
+                    get_color=form_colors.get(form, form_colors['default']),
+                    get_radius=100,
+                    radius_min_pixels=2,
+                    pickable=True,
+                    opacity=0.8,
+                    stroked=True,
+                    filled=True
+                ))
 
-    tooltip = {
-        "html": (
+    if level is not None:
+        tooltip_html = "<b>{anzahl} Standorte</b><br/>{formen}"
+    else:
+        tooltip_html = (
             "<b>ID:</b> {id}<br/>"
             "<b>Standort:</b> {standort}<br/>"
             "<b>Stadt:</b> {stadt}<br/>"
             "<b>Vermarktungsform:</b> {vermarktungsform}<br/>"
             "<b>Bearbeitungsschritt:</b> {current_step}"
-        ),
+        )
+    tooltip = {
+        "html": tooltip_html,
         "style": {
             "backgroundColor": "white",
             "color": "black"
         }
     }
 
-    st.pydeck_chart(pdk.Deck(
-        map_style=None,
-        initial_view_state=view_state,
-        layers=[layer],
-        tooltip=tooltip
-    ))
+    # Serialisierung der Punkte nach JSON geschieht in st.pydeck_chart
+    with phase("pydeck"):
+        st.pydeck_chart(pdk.Deck(
+            map_style=None,
+            initial_view_state=view_state,
+            layers=layers,
+            tooltip=tooltip
+        ))
 
     # Legende (horizontal)
     st.subheader("Legende")
@@ -89,4 +160,6 @@ else:
             f'<div>{form}</div></div>'
         )
     legend_html += '</div>'
-    st.markdown(legend_html, unsafe_allow_html=True)
\ No newline at end of file
+    st.markdown(legend_html, unsafe_allow_html=True)
+
+finish_profile()
@@ -1,5 +1,6 @@
 import streamlit as st
 import os
+from profiling import start_profile, finish_profile
 
 # Seiteneinstellungen
 st.set_page_config(
@@ -7,6 +8,7 @@ st.set_page_config(
     page_icon="🧭",
     layout="wide"
 )
+start_profile()
 
 # Custom CSS für bessere Button-Gestaltung
 st.markdown("""
@@ -59,9 +61,14 @@ with col2:
         st.switch_page("pages/02_📊_Dashboard.py")
         
     if st.button("🔍 Standort-Suche", use_container_width=True):
-        st.switch_page("pages/Standort_Suche.py")
-    
+        st.switch_page("pages/06_🔍_Standort_Suche.py")
+
+    if st.button("📥 Massenimport", use_container_width=True):
+        st.switch_page("pages/04_8_Massenimport.py")
+
     if st.button("🎫 Open a Ticket", use_container_width=True):
         st.switch_page("pages/Ticket.py")
         
-    st.write('*Einige Seiten sind noch in Arbeit oder nicht verfügbar.')
\ No newline at end of file
+    st.write('*Einige Seiten sind noch in Arbeit oder nicht verfügbar.')
+
+finish_profile()
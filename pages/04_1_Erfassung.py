@@ -1,17 +1,63 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import sqlite3
 import uuid
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
+from db import transaction, insert_history, INSERT_LOCATION_SQL
+from geocoding import geocode
+from spatial import find_nearby_locations, haversine_m, DUPLICATE_RADIUS_M
+from images import add_images, schedule_derivatives, read_exif, SIDES, SIDE_COUNT
+from profiling import start_profile, finish_profile
 
 # Streamlit-Seiteneinstellungen
 st.set_page_config(layout="wide", page_title="Standort erfassen")
+start_profile()
 
-# Verbindung zur Datenbank herstellen
-conn = sqlite3.connect('werbetraeger.db', check_same_thread=False)
-c = conn.cursor()
+# Dublettenprüfung: bestehende oder laufende Standorte im Umkreis anzeigen, bevor ein Genehmigungsdurchlauf entsteht
+def show_nearby_locations(lat, lng):
+    nearby = find_nearby_locations(lat, lng)
+    if nearby.empty:
+        return False
+
+    st.session_state.duplicate_coordinates = (lat, lng)
+    st.warning(
+        f"Im Umkreis von {DUPLICATE_RADIUS_M:.0f} m gibt es bereits {len(nearby)} Standort(e). "
+        f"Bitte prüfen Sie, ob der Standort schon erfasst ist. Zum Speichern die Bestätigung "
+        f"anhaken und erneut speichern."
+    )
+    st.dataframe(
+        nearby[['distanz_m', 'standort', 'stadt', 'vermarktungsform', 'current_step', 'status', 'id']],
+        column_config={
+            'distanz_m': st.column_config.NumberColumn("Entfernung (m)", format="%.0f"),
+            'standort': "Standort",
+            'stadt': "Stadt",
+            'vermarktungsform': "Vermarktungsform",
+            'current_step': "Prozessschritt",
+            'status': "Status",
+            'id': "ID",
+        },
+        hide_index=True, use_container_width=True
+    )
+    return True
+
+# Ab dieser Entfernung zwischen Foto-GPS und berechneter Adresse wird gewarnt (Meter, je Genauigkeit der Adresse)
+PHOTO_MISMATCH_M = {"stadt": 10000}
+PHOTO_MISMATCH_DEFAULT_M = 250
+
+# Abweichung zwischen Foto-GPS und eingegebener Adresse melden. Die Adresse wird nur über
+# geocode_cache und den lokalen Gazetteer aufgelöst (kein Netzwerk beim Speichern).
+def warn_photo_mismatch(photo_position, standort, stadt):
+    address = f"{standort}, {stadt}, Deutschland"
+    result = geocode(address, backends=["gazetteer"])
+    if result is None:
+        return
+    photo_lat, photo_lng, photo_name = photo_position
+    distance = float(haversine_m(photo_lat, photo_lng, result['lat'], result['lng']))
+    if distance > PHOTO_MISMATCH_M.get(result['precision'], PHOTO_MISMATCH_DEFAULT_M):
+        distance_text = f"{distance:,.0f}".replace(",", ".")
+        st.warning(
+            f"Die Fotoposition aus {photo_name} liegt {distance_text} m von der eingegebenen Adresse "
+            f"({result['display_name']}) entfernt. Bitte Adresse und Koordinaten prüfen."
+        )
 
 # Initialisiere session_state für seiten-Variable
 if 'seiten' not in st.session_state:
@@ -19,22 +65,6 @@ if 'seiten' not in st.session_state:
 
 st.title("Standort erfassen")
 
-# Funktion für die Geocodierung
-@st.cache_data
-def get_coordinates(address):
-    """
-    Adresse in Geokoordinaten umwandeln unter Verwendung von Nominatim (OpenStreetMap).
-    Returns: (latitude, longitude) oder None bei Fehlern
-    """
-    try:
-        geolocator = Nominatim(user_agent="stroer_digital_saeule")
-        location = geolocator.geocode(address, timeout=10)
-        if location:
-            return (location.latitude, location.longitude, location.raw)
-        return None
-    except (GeocoderTimedOut, GeocoderUnavailable):
-        return None
-
 # Geokoordinaten-Berechner in einem Expander
 with st.expander("🔍 Geokoordinaten-Berechner", expanded=False):
     geo_col1, geo_col2 = st.columns([2, 1])
@@ -53,13 +83,16 @@ with st.expander("🔍 Geokoordinaten-Berechner", expanded=False):
         if st.button("Koordinaten berechnen", disabled=not (geo_street and geo_city)):
             if geo_address:
                 with st.spinner("Berechne Koordinaten..."):
-                    result = get_coordinates(geo_address)
+                    # Persistenter Cache, lokaler Gazetteer, Nominatim nur als Fallback (geocoding.py)
+                    result = geocode(geo_address)
                     if result:
-                        lat, lon, raw_data = result
+                        lat, lon = result['lat'], result['lng']
                         st.session_state.calculated_lat = lat
                         st.session_state.calculated_lon = lon
-                        st.session_state.calculated_address = raw_data.get('display_name', geo_address)
+                        st.session_state.calculated_address = result['display_name']
                         st.success(f"Koordinaten gefunden: {lat:.6f}, {lon:.6f}")
+                        if result['precision'] == "stadt":
+                            st.warning("Nur der Stadtmittelpunkt wurde gefunden. Bitte Koordinaten prüfen.")
                     else:
                         st.error("Keine Koordinaten für diese Adresse gefunden. Bitte Eingabe prüfen.")
     
@@ -138,21 +171,58 @@ if vermarktungsform != "Digitale Säule" and seiten == "dreiseitig":
     seiten = "einseitig"
     st.session_state.seiten = "einseitig"
 
+# Bilder hochladen - außerhalb des Formulars, damit GPS-Position und Aufnahmedatum
+# aus den Fotos schon vor dem Speichern ins Formular übernommen werden
+st.markdown("### Bilder")
+st.write("Bilder in unterschiedlichen Entfernungen je Werbeträgerseite")
+upload_columns = st.columns(SIDE_COUNT[seiten])
+uploaded_files = []
+for side, upload_column in zip(SIDES, upload_columns):
+    with upload_column:
+        side_files = st.file_uploader(f"Bilder Seite {side}", accept_multiple_files=True,
+                                      type=['jpg', 'png', 'jpeg'], key=f"upload_{side}")
+        uploaded_files += [(side, uploaded_file) for uploaded_file in side_files or []]
+
+# EXIF: erste Fotoposition mit GPS und frühester Aufnahmezeitpunkt.
+# Je Upload nur einmal gelesen (file_id bleibt über Reruns gleich), nicht bei jeder Eingabe erneut
+photo_position = None
+photo_taken_at = None
+exif_by_file = st.session_state.setdefault('exif_by_file', {})
+for side, uploaded_file in uploaded_files:
+    if uploaded_file.file_id not in exif_by_file:
+        exif_by_file[uploaded_file.file_id] = read_exif(uploaded_file.getvalue())
+    exif = exif_by_file[uploaded_file.file_id]
+    if exif is None:
+        continue
+    if photo_position is None and exif['lat'] is not None:
+        photo_position = (exif['lat'], exif['lng'], uploaded_file.name)
+    if exif['taken_at'] and (photo_taken_at is None or exif['taken_at'] < photo_taken_at):
+        photo_taken_at = exif['taken_at']
+
+if photo_position is not None:
+    photo_lat, photo_lng, photo_name = photo_position
+    st.info(f"GPS-Position aus {photo_name}: {photo_lat:.6f}, {photo_lng:.6f} (ins Formular übernommen)")
+if photo_taken_at is not None:
+    st.caption(f"Aufnahmedatum laut Foto: {photo_taken_at:%d.%m.%Y} (ins Formular übernommen)")
+
 # Hauptformular für die Standorterfassung
 with st.form(key='location_form'):
     col1, col2 = st.columns(2)
     
     with col1:
         name = st.text_input("Name des Erfassers", max_chars=50)
-        datum = st.date_input("Datum der Akquisition")
+        datum = st.date_input("Datum der Akquisition",
+                              value=photo_taken_at.date() if photo_taken_at else datetime.now().date())
         standort = st.text_input("Standortbezeichnung (Straßenname)", 
                                value=geo_street if 'calculated_address' in st.session_state else "")
         stadt = st.text_input("Ort (Stadt)", 
                             value=geo_city if 'calculated_address' in st.session_state else "")
         
-        # Verwende die berechneten Koordinaten, wenn vorhanden
+        # GPS aus dem Foto hat Vorrang (vor Ort aufgenommen), sonst die berechneten Koordinaten
         default_lat = st.session_state.calculated_lat if 'calculated_lat' in st.session_state else 50.0
         default_lon = st.session_state.calculated_lon if 'calculated_lon' in st.session_state else 10.0
+        if photo_position is not None:
+            default_lat, default_lon = photo_position[0], photo_position[1]
         
         lat = st.number_input("Breitengrad", -90.0, 90.0, default_lat, format="%.6f")
         lng = st.number_input("Längengrad", -180.0, 180.0, default_lon, format="%.6f")
@@ -172,48 +242,49 @@ with st.form(key='location_form'):
         # Anzeige der ausgewählten Seitenanzahl (ohne Auswahl)
         st.write(f"**Ausgewählte Seitenanzahl:** {seiten}")
     
-    # Bilder hochladen - außerhalb der Spalten, aber innerhalb des Formulars
-    st.write("Bilder in unterschiedlichen Entfernungen je Werbeträgerseite")
-    uploaded_files = st.file_uploader("Bilder hochladen", accept_multiple_files=True, 
-                                      type=['jpg', 'png', 'jpeg'])
+    # Bestätigung erst anzeigen, nachdem die Dublettenprüfung angeschlagen hat
+    confirm_label = "Standort trotz möglicher Dublette speichern"
+    confirm_rendered = 'duplicate_coordinates' in st.session_state
+    confirm_duplicate = st.checkbox(confirm_label, key="confirm_duplicate") if confirm_rendered else False
 
     # Submit-Button richtig platzieren (innerhalb des form-Blocks)
     submit_button = st.form_submit_button("Standort speichern")
     
     # Wichtig: Überprüfe, ob der Button gedrückt wurde
     if submit_button:
+        if photo_position is not None and standort and stadt:
+            warn_photo_mismatch(photo_position, standort, stadt)
         if not name or not standort or not stadt:
             st.error("Bitte füllen Sie alle Pflichtfelder aus.")
         elif umruestung == "Umrüstung" and not alte_nummer:
             st.error("Bitte geben Sie die alte Werbeträgernummer an.")
         elif not uploaded_files:
             st.error("Bitte laden Sie mindestens ein Bild hoch.")
+        elif not (confirm_duplicate and st.session_state.get('duplicate_coordinates') == (lat, lng)) \
+                and show_nearby_locations(lat, lng):
+            if not confirm_rendered:
+                st.checkbox(confirm_label, key="confirm_duplicate")
         else:
             location_id = str(uuid.uuid4())
             # Immer zuerst zum Leiter Akquisition!
             next_step = "leiter_akquisition"
-            c.execute('''
-            INSERT INTO locations (id, erfasser, datum, standort, stadt, lat, lng, 
-                                  leistungswert, eigentuemer, umruestung, alte_nummer, 
-                                  seiten, vermarktungsform, status, current_step, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                location_id, name, datum.isoformat(), standort, stadt, lat, lng,
-                leistungswert, eigentuemer, umruestung == "Umrüstung", alte_nummer,
-                seiten, vermarktungsform, "active", next_step, 
-                datetime.now().isoformat()
-            ))
-            
-            # Workflow-History-Eintrag erstellen
-            history_id = str(uuid.uuid4())
-            c.execute('''
-            INSERT INTO workflow_history VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                history_id, location_id, "erfassung", "completed", 
-                "Standort erfasst", name, datetime.now().isoformat()
-            ))
+            with transaction() as conn:
+                conn.execute(INSERT_LOCATION_SQL, (
+                    location_id, name, datum.isoformat(), standort, stadt, lat, lng,
+                    leistungswert, eigentuemer, umruestung == "Umrüstung", alte_nummer,
+                    seiten, vermarktungsform, "active", next_step, 
+                    datetime.now().isoformat()
+                ))
+                
+                # Workflow-History-Eintrag erstellen
+                insert_history(conn, location_id, "erfassung", "completed", "Standort erfasst", name)
+
+                # Fotos inhaltsadressiert ablegen und verknüpfen
+                image_hashes = add_images(conn, location_id, uploaded_files)
+
+            # Vorschaubilder im Hintergrund erzeugen
+            schedule_derivatives(image_hashes)
             
-            conn.commit()
             st.success(f"Standort erfolgreich gespeichert! Die Standort-ID lautet: {location_id}. Der nächste Workflow-Schritt wurde eingeleitet.")
             
             # Session-State zurücksetzen
@@ -223,6 +294,10 @@ with st.form(key='location_form'):
                 del st.session_state.calculated_lon
             if 'calculated_address' in st.session_state:
                 del st.session_state.calculated_address
+            if 'duplicate_coordinates' in st.session_state:
+                del st.session_state.duplicate_coordinates
+            if 'exif_by_file' in st.session_state:
+                del st.session_state.exif_by_file
 
 # Hinweise zur Erfassung
 st.markdown("""
@@ -230,7 +305,10 @@ st.markdown("""
 
 - Alle mit * markierten Felder sind Pflichtfelder
 - Nutzen Sie den Geokoordinaten-Berechner für eine präzise Standortbestimmung
+- Fotos mit GPS-Position füllen Koordinaten und Datum automatisch aus
 - Bei Umrüstungen muss die alte Werbeträgernummer angegeben werden
 - Bei der Digitalen Säule kann auch eine dreiseitige Variante ausgewählt werden
 - Fügen Sie für jede Seite des Werbeträgers mindestens ein Bild hinzu
-""")
\ No newline at end of file
+""")
+
+finish_profile()
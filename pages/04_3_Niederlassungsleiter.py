@@ -1,76 +1,80 @@
 import streamlit as st
-import sqlite3
-import pandas as pd
-from datetime import datetime
-import uuid
+from workflow import transition, transition_many
+from worklist import render_worklist
+from images import render_location_images
+from profiling import start_profile, finish_profile
 
 st.set_page_config(
     page_title="Niederlassungsleiter Genehmigung",
     page_icon="🏢",
     layout="wide"
 )
+start_profile()
 
 st.title("🏢 3. Niederlassungsleiter Genehmigung")
 st.write("In diesem Schritt prüft und genehmigt der Niederlassungsleiter den Standort.")
 
-# Verbindung zur Datenbank herstellen
-conn = sqlite3.connect('werbetraeger.db', check_same_thread=False)
-c = conn.cursor()
+# Entscheidung des Niederlassungsleiters: (Aktion, Kommentar der Historie); nach Genehmigung weiter zu baurecht
+def location_decision(approve, kommentar):
+    if approve:
+        return "approve", kommentar or "Genehmigt"
+    return "reject", kommentar or "Abgelehnt"
 
-# Offene Genehmigungen laden
-c.execute("""
-    SELECT id, standort, stadt, vermarktungsform, datum
-    FROM locations
-    WHERE current_step = 'niederlassungsleiter'
-""")
-rows = c.fetchall()
+# Offene Genehmigungen laden (unabhängig vom Status)
+st.subheader("Offene Genehmigungen")
+bulk_mode = st.checkbox("Sammelentscheidung für mehrere Standorte", key="bulk_mode")
+selected_id = render_worklist(
+    'niederlassungsleiter',
+    {'id': 'ID', 'standort': 'Standort', 'stadt': 'Stadt', 'vermarktungsform': 'Vermarktungsform', 'datum': 'Erfasst am'},
+    select_label="Standort auswählen:",
+    empty_message="Keine offenen Genehmigungen vorhanden.",
+    active_only=False,
+    multi=bulk_mode
+)
 
-if rows:
-    st.subheader("Offene Genehmigungen")
-    df = pd.DataFrame(rows, columns=["ID", "Standort", "Stadt", "Vermarktungsform", "Erfasst am"])
-    st.dataframe(df, use_container_width=True)
-    
-    selected_id = st.selectbox("Standort auswählen:", df["ID"])
-    if selected_id:
-        st.write(f"Genehmigung für Standort: {selected_id}")
-        with st.form("niederlassungsleiter_form"):
+if bulk_mode:
+    selected_rows, selected_id = selected_id, None
+    if selected_rows is None:
+        st.info("Standorte in der Spalte „Auswahl“ anhaken, um gemeinsam zu entscheiden.")
+    else:
+        with st.form("niederlassungsleiter_bulk_form"):
+            st.write(f"Sammelentscheidung für {len(selected_rows)} Standorte")
             genehmigt = st.radio("Genehmigung durch Niederlassungsleiter:", ["Genehmigt", "Abgelehnt"])
-            kommentar = st.text_area("Kommentar (optional):")
-            submitted = st.form_submit_button("Speichern")
-            if submitted:
-                now = datetime.now().isoformat()
-                history_id = str(uuid.uuid4())
-                if genehmigt == "Genehmigt":
-                    # Nach Genehmigung weiter zu baurecht!
-                    c.execute('''
-                        UPDATE locations
-                        SET current_step = ?, status = ?
-                        WHERE id = ?
-                    ''', ("baurecht", "active", selected_id))
-                    c.execute('''
-                        INSERT INTO workflow_history VALUES (?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        history_id, selected_id, "niederlassungsleiter", "approved",
-                        kommentar or "Genehmigt", st.session_state.get('username', 'Niederlassungsleiter'), now
-                    ))
-                    conn.commit()
-                    st.success("Genehmigung gespeichert und an Baurecht weitergeleitet.")
-                    st.rerun()
-                else:
-                    # Ablehnung
-                    c.execute('''
-                        UPDATE locations
-                        SET current_step = ?, status = ?
-                        WHERE id = ?
-                    ''', ("abgelehnt", "abgelehnt", selected_id))
-                    c.execute('''
-                        INSERT INTO workflow_history VALUES (?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        history_id, selected_id, "niederlassungsleiter", "rejected",
-                        kommentar or "Abgelehnt", st.session_state.get('username', 'Niederlassungsleiter'), now
-                    ))
-                    conn.commit()
-                    st.success("Ablehnung gespeichert.")
-                    st.rerun()
-else:
-    st.info("Keine offenen Genehmigungen vorhanden.")
\ No newline at end of file
+            kommentar = st.text_area("Gemeinsamer Kommentar (optional):")
+            if st.form_submit_button(f"Für {len(selected_rows)} Standorte speichern"):
+                decision = location_decision(genehmigt == "Genehmigt", kommentar)
+                changed = transition_many(
+                    "niederlassungsleiter",
+                    [(location_id,) + decision for location_id in selected_rows['id']],
+                    st.session_state.get('username', 'Niederlassungsleiter')
+                )
+                st.success(f"{len(changed)} Entscheidungen gespeichert.")
+                if len(changed) < len(selected_rows):
+                    st.warning(f"{len(selected_rows) - len(changed)} Standorte wurden inzwischen anderweitig bearbeitet und übersprungen.")
+                st.rerun()
+
+if selected_id:
+    st.write(f"Genehmigung für Standort: {selected_id}")
+    with st.expander("Bilder des Standorts"):
+        render_location_images(selected_id)
+    with st.form("niederlassungsleiter_form"):
+        genehmigt = st.radio("Genehmigung durch Niederlassungsleiter:", ["Genehmigt", "Abgelehnt"])
+        kommentar = st.text_area("Kommentar (optional):")
+        submitted = st.form_submit_button("Speichern")
+        if submitted:
+            action, message = location_decision(genehmigt == "Genehmigt", kommentar)
+            try:
+                transition(
+                    selected_id, action, st.session_state.get('username', 'Niederlassungsleiter'), message,
+                    step="niederlassungsleiter"
+                )
+            except ValueError as e:
+                st.error(f"Entscheidung nicht möglich: {e}")
+                st.stop()
+            if genehmigt == "Genehmigt":
+                st.success("Genehmigung gespeichert und an Baurecht weitergeleitet.")
+            else:
+                st.success("Ablehnung gespeichert.")
+            st.rerun()
+
+finish_profile()
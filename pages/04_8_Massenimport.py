@@ -0,0 +1,90 @@
+import streamlit as st
+import pandas as pd
+from bulk_import import import_file, template_csv, errors_csv, CHUNK_SIZE
+from profiling import start_profile, finish_profile
+
+# Streamlit-Seiteneinstellungen
+st.set_page_config(layout="wide", page_title="Massenimport")
+start_profile()
+
+st.title("📥 Massenimport von Standorten")
+st.write(
+    "Standorte aus einer CSV- oder Excel-Datei erfassen. Es gelten dieselben Regeln wie im Erfassungsformular; "
+    "fehlende Koordinaten werden über den Geocoding-Cache ermittelt. Fehlerhafte Zeilen werden übersprungen "
+    "und mit Zeilennummer aufgelistet."
+)
+
+st.download_button(
+    "Vorlage herunterladen (CSV)",
+    data=template_csv().encode("utf-8-sig"),
+    file_name="standorte_vorlage.csv",
+    mime="text/csv"
+)
+
+uploaded_file = st.file_uploader("Datei auswählen", type=["csv", "xlsx"])
+dry_run = st.checkbox("Nur prüfen (nichts speichern)", value=True)
+# Nominatim ist auf eine Anfrage pro Sekunde gedrosselt; ohne Netz bleiben nicht gefundene Adressen Fehler
+offline = st.checkbox(
+    "Nur lokalen Gazetteer verwenden (ohne Nominatim)", value=True,
+    help="Mit Nominatim dauert jede nicht im Cache oder Gazetteer gefundene Adresse etwa eine Sekunde."
+)
+allow_city = st.checkbox(
+    "Stadtmittelpunkt als Koordinaten zulassen", value=False,
+    help="Sonst sind Zeilen, deren Adresse nur auf die Stadt aufgelöst wird, Fehler und müssen lat/lng angeben."
+)
+
+if uploaded_file is not None and st.button("Import starten", type="primary"):
+    progress_bar = st.progress(0.0, text="Import läuft...")
+    # Zeilenzahl ist beim Streamen unbekannt; Fortschritt grob über die Dateigröße schätzen
+    estimated_rows = max(uploaded_file.size // 120, CHUNK_SIZE)
+
+    def update_progress(rows):
+        progress_bar.progress(min(rows / estimated_rows, 1.0), text=f"{rows} Zeilen verarbeitet")
+
+    try:
+        result = import_file(
+            uploaded_file, uploaded_file.name, dry_run=dry_run,
+            geocoders=["gazetteer"] if offline else None, progress=update_progress, allow_city=allow_city
+        )
+    except (ValueError, ImportError) as e:
+        progress_bar.empty()
+        st.error(f"Import nicht möglich: {e}")
+        st.stop()
+    progress_bar.progress(1.0, text=f"{result['rows']} Zeilen verarbeitet")
+    st.session_state.import_result = result
+    st.session_state.import_dry_run = dry_run
+
+if 'import_result' in st.session_state:
+    result = st.session_state.import_result
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Zeilen", result['rows'])
+    col2.metric("Gültig" if st.session_state.import_dry_run else "Importiert", result['imported'])
+    col3.metric("Fehler", len(result['errors']))
+
+    if st.session_state.import_dry_run:
+        st.info("Trockenlauf: es wurde nichts gespeichert.")
+    elif result['imported']:
+        st.success(f"{result['imported']} Standorte erfasst und an den Leiter Akquisition weitergeleitet.")
+
+    if result['errors']:
+        st.subheader("Fehlerhafte Zeilen")
+        st.dataframe(
+            pd.DataFrame(result['errors'], columns=["Zeile", "Fehler"]),
+            hide_index=True, use_container_width=True
+        )
+        st.download_button(
+            "Fehlerliste herunterladen",
+            data=errors_csv(result['errors']).encode("utf-8-sig"),
+            file_name="import_fehler.csv",
+            mime="text/csv"
+        )
+
+    if result['warnings']:
+        with st.expander(f"Hinweise ({len(result['warnings'])})"):
+            st.dataframe(
+                pd.DataFrame(result['warnings'], columns=["Zeile", "Hinweis"]),
+                hide_index=True, use_container_width=True
+            )
+
+finish_profile()
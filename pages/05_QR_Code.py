@@ -1,8 +1,10 @@
 import streamlit as st
 import qrcode
 from io import BytesIO
+from profiling import start_profile, finish_profile
 
 st.set_page_config(page_title="App QR-Code", page_icon="🔗", layout="centered")
+start_profile()
 st.title("🔗 QR-Code für den Schnellzugriff")
 
 # Link zur App (hier anpassen!)
@@ -27,4 +29,6 @@ img.save(buf, format="PNG")
 st.image(buf.getvalue(), width=250)
 
 st.markdown(f"**App-Link:** [{app_url}]({app_url})")
-st.info("Tipp: Du kannst den QR-Code auch herunterladen, indem du mit Rechtsklick darauf klickst und 'Bild speichern unter...' wählst.")
\ No newline at end of file
+st.info("Tipp: Du kannst den QR-Code auch herunterladen, indem du mit Rechtsklick darauf klickst und 'Bild speichern unter...' wählst.")
+
+finish_profile()
@@ -0,0 +1,104 @@
+import streamlit as st
+from search import build_match_query, count_matches, search_locations, PAGE_SIZE
+from profiling import start_profile, finish_profile, phase
+
+# Streamlit-Seiteneinstellungen
+st.set_page_config(layout="wide", page_title="Standort-Suche", page_icon="🔍")
+start_profile()
+
+st.title("🔍 Standort-Suche")
+st.write(
+    "Volltextsuche über Standort, Stadt, Erfasser, alte Werbeträgernummer, Netzwerk-ID, DMS-ID "
+    "und alle Kommentare der Workflow-Historie. Wortanfänge genügen, kleine Tippfehler werden toleriert."
+)
+
+# Bearbeitungsseite je Prozessschritt (Schritte mit Arbeitsliste)
+STEP_PAGES = {
+    'leiter_akquisition': "pages/04_2_Akquisitionsleiter.py",
+    'niederlassungsleiter': "pages/04_3_Niederlassungsleiter.py",
+    'baurecht': "pages/04_4_Baurecht.py",
+    'widerspruch': "pages/04_4_Baurecht.py",
+    'ceo': "pages/04_5_CEO_Genehmigung.py",
+    'bauteam': "pages/04_6_Bauteam.py",
+    'fertigstellung': "pages/04_7_Fertigstellung.py",
+}
+
+step_labels = {
+    'erfassung': 'Erfassung',
+    'leiter_akquisition': 'Leiter Akquisition',
+    'niederlassungsleiter': 'Niederlassungsleiter',
+    'baurecht': 'Baurecht',
+    'widerspruch': 'Widerspruch',
+    'ceo': 'CEO',
+    'bauteam': 'Bauteam',
+    'fertigstellung': 'Fertigstellung',
+    'fertig': 'Fertig',
+    'abgelehnt': 'Abgelehnt',
+    'abgebrochen': 'Abgebrochen'
+}
+
+text = st.text_input("Suchbegriffe", placeholder="z.B. Königsallee Düsseldorf, DS-1234 oder Widerspruch").strip()
+
+match_query, corrections = build_match_query(text)
+if match_query is None:
+    st.info("Suchbegriff eingeben, um Standorte zu finden.")
+    finish_profile()
+    st.stop()
+
+for token, alternatives in corrections.items():
+    st.caption(f"„{token}“ kommt nicht vor, gesucht wurde stattdessen nach: {', '.join(alternatives)}")
+
+# Blätterzustand: Stapel der Cursor aller bisher besuchten Seiten, zurückgesetzt bei neuer Suche
+state = st.session_state.setdefault("standort_suche", {'query': match_query, 'cursors': [None]})
+if state['query'] != match_query:
+    state['query'] = match_query
+    state['cursors'] = [None]
+
+with phase("sql"):
+    total = count_matches(match_query)
+    results, next_cursor = search_locations(match_query, state['cursors'][-1])
+
+if results.empty:
+    st.warning("Keine Standorte gefunden.")
+    finish_profile()
+    st.stop()
+
+st.write(f"**{total} Treffer**, beste zuerst.")
+display_df = results[['standort', 'stadt', 'vermarktungsform', 'current_step', 'status', 'treffer']].copy()
+display_df['current_step'] = display_df['current_step'].map(lambda step: step_labels.get(step, step))
+display_df.columns = ['Standort', 'Stadt', 'Vermarktungsform', 'Schritt', 'Status', 'Treffer']
+st.dataframe(display_df, hide_index=True)
+
+page_number = len(state['cursors'])
+col_prev, col_page, col_next = st.columns([1, 2, 1])
+with col_prev:
+    if st.button("◀ Zurück", key="standort_suche_prev", disabled=page_number == 1):
+        state['cursors'].pop()
+        st.rerun()
+with col_page:
+    st.caption(f"Seite {page_number} von {-(-total // PAGE_SIZE)}")
+with col_next:
+    if st.button("Weiter ▶", key="standort_suche_next", disabled=next_cursor is None):
+        state['cursors'].append(next_cursor)
+        st.rerun()
+
+# Direkt zum Standort in seinem aktuellen Schritt
+rows_by_id = results.set_index('id', drop=False).to_dict('index')
+selected_id = st.selectbox(
+    "Standort öffnen:",
+    options=list(rows_by_id),
+    format_func=lambda location_id: (
+        f"{rows_by_id[location_id]['standort']}, {rows_by_id[location_id]['stadt']} "
+        f"({step_labels.get(rows_by_id[location_id]['current_step'], rows_by_id[location_id]['current_step'])})"
+    )
+)
+step = rows_by_id[selected_id]['current_step']
+if step in STEP_PAGES:
+    if st.button(f"Zum Schritt {step_labels[step]} wechseln", type="primary"):
+        # Die Arbeitsliste des Zielschritts filtert auf die ID, der Standort ist damit vorausgewählt
+        st.session_state[f"worklist_{step}_search"] = selected_id
+        st.switch_page(STEP_PAGES[step])
+else:
+    st.caption(f"Für den Schritt „{step_labels.get(step, step)}“ gibt es keine Bearbeitungsseite.")
+
+finish_profile()
@@ -0,0 +1,110 @@
+import os
+
+import pandas as pd
+import streamlit as st
+
+from db import get_connection
+from indexes import HOT_QUERIES, QUERY_PLANS, explain, has_full_scan
+import query_stats
+# Registrieren beim Import ihre Hot-Queries, damit der Plan-Check hier vollständig ist
+import aggregates, dwell_time, search, spatial, worklist  # noqa: F401,E401
+from profiling import start_profile, finish_profile
+
+st.set_page_config(page_title="Query-Statistik", page_icon="🛠️", layout="wide")
+start_profile()
+
+# Versteckte Admin-Seite: nur mit ?admin=1 in der URL oder WERBETRAEGER_ADMIN=1
+if st.query_params.get("admin") != "1" and os.environ.get("WERBETRAEGER_ADMIN") != "1":
+    st.info("Diese Seite ist nur für Administratoren verfügbar.")
+    st.stop()
+
+st.title("🛠️ Query-Statistik")
+st.write(
+    f"Laufzeiten aller SQL-Statements seit dem Start des Servers (inkl. Fetch). "
+    f"Statements ab {query_stats.SLOW_QUERY_MS:.0f} ms landen im Slow-Query-Log `{query_stats.SLOW_QUERY_LOG}`."
+)
+
+if not query_stats.ENABLED:
+    st.warning("Die Messung ist deaktiviert (WERBETRAEGER_QUERY_STATS=0).")
+
+# Ergebnis des Query-Plan-Checks (beim Start bzw. bei der Registrierung jeder Hot-Query)
+get_connection()
+with st.expander("Hot-Queries: Query-Plan-Check", expanded=any(map(has_full_scan, QUERY_PLANS.values()))):
+    plans = pd.DataFrame([
+        {'name': name, 'full_scan': has_full_scan(QUERY_PLANS.get(name, [])),
+         'plan': "; ".join(QUERY_PLANS.get(name, ["(nicht geprüft)"]))}
+        for name in HOT_QUERIES
+    ])
+    st.dataframe(
+        plans.sort_values(['full_scan', 'name'], ascending=[False, True]),
+        column_config={
+            'name': "Hot-Query",
+            'full_scan': st.column_config.CheckboxColumn("Full Scan"),
+            'plan': st.column_config.TextColumn("Plan", width="large"),
+        },
+        hide_index=True, use_container_width=True
+    )
+
+stats = pd.DataFrame(query_stats.snapshot())
+if stats.empty:
+    st.info("Noch keine Statements gemessen.")
+    st.stop()
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    pages = ["Alle"] + sorted(stats['page'].unique())
+    selected_page = st.selectbox("Seite", pages)
+with col2:
+    top_n = st.slider("Top N", min_value=5, max_value=100, value=20, step=5)
+with col3:
+    st.write("")
+    if st.button("Statistik zurücksetzen"):
+        query_stats.reset()
+        st.rerun()
+
+if selected_page != "Alle":
+    stats = stats[stats['page'] == selected_page]
+
+column_config = {
+    'page': "Seite",
+    'sql': st.column_config.TextColumn("SQL", width="large"),
+    'calls': "Aufrufe",
+    'total_ms': st.column_config.NumberColumn("Gesamt (ms)", format="%.1f"),
+    'avg_ms': st.column_config.NumberColumn("Ø (ms)", format="%.2f"),
+    'max_ms': st.column_config.NumberColumn("Max (ms)", format="%.1f"),
+    'rows': "Zeilen",
+    'params': "Parameter",
+}
+
+tab_slow, tab_frequent, tab_log = st.tabs(["Langsamste", "Häufigste", "Slow-Query-Log"])
+
+with tab_slow:
+    slowest = stats.sort_values('total_ms', ascending=False).head(top_n).reset_index(drop=True)
+    st.dataframe(slowest, column_config=column_config, hide_index=True, use_container_width=True)
+
+with tab_frequent:
+    frequent = stats.sort_values('calls', ascending=False).head(top_n).reset_index(drop=True)
+    st.dataframe(frequent, column_config=column_config, hide_index=True, use_container_width=True)
+
+with tab_log:
+    entries = query_stats.read_slow_log()
+    if entries:
+        st.dataframe(pd.DataFrame(entries), hide_index=True, use_container_width=True)
+    else:
+        st.info("Keine Einträge im Slow-Query-Log.")
+
+# Query-Plan eines Statements (Parameter werden als NULL eingesetzt)
+st.subheader("Query-Plan")
+selected_sql = st.selectbox("Statement", slowest['sql'].tolist())
+if selected_sql:
+    if selected_sql.split(None, 1)[0].upper() in ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT"):
+        param_count = selected_sql.count("?")
+        try:
+            plan = explain(get_connection(), selected_sql, [None] * param_count)
+            st.code("\n".join(plan) or "(kein Plan)", language="text")
+        except Exception as e:
+            st.warning(f"EXPLAIN QUERY PLAN nicht möglich: {e}")
+    else:
+        st.info("Für dieses Statement gibt es keinen Query-Plan.")
+
+finish_profile()
@@ -0,0 +1,219 @@
+import atexit
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+import query_stats
+
+# Opt-in-Profiling einzelner Seiten-Reruns.
+# Aktiv mit ?profile=1 in der URL oder WERBETRAEGER_PROFILE=1 (cProfile + Sampling)
+# bzw. profile=sample (nur Sampling, geringerer Overhead).
+# Je Rerun entstehen in PROFILE_DIR: <zeit>_<seite>_<session>.json (Phasen), .collapsed (Flamegraph) und .prof (cProfile).
+# Seiten rufen start_profile() am Anfang und finish_profile() am Ende auf; bricht ein Rerun vorher ab
+# (st.stop, st.rerun, Exception), wird das Profil beim nächsten Start derselben Session geschrieben.
+
+PROFILE_DIR = os.environ.get("WERBETRAEGER_PROFILE_DIR", "profiles")
+
+# Abstand der Stack-Samples in Sekunden
+SAMPLE_INTERVAL = float(os.environ.get("WERBETRAEGER_PROFILE_INTERVAL", "0.005"))
+
+MODES = {"1": "cprofile", "cprofile": "cprofile", "sample": "sample"}
+
+# Session-ID -> offenes Profil, Thread-ID -> offenes Profil (für Phasen und SQL-Zeiten)
+_by_session = {}
+_by_thread = {}
+_lock = threading.Lock()
+
+# Nur ein cProfile gleichzeitig je Prozess sinnvoll; weitere Sessions werden nur gesampelt
+_cprofile_busy = threading.Lock()
+
+
+def _requested_mode():
+    mode = os.environ.get("WERBETRAEGER_PROFILE", "")
+    try:
+        import streamlit as st
+        mode = st.query_params.get("profile", mode)
+    except Exception:
+        pass
+    return MODES.get(mode)
+
+
+def _session_id():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+    except ImportError:
+        ctx = None
+    return re.sub(r"[^\w-]", "-", ctx.session_id[:8]) if ctx is not None else "local"
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _sample(profile):
+    # Stack des Skript-Threads periodisch abgreifen; Wurzel ist die aktuelle Phase, dann das Seitenskript
+    stacks = profile['stacks']
+    while not profile['stop'].wait(SAMPLE_INTERVAL):
+        frame = sys._current_frames().get(profile['thread'])
+        if frame is None:
+            profile['ended'] = time.perf_counter()
+            break
+        labels = []
+        while frame is not None:
+            labels.append(_frame_label(frame))
+            if frame.f_code.co_filename == profile['script']:
+                break
+            frame = frame.f_back
+        else:
+            # Skriptframe nicht mehr auf dem Stack: Rerun ist beendet (abgebrochen)
+            profile['ended'] = time.perf_counter()
+            break
+        phase_stack = profile['phase_stack']
+        labels.append(phase_stack[-1][0] if phase_stack else "page")
+        stacks[";".join(reversed(labels))] += 1
+
+
+def _on_query(page, elapsed_ms):
+    profile = _by_thread.get(threading.get_ident())
+    if profile is not None:
+        _add_phase(profile, "sql", elapsed_ms)
+
+
+def _add_phase(profile, name, elapsed_ms, child_ms=0.0):
+    # Phasenzeiten exklusiv: verschachtelte Phasen werden der umgebenden Phase abgezogen
+    profile['phases'][name] = profile['phases'].get(name, 0.0) + elapsed_ms - child_ms
+    if profile['phase_stack']:
+        profile['phase_stack'][-1][2] += elapsed_ms
+
+
+@contextmanager
+def phase(name):
+    """
+    Markiert einen Abschnitt (z.B. "pandas", "plotly", "pydeck") im laufenden Profil.
+    Ohne aktives Profil ohne Wirkung.
+    """
+    profile = _by_thread.get(threading.get_ident())
+    if profile is None:
+        yield
+        return
+    entry = [name, time.perf_counter(), 0.0]
+    profile['phase_stack'].append(entry)
+    try:
+        yield
+    finally:
+        profile['phase_stack'].pop()
+        _add_phase(profile, name, (time.perf_counter() - entry[1]) * 1000, entry[2])
+
+
+def start_profile():
+    """
+    Startet das Profil für den aktuellen Rerun des aufrufenden Seitenskripts, falls angefordert.
+    Ein offenes Profil derselben Session (abgebrochener Rerun) wird vorher geschrieben.
+    """
+    session = _session_id()
+    with _lock:
+        dangling = _by_session.pop(session, None)
+    if dangling is not None:
+        _write(dangling, complete=False)
+
+    mode = _requested_mode()
+    if mode is None:
+        return
+
+    script = sys._getframe(1).f_code.co_filename
+    profile = {
+        'page': os.path.splitext(os.path.basename(script))[0],
+        'session': session,
+        'mode': mode,
+        'script': script,
+        'thread': threading.get_ident(),
+        'started_at': datetime.now(),
+        'started': time.perf_counter(),
+        'phases': {},
+        'phase_stack': [],
+        'stacks': Counter(),
+        'stop': threading.Event(),
+        'profiler': None,
+        'ended': None,
+    }
+    if mode == "cprofile" and _cprofile_busy.acquire(blocking=False):
+        profile['profiler'] = cProfile.Profile()
+        profile['profiler'].enable()
+    profile['sampler'] = threading.Thread(target=_sample, args=(profile,), name="profile-sampler", daemon=True)
+    profile['sampler'].start()
+
+    with _lock:
+        _by_session[session] = profile
+        _by_thread[profile['thread']] = profile
+
+
+def finish_profile():
+    """Beendet das Profil des aktuellen Reruns und schreibt die Dateien."""
+    with _lock:
+        profile = _by_session.pop(_session_id(), None)
+    if profile is not None:
+        _write(profile, complete=True)
+
+
+def _write(profile, complete):
+    ended = time.perf_counter() if complete else profile['ended']
+    profile['stop'].set()
+    with _lock:
+        if _by_thread.get(profile['thread']) is profile:
+            del _by_thread[profile['thread']]
+    if profile['profiler'] is not None:
+        profile['profiler'].disable()
+        _cprofile_busy.release()
+    if profile['sampler'] is not threading.current_thread():
+        profile['sampler'].join()
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(
+        PROFILE_DIR, f"{profile['started_at']:%Y%m%d-%H%M%S-%f}_{profile['page']}_{profile['session']}"
+    )
+    if profile['profiler'] is not None:
+        profile['profiler'].dump_stats(base + ".prof")
+    with open(base + ".collapsed", "w", encoding="utf-8") as f:
+        for stack, count in profile['stacks'].most_common():
+            f.write(f"{stack} {count}\n")
+
+    # Abgebrochene Reruns enden, wenn der Sampler das Seitenskript nicht mehr findet; sonst Schätzung aus den Samples
+    samples = sum(profile['stacks'].values())
+    total_ms = (ended - profile['started']) * 1000 if ended is not None else samples * SAMPLE_INTERVAL * 1000
+    phases = {name: round(ms, 3) for name, ms in sorted(profile['phases'].items(), key=lambda item: -item[1])}
+    phases['sonstiges'] = round(max(total_ms - sum(profile['phases'].values()), 0.0), 3)
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump({
+            'page': profile['page'],
+            'session': profile['session'],
+            'mode': profile['mode'] if profile['profiler'] is not None else "sample",
+            'started_at': profile['started_at'].isoformat(),
+            'complete': complete,
+            'total_ms': round(total_ms, 3),
+            'phases_ms': phases,
+            'samples': samples,
+            'sample_interval_ms': SAMPLE_INTERVAL * 1000,
+        }, f, indent=2, ensure_ascii=False)
+    return base
+
+
+def flush_all():
+    # Offene Profile beim Beenden des Servers schreiben
+    with _lock:
+        profiles = list(_by_session.values())
+        _by_session.clear()
+    for profile in profiles:
+        _write(profile, complete=False)
+
+
+query_stats.listeners.append(_on_query)
+atexit.register(flush_all)
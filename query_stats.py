@@ -0,0 +1,192 @@
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+# Laufzeitmessung aller SQL-Statements der App.
+# db.py öffnet Verbindungen mit InstrumentedConnection; jedes execute wird mit Seite,
+# SQL-Text, Parameterform, Zeilenzahl und Laufzeit (inkl. Fetch) erfasst.
+
+# Statements ab dieser Laufzeit (ms) werden ins Slow-Query-Log geschrieben
+SLOW_QUERY_MS = float(os.environ.get("WERBETRAEGER_SLOW_QUERY_MS", "100"))
+SLOW_QUERY_LOG = os.environ.get("WERBETRAEGER_SLOW_QUERY_LOG", "slow_queries.jsonl")
+SLOW_QUERY_LOG_BYTES = 5 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 3
+
+# Messung abschaltbar (z.B. für Benchmarks ohne Messaufwand)
+ENABLED = os.environ.get("WERBETRAEGER_QUERY_STATS", "1") != "0"
+
+# Obergrenze verschiedener (Seite, SQL)-Einträge, damit der Speicher begrenzt bleibt
+MAX_STATEMENTS = 2000
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+PAGES_DIR = os.path.join(ROOT_DIR, "pages")
+
+# (Seite, SQL) -> {calls, total_ms, max_ms, rows, params}
+_stats = {}
+_stats_lock = threading.Lock()
+_page_names = {}
+
+# Weitere Empfänger je gemessenem Statement: listener(page, elapsed_ms), z.B. profiling
+listeners = []
+
+_slow_logger = logging.getLogger("werbetraeger.slow_queries")
+_slow_logger.propagate = False
+
+
+def _slow_log_handler():
+    # Handler erst beim ersten langsamen Statement anlegen (keine Datei ohne Bedarf)
+    if not _slow_logger.handlers:
+        handler = RotatingFileHandler(
+            SLOW_QUERY_LOG, maxBytes=SLOW_QUERY_LOG_BYTES, backupCount=SLOW_QUERY_LOG_BACKUPS, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _slow_logger.addHandler(handler)
+        _slow_logger.setLevel(logging.INFO)
+    return _slow_logger
+
+
+def _page_of(filename):
+    # Seitenskripte liegen in pages/ oder als nummerierte Skripte im Hauptverzeichnis
+    name = _page_names.get(filename)
+    if name is None:
+        directory, base = os.path.split(filename)
+        is_page = directory == PAGES_DIR or (directory == ROOT_DIR and base[:1].isdigit())
+        name = os.path.splitext(base)[0] if is_page else ""
+        _page_names[filename] = name
+    return name
+
+
+def current_page():
+    # Aufrufende Seite anhand des Call-Stacks bestimmen ("-" außerhalb von Seitenskripten)
+    frame = sys._getframe(1)
+    while frame is not None:
+        name = _page_of(frame.f_code.co_filename)
+        if name:
+            return name
+        frame = frame.f_back
+    return "-"
+
+
+def _params_shape(parameters):
+    # Nur Anzahl und Typen der Parameter, keine Werte (personenbezogene Daten)
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+
+
+def record(page, sql, parameters, rows, elapsed_ms):
+    for listener in listeners:
+        listener(page, elapsed_ms)
+    sql = " ".join(sql.split())
+    shape = _params_shape(parameters)
+    with _stats_lock:
+        entry = _stats.get((page, sql))
+        if entry is None:
+            if len(_stats) >= MAX_STATEMENTS:
+                return
+            entry = _stats[(page, sql)] = {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'params': shape}
+        entry['calls'] += 1
+        entry['total_ms'] += elapsed_ms
+        entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+        entry['rows'] += max(rows, 0)
+
+    if elapsed_ms >= SLOW_QUERY_MS:
+        _slow_log_handler().info(json.dumps({
+            'ts': datetime.now().isoformat(),
+            'page': page,
+            'ms': round(elapsed_ms, 3),
+            'rows': rows,
+            'params': shape,
+            'sql': sql,
+        }, ensure_ascii=False))
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    # Misst execute bis einschließlich fetchall/fetchone; Statements ohne Ergebnis sofort
+    _pending = None
+
+    def execute(self, sql, parameters=()):
+        self._finish(0)
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        self._pending = (current_page(), sql, parameters, started)
+        if self.description is None:
+            self._finish(self.rowcount)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish(0)
+        seq_of_parameters = list(seq_of_parameters)
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        self._pending = (current_page(), sql, seq_of_parameters[0] if seq_of_parameters else (), started)
+        self._finish(self.rowcount)
+        return self
+
+    def fetchall(self):
+        rows = super().fetchall()
+        self._finish(len(rows))
+        return rows
+
+    def fetchone(self):
+        row = super().fetchone()
+        self._finish(0 if row is None else 1)
+        return row
+
+    def _finish(self, rows):
+        if self._pending is None:
+            return
+        page, sql, parameters, started = self._pending
+        self._pending = None
+        record(page, sql, parameters, rows, (time.perf_counter() - started) * 1000)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connection_factory():
+    return InstrumentedConnection if ENABLED else sqlite3.Connection
+
+
+def snapshot():
+    """
+    Returns: Liste von dicts (page, sql, calls, total_ms, avg_ms, max_ms, rows, params)
+    """
+    with _stats_lock:
+        items = [(key, dict(entry)) for key, entry in _stats.items()]
+    return [
+        {
+            'page': page, 'sql': sql, 'calls': entry['calls'],
+            'total_ms': entry['total_ms'], 'avg_ms': entry['total_ms'] / entry['calls'],
+            'max_ms': entry['max_ms'], 'rows': entry['rows'], 'params': entry['params'],
+        }
+        for (page, sql), entry in items
+    ]
+
+
+def reset():
+    with _stats_lock:
+        _stats.clear()
+
+
+def read_slow_log(limit=50):
+    # Die letzten limit Einträge des aktuellen Slow-Query-Logs (neueste zuerst)
+    if not os.path.exists(SLOW_QUERY_LOG):
+        return []
+    with open(SLOW_QUERY_LOG, encoding="utf-8") as f:
+        lines = f.readlines()[-limit:]
+    return [json.loads(line) for line in reversed(lines) if line.strip()]
@@ -0,0 +1,124 @@
+import difflib
+import re
+import unicodedata
+
+import pandas as pd
+
+from db import cached_query, cached_query_all
+from indexes import register_hot_query
+
+# Volltextsuche über den FTS5-Index locations_fts (Migration 11): Standortdaten und alle
+# Kommentare der Workflow-Historie. Jedes Suchwort wird als Präfix gesucht; kommt ein Wort im
+# Index gar nicht vor, wird es durch ähnliche Begriffe aus locations_fts_vocab ersetzt (Tippfehler).
+
+PAGE_SIZE = 25
+
+# Gewichte für bm25 in der Spaltenreihenfolge von locations_fts
+# (standort, stadt, erfasser, alte_nummer, network_id, dms_id, kommentare)
+RANK_WEIGHTS = (10.0, 4.0, 2.0, 8.0, 8.0, 8.0, 1.0)
+
+# Tippfehlertoleranz: höchstens so viele Ersatzbegriffe je Wort ab dieser Ähnlichkeit (difflib)
+FUZZY_MATCHES = 3
+FUZZY_CUTOFF = 0.75
+
+RESULT_COLUMNS = ['id', 'standort', 'stadt', 'vermarktungsform', 'current_step', 'status', 'treffer', 'score', 'fts_rowid']
+
+# Keyset-Pagination auf (score, rowid): bm25 ist negativ, kleinere Werte sind bessere Treffer
+SEARCH_SQL = '''
+    SELECT l.id, l.standort, l.stadt, l.vermarktungsform, l.current_step, l.status, m.treffer, m.score, m.rowid
+    FROM (
+        SELECT rowid, bm25(locations_fts, {weights}) AS score,
+               snippet(locations_fts, -1, '**', '**', '…', 10) AS treffer
+        FROM locations_fts
+        WHERE locations_fts MATCH ?
+    ) m
+    JOIN locations l ON l.rowid = m.rowid
+    WHERE (m.score, m.rowid) > (?, ?)
+    ORDER BY m.score, m.rowid
+    LIMIT ?
+'''.format(weights=", ".join(str(weight) for weight in RANK_WEIGHTS))
+
+COUNT_SQL = "SELECT COUNT(*) FROM locations_fts WHERE locations_fts MATCH ?"
+
+# Begriffe mit gleichem Anfangsbuchstaben (Bereichsabfrage auf fts5vocab, kein vollständiger Scan)
+VOCAB_RANGE_SQL = "SELECT term FROM locations_fts_vocab WHERE term >= ? AND term < ?"
+
+register_hot_query("locations_search", SEARCH_SQL, ('"koln"*', float("-inf"), 0, PAGE_SIZE + 1))
+
+
+def normalize(text: str) -> str:
+    # Wie der Tokenizer unicode61 remove_diacritics: Kleinbuchstaben ohne Akzente/Umlautpunkte
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> list:
+    # Wortzeichen ohne "_", wie unicode61 (Bindestriche usw. trennen: "DS-1234" -> ds, 1234)
+    return re.findall(r"[^\W_]+", normalize(text))
+
+
+def _next_prefix(prefix: str) -> str:
+    # Kleinste Zeichenkette, die größer als alle Begriffe mit diesem Präfix ist
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _has_prefix(token: str) -> bool:
+    return bool(cached_query_all(VOCAB_RANGE_SQL + " LIMIT 1", (token, _next_prefix(token))))
+
+
+def similar_terms(token: str) -> list:
+    """
+    Ähnliche Begriffe aus dem Index für ein Wort ohne Treffer.
+    Kandidaten sind Begriffe mit demselben Anfangsbuchstaben und ähnlicher Länge.
+    Returns: bis zu FUZZY_MATCHES Begriffe, ähnlichste zuerst
+    """
+    candidates = [
+        row[0] for row in cached_query_all(VOCAB_RANGE_SQL, (token[0], _next_prefix(token[0])))
+        if abs(len(row[0]) - len(token)) <= 2
+    ]
+    return difflib.get_close_matches(token, candidates, n=FUZZY_MATCHES, cutoff=FUZZY_CUTOFF)
+
+
+def build_match_query(text: str) -> tuple:
+    """
+    Baut den FTS5-MATCH-Ausdruck: alle Wörter müssen vorkommen (als Präfix),
+    unbekannte Wörter außer Zahlen werden durch ähnliche Begriffe (ebenfalls als Präfix) ersetzt.
+    Returns: (MATCH-Ausdruck oder None, dict Wort -> Ersatzbegriffe)
+    """
+    parts = []
+    corrections = {}
+    for token in dict.fromkeys(tokenize(text)):
+        if _has_prefix(token):
+            parts.append(f'"{token}"*')
+            continue
+        # Zahlen (IDs, Hausnummern, PLZ) nicht ersetzen: "1234" -> "123" fände fremde Standorte
+        alternatives = [] if token.isdigit() else similar_terms(token)
+        if not alternatives:
+            # Kein Treffer möglich: Wort trotzdem aufnehmen, die Suche liefert dann nichts
+            parts.append(f'"{token}"*')
+            continue
+        corrections[token] = alternatives
+        parts.append("(" + " OR ".join(f'"{term}"*' for term in alternatives) + ")")
+    if not parts:
+        return None, {}
+    return " AND ".join(parts), corrections
+
+
+def count_matches(match_query: str) -> int:
+    return cached_query(COUNT_SQL, (match_query,))[1][0][0]
+
+
+def search_locations(match_query: str, cursor: tuple | None = None, page_size: int = PAGE_SIZE) -> tuple:
+    """
+    Lädt eine Seite der Suchergebnisse, beste Treffer zuerst.
+    cursor: (score, rowid) des letzten Treffers der vorherigen Seite oder None für die erste Seite
+    Returns: (DataFrame mit RESULT_COLUMNS, Cursor für die nächste Seite oder None)
+    """
+    score, rowid = cursor if cursor is not None else (float("-inf"), 0)
+    rows = cached_query_all(SEARCH_SQL, (match_query, score, rowid, page_size + 1))
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = (rows[-1][-2], rows[-1][-1])
+    return pd.DataFrame(rows, columns=RESULT_COLUMNS), next_cursor
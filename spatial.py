@@ -0,0 +1,205 @@
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from db import cached_query_all, query_all
+from indexes import register_hot_query
+
+# Räumliche Abfragen über den R*Tree locations_rtree (Migration 8) und das Raster-Aggregat
+# location_clusters (Migration 9). Die GeoMap lädt damit nur den sichtbaren Kartenausschnitt:
+# bei kleinem Zoom Cluster je Rasterzelle, ab POINT_ZOOM einzelne Standorte.
+
+POINT_COLUMNS = ['id', 'standort', 'stadt', 'lat', 'lng', 'vermarktungsform', 'current_step']
+
+# Obergrenze der Punkte je Abfrage, schützt den Browser bei sehr großen Ausschnitten
+MAX_POINTS = 20000
+
+# Web-Mercator-Kachelgröße in Pixeln (deck.gl/pydeck)
+TILE_SIZE = 256
+MAX_LAT = 85.0511
+
+# Ab dieser Zoomstufe einzelne Standorte, darunter Cluster
+POINT_ZOOM = 11
+
+# Angestrebte Kantenlänge einer Clusterzelle auf dem Bildschirm in Pixeln
+CLUSTER_CELL_PX = 40
+
+# Umkreis der Dublettenprüfung bei der Erfassung in Metern
+DUPLICATE_RADIUS_M = float(os.environ.get("WERBETRAEGER_DUPLICATE_RADIUS", "50"))
+
+# Abgelehnte oder abgebrochene Standorte blockieren keinen neuen Standort (Status siehe workflow.py)
+CLOSED_STATUSES = ("rejected",)
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE_LAT = 111320.0
+
+NEARBY_COLUMNS = ['id', 'standort', 'stadt', 'lat', 'lng', 'vermarktungsform', 'current_step', 'status', 'created_at']
+
+CLUSTER_COLUMNS = ['cell_lat', 'cell_lng', 'vermarktungsform', 'anzahl', 'sum_lat', 'sum_lng']
+
+# R*Tree speichert 32-Bit-Floats (nach außen gerundet): der Vorfilter kann knapp außerhalb liegende
+# Punkte liefern, die exakte Prüfung auf locations.lat/lng sortiert sie aus
+BBOX_SQL = '''
+    SELECT {columns}
+    FROM locations_rtree r
+    JOIN locations l ON l.rowid = r.id
+    WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lng >= ? AND r.min_lng <= ?
+      AND l.lat BETWEEN ? AND ? AND l.lng BETWEEN ? AND ?{filters}
+    LIMIT ?
+'''
+
+CLUSTER_SQL = '''
+    SELECT cell_lat, cell_lng, vermarktungsform, SUM(anzahl), SUM(sum_lat), SUM(sum_lng)
+    FROM location_clusters
+    WHERE level = ? AND cell_lat BETWEEN ? AND ? AND cell_lng BETWEEN ? AND ?{filters}
+    GROUP BY cell_lat, cell_lng, vermarktungsform
+'''
+
+register_hot_query(
+    "locations_bbox",
+    BBOX_SQL.format(columns=", ".join(f"l.{column}" for column in POINT_COLUMNS), filters=""),
+    (51.0, 51.5, 6.5, 7.5, 51.0, 51.5, 6.5, 7.5, MAX_POINTS + 1)
+)
+
+register_hot_query(
+    "locations_nearby",
+    BBOX_SQL.format(columns=", ".join(f"l.{column}" for column in NEARBY_COLUMNS), filters=""),
+    (51.0, 51.001, 7.0, 7.001, 51.0, 51.001, 7.0, 7.001, -1)
+)
+
+register_hot_query("location_clusters", CLUSTER_SQL.format(filters=""), (1, 282, 284, 373, 376))
+
+
+def viewport_bbox(lat: float, lng: float, zoom: float, width_px: int = 1400, height_px: int = 600) -> tuple:
+    """
+    Sichtbarer Ausschnitt einer Web-Mercator-Karte mit Mittelpunkt (lat, lng) und Zoomstufe zoom.
+    Returns: (süd, nord, west, ost) in Grad
+    """
+    pixels_per_radian = TILE_SIZE * 2 ** zoom / (2 * math.pi)
+    half_width = width_px / 2 / pixels_per_radian
+    half_height = height_px / 2 / pixels_per_radian
+
+    y = math.log(math.tan(math.pi / 4 + math.radians(max(min(lat, MAX_LAT), -MAX_LAT)) / 2))
+    south = math.degrees(2 * math.atan(math.exp(y - half_height)) - math.pi / 2)
+    north = math.degrees(2 * math.atan(math.exp(y + half_height)) - math.pi / 2)
+    west = max(lng - math.degrees(half_width), -180.0)
+    east = min(lng + math.degrees(half_width), 180.0)
+    return south, north, west, east
+
+
+def _in_filter(column: str, values) -> tuple:
+    if not values:
+        return "", []
+    return f" AND {column} IN ({', '.join('?' * len(values))})", list(values)
+
+
+def load_points_in_bbox(bbox: tuple, steps=None, forms=None, limit: int = MAX_POINTS) -> tuple:
+    """
+    Lädt alle Standorte innerhalb von bbox = (süd, nord, west, ost), optional nur
+    bestimmte Prozessschritte (current_step) bzw. Vermarktungsformen.
+    Returns: (DataFrame mit POINT_COLUMNS, True wenn bei limit abgeschnitten wurde)
+    """
+    # Gerundet, damit kleine Rechenunterschiede denselben Cache-Eintrag treffen
+    south, north, west, east = (round(value, 5) for value in bbox)
+    step_sql, step_params = _in_filter("l.current_step", steps)
+    form_sql, form_params = _in_filter("l.vermarktungsform", forms)
+
+    sql = BBOX_SQL.format(
+        columns=", ".join(f"l.{column}" for column in POINT_COLUMNS),
+        filters=step_sql + form_sql,
+    )
+    params = [south, north, west, east, south, north, west, east] + step_params + form_params + [limit + 1]
+    rows = cached_query_all(sql, params)
+
+    truncated = len(rows) > limit
+    return pd.DataFrame(rows[:limit], columns=POINT_COLUMNS), truncated
+
+
+def load_cluster_levels() -> list:
+    # Rasterstufen aus Migration 9, gröbste zuerst
+    return cached_query_all("SELECT level, cell_size FROM cluster_levels ORDER BY cell_size DESC")
+
+
+def cluster_level_for_zoom(zoom: float) -> tuple | None:
+    """
+    Wählt die Rasterstufe, deren Zellen bei dieser Zoomstufe etwa CLUSTER_CELL_PX Pixel groß sind.
+    Returns: (level, cell_size) oder None, wenn einzelne Standorte angezeigt werden sollen
+    """
+    if zoom >= POINT_ZOOM:
+        return None
+    pixels_per_degree = TILE_SIZE * 2 ** zoom / 360
+    target = CLUSTER_CELL_PX / pixels_per_degree
+    # Stufen vervierfachen sich: nächstgelegene Stufe auf logarithmischer Skala
+    return min(load_cluster_levels(), key=lambda level: abs(math.log(level[1] / target)))
+
+
+def load_clusters(level: tuple, bbox: tuple, steps=None, forms=None) -> pd.DataFrame:
+    """
+    Lädt die Cluster einer Rasterstufe innerhalb von bbox = (süd, nord, west, ost).
+    Position eines Clusters ist der Schwerpunkt seiner Standorte, die Farbe richtet sich
+    nach der häufigsten Vermarktungsform.
+    Returns: DataFrame mit lat, lng, anzahl, vermarktungsform, formen (Aufschlüsselung für den Tooltip)
+    """
+    level_id, cell_size = level
+    south, north, west, east = bbox
+    step_sql, step_params = _in_filter("current_step", steps)
+    form_sql, form_params = _in_filter("vermarktungsform", forms)
+    params = [
+        level_id,
+        int((south + 90) / cell_size), int((north + 90) / cell_size),
+        int((west + 180) / cell_size), int((east + 180) / cell_size),
+    ] + step_params + form_params
+    rows = cached_query_all(CLUSTER_SQL.format(filters=step_sql + form_sql), params)
+    if not rows:
+        return pd.DataFrame(columns=['lat', 'lng', 'anzahl', 'vermarktungsform', 'formen'])
+
+    df = pd.DataFrame(rows, columns=CLUSTER_COLUMNS)
+    cells = ['cell_lat', 'cell_lng']
+    df['formen'] = df['vermarktungsform'].replace('', 'ohne') + ": " + df['anzahl'].astype(str)
+    df = df.sort_values('anzahl', ascending=False)
+    clusters = df.groupby(cells, sort=False).agg(
+        vermarktungsform=('vermarktungsform', 'first'),
+        formen=('formen', "<br/>".join),
+        anzahl=('anzahl', 'sum'),
+        sum_lat=('sum_lat', 'sum'),
+        sum_lng=('sum_lng', 'sum'),
+    )
+    clusters['lat'] = clusters['sum_lat'] / clusters['anzahl']
+    clusters['lng'] = clusters['sum_lng'] / clusters['anzahl']
+    return clusters.reset_index()[['lat', 'lng', 'anzahl', 'vermarktungsform', 'formen']]
+
+
+def haversine_m(lat, lng, lats, lngs):
+    # Großkreisentfernung in Metern von (lat, lng) zu allen Punkten (lats, lngs), vektorisiert
+    lat1, lng1 = np.radians(lat), np.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def find_nearby_locations(lat: float, lng: float, radius_m: float = DUPLICATE_RADIUS_M,
+                          exclude_statuses=CLOSED_STATUSES) -> pd.DataFrame:
+    """
+    Sucht bestehende oder laufende Standorte im Umkreis von radius_m Metern (Dublettenprüfung).
+    Vorfilter über das umschließende Rechteck im R*Tree, danach exakte Haversine-Entfernung.
+    Bewusst ohne Query-Cache: geprüft wird gegen den aktuellen Datenstand.
+    Returns: DataFrame mit NEARBY_COLUMNS und distanz_m, nach Entfernung sortiert
+    """
+    delta_lat = radius_m / METERS_PER_DEGREE_LAT
+    delta_lng = delta_lat / max(math.cos(math.radians(lat)), 0.01)
+    south, north, west, east = lat - delta_lat, lat + delta_lat, lng - delta_lng, lng + delta_lng
+    status_sql = ""
+    if exclude_statuses:
+        status_sql = f" AND IFNULL(l.status, '') NOT IN ({', '.join('?' * len(exclude_statuses))})"
+
+    sql = BBOX_SQL.format(columns=", ".join(f"l.{column}" for column in NEARBY_COLUMNS), filters=status_sql)
+    params = [south, north, west, east, south, north, west, east] + list(exclude_statuses or []) + [-1]
+    df = pd.DataFrame(query_all(sql, params), columns=NEARBY_COLUMNS)
+    if df.empty:
+        df['distanz_m'] = pd.Series(dtype=float)
+        return df
+
+    df['distanz_m'] = haversine_m(lat, lng, df['lat'].to_numpy(), df['lng'].to_numpy()).round(1)
+    return df[df['distanz_m'] <= radius_m].sort_values('distanz_m').reset_index(drop=True)
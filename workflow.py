@@ -0,0 +1,151 @@
+from datetime import datetime
+
+from db import insert_history, insert_history_many, transaction
+
+# Workflow der Standorte als Zustandsautomat. Alle Schrittseiten schreiben ihre Entscheidungen
+# über transition() bzw. transition_many(): Übergang prüfen, locations aktualisieren und
+# History-Eintrag schreiben geschehen in einer BEGIN IMMEDIATE-Transaktion.
+
+ACTIVE = "active"
+REJECTED = "rejected"
+COMPLETED = "completed"
+
+# Endzustände (current_step) ohne weitere Übergänge
+FINAL_STEPS = ("abgelehnt", "abgebrochen", "fertig")
+
+# (Schritt, Aktion) -> (nächster Schritt, Status, Status des History-Eintrags)
+TRANSITIONS = {
+    ('leiter_akquisition', 'approve'): ('niederlassungsleiter', ACTIVE, 'approved'),
+    ('leiter_akquisition', 'reject'): ('abgelehnt', REJECTED, 'rejected'),
+    ('niederlassungsleiter', 'approve'): ('baurecht', ACTIVE, 'approved'),
+    ('niederlassungsleiter', 'reject'): ('abgelehnt', REJECTED, 'rejected'),
+    ('baurecht', 'submit'): ('baurecht', ACTIVE, 'submitted'),
+    ('baurecht', 'approve'): ('ceo', ACTIVE, 'approved'),
+    ('baurecht', 'object'): ('widerspruch', ACTIVE, 'objection'),
+    ('baurecht', 'reject'): ('abgebrochen', REJECTED, 'rejected'),
+    ('widerspruch', 'approve'): ('ceo', ACTIVE, 'approved'),
+    ('widerspruch', 'reject'): ('abgebrochen', REJECTED, 'rejected'),
+    ('ceo', 'approve'): ('bauteam', ACTIVE, 'approved'),
+    ('ceo', 'reject'): ('abgelehnt', REJECTED, 'rejected'),
+    ('bauteam', 'update'): ('bauteam', ACTIVE, 'updated'),
+    ('bauteam', 'complete'): ('fertigstellung', ACTIVE, 'completed'),
+    ('fertigstellung', 'complete'): ('fertig', COMPLETED, 'completed'),
+}
+
+# Abweichungen je Vermarktungsform (ersetzen bzw. ergänzen TRANSITIONS)
+FORM_TRANSITIONS = {
+    # Die Digitale Säule überspringt den Niederlassungsleiter
+    'Digitale Säule': {
+        ('leiter_akquisition', 'approve'): ('baurecht', ACTIVE, 'approved'),
+    },
+}
+
+# Spalten von locations, die ein Übergang zusätzlich setzen darf
+TRANSITION_FIELDS = {
+    ('baurecht', 'submit'): {'bauantrag_datum'},
+    ('bauteam', 'update'): {'plan_date', 'ist_date', 'build_status', 'contractor', 'power_connection'},
+    ('bauteam', 'complete'): {'ist_date'},
+    ('fertigstellung', 'complete'): {'completion_date', 'final_inspection', 'network_id', 'dms_id'},
+}
+
+# Obergrenze der Platzhalter je IN (...)-Abfrage
+IN_CHUNK_SIZE = 500
+
+STATE_SQL = "SELECT id, current_step, vermarktungsform FROM locations WHERE id IN ({placeholders})"
+
+UPDATE_STEP_SQL = "UPDATE locations SET status = ?, current_step = ?{fields} WHERE id = ?"
+
+
+def transitions_for(vermarktungsform: str | None) -> dict:
+    # Übergangstabelle einer Vermarktungsform
+    return {**TRANSITIONS, **FORM_TRANSITIONS.get(vermarktungsform, {})}
+
+
+def allowed_actions(step: str, vermarktungsform: str | None = None) -> dict:
+    """
+    Returns: dict Aktion -> (nächster Schritt, Status, History-Status) für einen Schritt
+    """
+    return {
+        action: target for (source, action), target in transitions_for(vermarktungsform).items()
+        if source == step
+    }
+
+
+def resolve(current_step: str, vermarktungsform: str | None, action: str) -> tuple:
+    """
+    Prüft einen Übergang gegen die Tabelle.
+    Returns: (nächster Schritt, Status, History-Status)
+    Raises: ValueError bei unzulässigem Übergang
+    """
+    target = transitions_for(vermarktungsform).get((current_step, action))
+    if target is None:
+        raise ValueError(f"Übergang '{action}' ist im Schritt '{current_step}' nicht zulässig")
+    return target
+
+
+def _load_states(conn, location_ids) -> dict:
+    # Aktueller Schritt und Vermarktungsform je Standort, blockweise wegen der Platzhaltergrenze
+    states = {}
+    for start in range(0, len(location_ids), IN_CHUNK_SIZE):
+        chunk = location_ids[start:start + IN_CHUNK_SIZE]
+        rows = conn.execute(STATE_SQL.format(placeholders=", ".join("?" * len(chunk))), chunk).fetchall()
+        states.update((row[0], (row[1], row[2])) for row in rows)
+    return states
+
+
+def transition(location_id: str, action: str, actor: str, comment: str,
+               step: str | None = None, fields: dict | None = None) -> dict:
+    """
+    Führt einen Übergang für einen Standort aus.
+    step: erwarteter aktueller Schritt (Schutz vor paralleler Bearbeitung), None = beliebig
+    fields: weitere Spalten von locations, die mit dem Übergang gesetzt werden (siehe TRANSITION_FIELDS)
+    Returns: dict mit step, next_step, status
+    Raises: ValueError, wenn der Standort fehlt oder der Übergang nicht zulässig ist
+    """
+    fields = fields or {}
+    with transaction(immediate=True) as conn:
+        state = _load_states(conn, [location_id]).get(location_id)
+        if state is None:
+            raise ValueError(f"Standort {location_id} nicht gefunden")
+        current_step, vermarktungsform = state
+        if step is not None and current_step != step:
+            raise ValueError(f"Standort {location_id} steht nicht mehr im Schritt '{step}', sondern in '{current_step}'")
+        next_step, status, history_status = resolve(current_step, vermarktungsform, action)
+
+        unknown = set(fields) - TRANSITION_FIELDS.get((current_step, action), set())
+        if unknown:
+            raise ValueError(f"Übergang '{action}' darf {', '.join(sorted(unknown))} nicht setzen")
+
+        columns = list(fields)
+        conn.execute(
+            UPDATE_STEP_SQL.format(fields="".join(f", {column} = ?" for column in columns)),
+            [status, next_step] + [fields[column] for column in columns] + [location_id]
+        )
+        insert_history(conn, location_id, current_step, history_status, comment, actor)
+    return {'step': current_step, 'next_step': next_step, 'status': status}
+
+
+def transition_many(step: str, decisions: list, actor: str) -> list:
+    """
+    Führt Übergänge für viele Standorte eines Schritts in einer Transaktion aus (Sammelentscheidung):
+    alle Statuswechsel und History-Einträge per executemany.
+    decisions: Liste von (location_id, Aktion, Kommentar)
+    Standorte, die inzwischen nicht mehr in step stehen (parallel bearbeitet), werden übersprungen.
+    Returns: IDs der geänderten Standorte
+    Raises: ValueError bei einer in step unzulässigen Aktion
+    """
+    timestamp = datetime.now().isoformat()
+    with transaction(immediate=True) as conn:
+        states = _load_states(conn, [decision[0] for decision in decisions])
+        updates = []
+        history = []
+        for location_id, action, comment in decisions:
+            current_step, vermarktungsform = states.get(location_id, (None, None))
+            if current_step != step:
+                continue
+            next_step, status, history_status = resolve(current_step, vermarktungsform, action)
+            updates.append((status, next_step, location_id))
+            history.append((location_id, step, history_status, comment, actor))
+        conn.executemany(UPDATE_STEP_SQL.format(fields=""), updates)
+        insert_history_many(conn, history, timestamp)
+    return [update[2] for update in updates]
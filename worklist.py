@@ -0,0 +1,196 @@
+import zlib
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from db import WORKLIST_COLUMNS, cached_query_all, format_location_frame
+from aggregates import count_waiting
+from indexes import register_hot_query
+
+# Anzahl Standorte je Seite der Arbeitsliste
+PAGE_SIZE = 50
+
+# Checkbox-Spalte der Mehrfachauswahl
+SELECT_COLUMN = "Auswahl"
+
+# Durchsuchte Spalten der serverseitigen Textsuche
+SEARCH_COLUMNS = ['standort', 'stadt', 'id', 'erfasser']
+
+# Keyset-Pagination auf (created_at, id): Laufzeit unabhängig davon, wie weit geblättert wurde.
+# created_at kann NULL sein und wird daher als '' verglichen (sonst wären diese Standorte nach Seite 1
+# nicht mehr erreichbar); die einfache Obergrenze erlaubt SQLite die Bereichssuche im Ausdrucksindex.
+WORKLIST_PAGE_SQL = '''
+    SELECT {columns}
+    FROM locations
+    WHERE {status_filter}current_step = ?{search}{cursor}
+    ORDER BY COALESCE(created_at, '') DESC, id DESC
+    LIMIT ?
+'''
+
+CURSOR_SQL = " AND COALESCE(created_at, '') <= ? AND (COALESCE(created_at, ''), id) < (?, ?)"
+
+register_hot_query(
+    "worklist_page",
+    WORKLIST_PAGE_SQL.format(
+        columns=", ".join(WORKLIST_COLUMNS), status_filter="status = 'active' AND ",
+        search="", cursor=CURSOR_SQL
+    ),
+    ("baurecht", "2100-01-01", "2100-01-01", "", PAGE_SIZE + 1)
+)
+
+
+def _like_pattern(text: str) -> str:
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def load_worklist_page(step: str, active_only: bool = True, search: str = "",
+                       cursor: tuple | None = None, page_size: int = PAGE_SIZE) -> tuple:
+    """
+    Lädt eine Seite der Arbeitsliste eines Prozessschritts.
+    cursor: (created_at, id) des letzten Standorts der vorherigen Seite oder None für die erste Seite
+    Returns: (DataFrame mit höchstens page_size Zeilen, Cursor für die nächste Seite oder None)
+    """
+    params = [step]
+    search_sql = ""
+    if search:
+        pattern = _like_pattern(search)
+        search_sql = " AND (" + " OR ".join(f"{column} LIKE ? ESCAPE '\\'" for column in SEARCH_COLUMNS) + ")"
+        params.extend([pattern] * len(SEARCH_COLUMNS))
+    cursor_sql = ""
+    if cursor is not None:
+        cursor_sql = CURSOR_SQL
+        params.extend([cursor[0], cursor[0], cursor[1]])
+    # Eine Zeile mehr laden, um zu erkennen, ob es eine weitere Seite gibt
+    params.append(page_size + 1)
+
+    sql = WORKLIST_PAGE_SQL.format(
+        columns=", ".join(WORKLIST_COLUMNS),
+        status_filter="status = 'active' AND " if active_only else "",
+        search=search_sql,
+        cursor=cursor_sql,
+    )
+    rows = cached_query_all(sql, params)
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = dict(zip(WORKLIST_COLUMNS, rows[-1]))
+        next_cursor = (last['created_at'] or "", last['id'])
+
+    df = pd.DataFrame(rows, columns=WORKLIST_COLUMNS)
+    return format_location_frame(df), next_cursor
+
+
+def _format_date(value) -> str:
+    # ISO-Zeitstempel mit oder ohne Mikrosekunden als TT.MM.JJJJ
+    if not value:
+        return ""
+    try:
+        return datetime.fromisoformat(str(value)).strftime('%d.%m.%Y')
+    except ValueError:
+        return str(value)
+
+
+def _format_option(rows_by_id: dict, location_id: str) -> str:
+    row = rows_by_id[location_id]
+    return f"{row['standort']}, {row['stadt']} ({row['vermarktungsform']})"
+
+
+def render_worklist(step: str, columns: dict, select_label: str, empty_message: str,
+                    count_text: str | None = None, active_only: bool = True, date_columns=(),
+                    multi: bool = False):
+    """
+    Zeigt die Arbeitsliste eines Prozessschritts mit Suche, Blättern und Standortauswahl.
+    columns: anzuzeigende Spalten (Spaltenname -> Überschrift)
+    count_text: Text nach der Gesamtanzahl, z.B. "warten auf Ihre Genehmigung."
+    date_columns: Spalten, die als TT.MM.JJJJ angezeigt werden
+    multi: Mehrfachauswahl per Checkbox-Spalte (Sammelentscheidung) statt Auswahlliste
+    Returns: ID des ausgewählten Standorts oder None; mit multi DataFrame der angehakten Zeilen oder None
+    """
+    total = count_waiting(step, active_only)
+    if total == 0:
+        st.info(empty_message)
+        return None
+
+    if count_text:
+        st.write(f"**{total} Standorte** {count_text}")
+
+    # Blätterzustand je Schritt: Stapel der Cursor aller bisher besuchten Seiten
+    state_key = f"worklist_{step}"
+    search = st.text_input("Suche (Standort, Stadt, ID, Erfasser):", key=f"{state_key}_search").strip()
+    state = st.session_state.setdefault(state_key, {'search': search, 'cursors': [None]})
+    if state['search'] != search:
+        state['search'] = search
+        state['cursors'] = [None]
+
+    df, next_cursor = load_worklist_page(step, active_only, search, state['cursors'][-1])
+
+    if df.empty:
+        st.info("Keine Standorte passend zur Suche gefunden.")
+        return None
+
+    display_df = df[list(columns)].copy()
+    for column in date_columns:
+        display_df[column] = display_df[column].map(_format_date)
+    display_df.columns = list(columns.values())
+    page_number = len(state['cursors'])
+    if multi:
+        # Auswahl gilt für genau diese Zeilen: ändern sich die Standorte der Seite (Blättern, Suche,
+        # nach einer Entscheidung), setzt der neue Editor-Schlüssel die Häkchen zurück
+        rows_key = zlib.crc32(",".join(df['id'].astype(str)).encode())
+        select_all = st.checkbox("Alle auf dieser Seite auswählen", key=f"{state_key}_all")
+        display_df.insert(0, SELECT_COLUMN, select_all)
+        edited = st.data_editor(
+            display_df,
+            hide_index=True,
+            column_config={SELECT_COLUMN: st.column_config.CheckboxColumn(SELECT_COLUMN)},
+            disabled=list(columns.values()),
+            key=f"{state_key}_editor_{rows_key}_{select_all}"
+        )
+        selected = df[edited[SELECT_COLUMN].to_numpy(dtype=bool)]
+    else:
+        st.dataframe(display_df, hide_index=True)
+
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("◀ Zurück", key=f"{state_key}_prev", disabled=page_number == 1):
+            state['cursors'].pop()
+            st.rerun()
+    with col_page:
+        st.caption(f"Seite {page_number}")
+    with col_next:
+        if st.button("Weiter ▶", key=f"{state_key}_next", disabled=next_cursor is None):
+            state['cursors'].append(next_cursor)
+            st.rerun()
+
+    if multi:
+        return selected if not selected.empty else None
+
+    # Zeilen nach ID für die Beschriftung der Auswahl (O(1) je Option)
+    rows_by_id = df.set_index('id', drop=False).to_dict('index')
+    return st.selectbox(
+        select_label,
+        options=list(rows_by_id),
+        format_func=lambda location_id: _format_option(rows_by_id, location_id)
+    )
+
+
+def render_decision_controls(reasons: list, key: str, approve_help: str | None = None) -> tuple:
+    """
+    Genehmigen/Ablehnen mit gemeinsamem Ablehnungsgrund (für Sammelentscheidungen).
+    reasons: Auswahl an Gründen; "Anderer Grund" fragt einen freien Text ab
+    Returns: (genehmigen?, Grund; bei Genehmigung "")
+    """
+    col1, col2 = st.columns(2)
+    with col1:
+        decision = st.radio("Entscheidung für alle ausgewählten Standorte:",
+                            ["Ja, genehmigen", "Nein, ablehnen"], help=approve_help, key=f"{key}_decision")
+    reason = ""
+    with col2:
+        if decision == "Nein, ablehnen":
+            reason = st.selectbox("Grund für Ablehnung:", reasons, key=f"{key}_reason")
+            if reason == "Anderer Grund":
+                reason = st.text_input("Bitte spezifizieren:", key=f"{key}_custom_reason")
+    return decision == "Ja, genehmigen", reason